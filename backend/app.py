@@ -4,6 +4,7 @@ from src.state.state import State
 from src.LLMs.ollama_llm import LlamaOllamaLLM
 from src.LLMs.groq_llm import GroqLLM
 from src.checkpoint.redis_checkpoint import RedisCheckpointer
+from src.graph.stream_events import STREAM_MODES, to_stream_events, get_pending_approval
 
 # Page configuration
 st.set_page_config(
@@ -180,12 +181,8 @@ with st.sidebar:
         # Also clear from Redis
         if st.session_state.graph is not None:
             try:
-                config = {"configurable": {"thread_id": st.session_state.thread_id}}
-                st.session_state.graph.update_state(
-                    config,
-                    {"messages": []},
-                    as_node="chatbot"
-                )
+                # Delete the thread's checkpoints instead of writing yet another one
+                st.session_state.graph.checkpointer.delete_thread(st.session_state.thread_id)
             except:
                 pass
         
@@ -306,70 +303,71 @@ else:
             message_placeholder = st.empty()
             
             try:
-                with st.spinner("Thinking..."):
-                    state = {"messages": st.session_state.messages.copy()}
-                    config = {"configurable": {"thread_id": st.session_state.thread_id}}
-                    
-                    # Stream through the graph
-                    final_state = None
-                    for event in st.session_state.graph.stream(state, config, stream_mode="values"):
-                        final_state = event
+                # Send only the new message; earlier turns are already in the checkpoint
+                state = {"messages": [{"role": "user", "content": prompt}]}
+                config = {"configurable": {"thread_id": st.session_state.thread_id}}
+                
+                # Stream through the graph, rendering tokens and tool events as they arrive
+                streamed_text = ""
+                for mode, payload in st.session_state.graph.stream(state, config, stream_mode=STREAM_MODES):
+                    for event in to_stream_events(mode, payload):
+                        if event["event"] == "token":
+                            streamed_text += event["data"]["content"]
+                            message_placeholder.markdown(streamed_text + "▌")
+                        elif event["event"] == "tool_start":
+                            streamed_text = ""
+                            message_placeholder.caption(f"🔧 Running {event['data']['name']}...")
+                        elif event["event"] == "tool_end":
+                            message_placeholder.caption(f"✅ {event['data']['name']} finished")
+                
+                # Check if we hit an interrupt (human-in-the-loop)
+                snapshot = st.session_state.graph.get_state(config)
+                
+                # Check if graph is waiting at human_approval node
+                if snapshot.next and "human_approval" in snapshot.next:
+                    # Extract the tool call waiting for approval
+                    pending_approval = get_pending_approval(snapshot)
                     
-                    # Check if we hit an interrupt (human-in-the-loop)
-                    snapshot = st.session_state.graph.get_state(config)
+                    if pending_approval:
+                        # Store pending approval
+                        st.session_state.pending_approval = pending_approval
+                        message_placeholder.empty()  # Clear the placeholder
+                        st.rerun()
+                else:
+                    # Graph completed normally (no interrupt)
+                    result_state = snapshot.values
                     
-                    # Check if graph is waiting at human_approval node
-                    if snapshot.next and "human_approval" in snapshot.next:
-                        # Extract tool call details from the last message
-                        last_message = snapshot.values["messages"][-1]
-                        
-                        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-                            tool_call = last_message.tool_calls[0]
-                            
-                            # Store pending approval
-                            st.session_state.pending_approval = {
-                                "tool_call": {
-                                    "name": tool_call["name"],
-                                    "args": tool_call["args"]
-                                }
-                            }
-                            message_placeholder.empty()  # Clear the placeholder
-                            st.rerun()
-                    else:
-                        # Graph completed normally (no interrupt)
-                        result_state = snapshot.values
+                    if result_state["messages"]:
+                        assistant_messages = [
+                            msg for msg in result_state["messages"] 
+                            if (isinstance(msg, dict) and msg.get("role") == "assistant") or 
+                               (hasattr(msg, "type") and msg.type == "ai")
+                        ]
                         
-                        if result_state["messages"]:
-                            assistant_messages = [
-                                msg for msg in result_state["messages"] 
-                                if (isinstance(msg, dict) and msg.get("role") == "assistant") or 
-                                   (hasattr(msg, "type") and msg.type == "ai")
-                            ]
-                            
-                            if assistant_messages:
-                                # Get the last meaningful message
-                                for msg in reversed(assistant_messages):
-                                    if isinstance(msg, dict):
-                                        bot_response = msg.get("content", "")
-                                    elif hasattr(msg, "content"):
-                                        bot_response = msg.content
-                                    else:
-                                        bot_response = str(msg)
+                        if assistant_messages:
+                            # Get the last meaningful message
+                            for msg in reversed(assistant_messages):
+                                if isinstance(msg, dict):
+                                    bot_response = msg.get("content", "")
+                                elif hasattr(msg, "content"):
+                                    bot_response = msg.content
+                                else:
+                                    bot_response = str(msg)
+                                
+                                # Skip empty messages or messages with only tool calls
+                                if bot_response and not (hasattr(msg, "tool_calls") and msg.tool_calls and not bot_response):
+                                    message_placeholder.markdown(bot_response)
                                     
-                                    # Skip empty messages or messages with only tool calls
-                                    if bot_response and not (hasattr(msg, "tool_calls") and msg.tool_calls and not bot_response):
-                                        message_placeholder.markdown(bot_response)
-                                        
-                                        st.session_state.messages.append({
-                                            "role": "assistant",
-                                            "content": bot_response
-                                        })
-                                        break
-                            else:
-                                message_placeholder.info("Processing...")
+                                    st.session_state.messages.append({
+                                        "role": "assistant",
+                                        "content": bot_response
+                                    })
+                                    break
                         else:
-                            message_placeholder.error("No response generated.")
-                    
+                            message_placeholder.info("Processing...")
+                    else:
+                        message_placeholder.error("No response generated.")
+                
             except Exception as e:
                 message_placeholder.error(f"Error: {str(e)}")
                 st.exception(e)
@@ -0,0 +1,223 @@
+# File: benchmarks/bench_checkpoint_codec.py
+"""
+Checkpoint size and speed: the default JSON checkpoints against
+CHECKPOINT_CODEC=zstd (msgpack + zstd keyframes and deltas), with and
+without a trained dictionary.
+
+Synthetic threads of --turns turns (default 10, 100 and 1000); a turn is a
+question, a reply and, in --tool-ratio of the turns, a Tavily search call
+with ~3 KB of results. Every appended message is one checkpoint holding the
+whole conversation so far, as in the graph.
+
+    bytes_per_checkpoint   stored size of the messages channel, averaged over
+                           the thread (JSON: as RedisJSON stores it)
+    encode_ms / decode_ms  average time to write / read one checkpoint;
+                           zstd reads start with a cold decode cache
+    redis_bytes            with --redis-url: MEMORY USAGE of the thread's keys
+                           after writing it through AsyncRedisSaver (threads
+                           up to --redis-max-turns turns)
+
+Usage (from backend/):
+    python -m benchmarks.bench_checkpoint_codec [--turns 10 100 1000] [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.redis.jsonplus_redis import JsonPlusRedisSerializer
+from src.checkpoint.serializer import DeltaCheckpointer, ZstdMsgpackSerializer, train_dictionary
+
+WORDS = ("the model graph thread search result weather price python redis cache latency city "
+         "news report update release version market stock team game score travel flight hotel "
+         "review recipe health study data cloud server api error request response user agent "
+         "today week year first last best new open free local global live official guide").split()
+
+
+def sentence(rng, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def search_results(rng, query: str) -> str:
+    """A Tavily-shaped response: five results of ~80 words each"""
+    return json.dumps({
+        "query": query,
+        "results": [{
+            "title": sentence(rng, 4, 10),
+            "url": f"https://www.example{rng.randint(1, 50)}.com/{rng.choice(WORDS)}/{rng.randint(1000, 99999)}",
+            "content": " ".join(sentence(rng, 8, 20) for _ in range(5)),
+            "score": round(rng.random(), 4)
+        } for _ in range(5)],
+        "response_time": round(rng.uniform(0.5, 2.5), 2)
+    })
+
+
+def synthetic_thread(turns: int, tool_ratio: float, seed: int) -> list:
+    rng = random.Random(seed)
+    messages = []
+    for turn in range(turns):
+        question = sentence(rng, 6, 25)
+        messages.append(HumanMessage(content=question, id=str(uuid.UUID(int=rng.getrandbits(128)))))
+        if rng.random() < tool_ratio:
+            call_id = f"call_{turn}_{rng.getrandbits(32):08x}"
+            messages.append(AIMessage(content="", id=f"run-{turn}-call", tool_calls=[
+                {"name": "tavily_search", "args": {"query": question[:60]}, "id": call_id}
+            ]))
+            messages.append(ToolMessage(content=search_results(rng, question[:60]), tool_call_id=call_id,
+                                        name="tavily_search", id=f"tool-{turn}"))
+        messages.append(AIMessage(content=" ".join(sentence(rng, 8, 25) for _ in range(rng.randint(2, 6))),
+                                  id=f"run-{turn}-reply"))
+    return messages
+
+
+def sampled(count: int, samples: int) -> list:
+    """Up to `samples` evenly spaced checkpoint positions (1-based lengths)"""
+    step = max(1, count // samples)
+    return list(range(step, count + 1, step))
+
+
+def bench_json(messages: list, samples: int) -> dict:
+    serde = JsonPlusRedisSerializer()
+    # A JSON list's size is its elements plus brackets and commas, so every
+    # prefix's size follows from the per-message sizes
+    sizes = [len(serde.dumps_typed(message)[1]) for message in messages]
+    total, prefix = 0, 0
+    for length, size in enumerate(sizes, start=1):
+        prefix += size
+        total += prefix + length + 1
+
+    encode, decode = [], []
+    for length in sampled(len(messages), samples):
+        checkpoint = {"channel_values": {"messages": messages[:length]}}
+        start = time.perf_counter()
+        dumped = serde.dumps_typed(checkpoint)
+        encode.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        serde.loads_typed(dumped)
+        decode.append(time.perf_counter() - start)
+    return {
+        "bytes_per_checkpoint": round(total / len(messages)),
+        "last_checkpoint_bytes": prefix + len(messages) + 1,
+        "encode_ms": round(statistics.mean(encode) * 1000, 3),
+        "decode_ms": round(statistics.mean(decode) * 1000, 3)
+    }
+
+
+def write_thread(saver, thread_id: str, messages: list):
+    """Writes one checkpoint per appended message; returns (configs, seconds per write)"""
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    configs, elapsed = [], 0.0
+    for length in range(1, len(messages) + 1):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=length))
+        checkpoint["channel_values"] = {"messages": messages[:length]}
+        checkpoint["channel_versions"] = {"messages": length}
+        start = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop", "step": length}, {"messages": length})
+        elapsed += time.perf_counter() - start
+        configs.append(config)
+    return configs, elapsed / len(messages)
+
+
+def bench_zstd(messages: list, samples: int, codec: ZstdMsgpackSerializer, keyframe_interval: int) -> dict:
+    inner = InMemorySaver()
+    saver = DeltaCheckpointer(inner, codec=codec, keyframe_interval=keyframe_interval)
+    configs, encode_s = write_thread(saver, "bench", messages)
+
+    # One messages blob per checkpoint: (type, bytes) as the saver serialized it
+    stored = [len(blob[1]) for (_thread, _ns, channel, _version), blob in inner.blobs.items()
+              if channel == "messages"]
+
+    decode = []
+    for length in sampled(len(messages), samples):
+        saver._cache.clear()
+        start = time.perf_counter()
+        checkpoint_tuple = saver.get_tuple(configs[length - 1])
+        decode.append(time.perf_counter() - start)
+        assert len(checkpoint_tuple.checkpoint["channel_values"]["messages"]) == length
+    return {
+        "bytes_per_checkpoint": round(statistics.mean(stored)),
+        "last_checkpoint_bytes": stored[-1],
+        "encode_ms": round(encode_s * 1000, 3),
+        "decode_ms": round(statistics.mean(decode) * 1000, 3)
+    }
+
+
+async def redis_bytes(redis_url: str, messages: list, wrap: bool, codec=None, keyframe_interval: int = 16) -> dict:
+    from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+    from src.checkpoint.retention import CheckpointCompactor
+
+    redis_saver = AsyncRedisSaver(redis_url=redis_url)
+    await redis_saver.asetup()
+    saver = DeltaCheckpointer(redis_saver, codec=codec, keyframe_interval=keyframe_interval) if wrap else redis_saver
+    thread_id = f"bench-codec-{uuid.uuid4().hex[:8]}"
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for length in range(1, len(messages) + 1):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=length))
+        checkpoint["channel_values"] = {"messages": messages[:length]}
+        checkpoint["channel_versions"] = {"messages": length}
+        config = await saver.aput(config, checkpoint, {"source": "loop", "step": length}, {"messages": length})
+    usage = await CheckpointCompactor(redis_saver)._redis_usage([thread_id])
+    keys, size = usage.get(thread_id, (0, 0))
+    await redis_saver.adelete_thread(thread_id)
+    await redis_saver._redis.aclose()
+    return {"redis_keys": keys, "redis_bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint bytes and encode/decode time: JSON vs msgpack+zstd")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000], help="Thread lengths in turns")
+    parser.add_argument("--tool-ratio", type=float, default=0.5, help="Share of turns with a search call")
+    parser.add_argument("--level", type=int, default=3, help="zstd level")
+    parser.add_argument("--keyframe-interval", type=int, default=16)
+    parser.add_argument("--dict-size", type=int, default=16384, help="Trained dictionary size in bytes")
+    parser.add_argument("--samples", type=int, default=40, help="Checkpoints timed per thread")
+    parser.add_argument("--redis-url", default=None, help="Also measure Redis memory (writes, then deletes)")
+    parser.add_argument("--redis-max-turns", type=int, default=100, help="Longest thread written to Redis")
+    args = parser.parse_args()
+
+    # The dictionary is trained on a different thread than the ones measured
+    training = synthetic_thread(200, args.tool_ratio, seed=1)
+    dictionary = train_dictionary([[message] for message in training], args.dict_size)
+    codecs = {
+        "zstd": ZstdMsgpackSerializer(level=args.level, dictionary=b""),
+        "zstd_dict": ZstdMsgpackSerializer(level=args.level, dictionary=dictionary)
+    }
+
+    results = {}
+    for turns in args.turns:
+        messages = synthetic_thread(turns, args.tool_ratio, seed=turns)
+        result = {"messages": len(messages), "json": bench_json(messages, args.samples)}
+        for name, codec in codecs.items():
+            result[name] = bench_zstd(messages, args.samples, codec, args.keyframe_interval)
+            result[name]["size_vs_json"] = round(
+                result[name]["bytes_per_checkpoint"] / result["json"]["bytes_per_checkpoint"], 4)
+        if args.redis_url and turns <= args.redis_max_turns:
+            result["json"].update(asyncio.run(redis_bytes(args.redis_url, messages, wrap=False)))
+            for name, codec in codecs.items():
+                result[name].update(asyncio.run(
+                    redis_bytes(args.redis_url, messages, wrap=True, codec=codec,
+                                keyframe_interval=args.keyframe_interval)))
+        results[f"{turns}_turns"] = result
+        print(f"✅ {turns} turns: json {result['json']['bytes_per_checkpoint']} B, "
+              f"zstd {result['zstd']['bytes_per_checkpoint']} B, "
+              f"zstd+dict {result['zstd_dict']['bytes_per_checkpoint']} B per checkpoint")
+
+    print(json.dumps({
+        "dictionary_bytes": len(dictionary),
+        "level": args.level,
+        "keyframe_interval": args.keyframe_interval,
+        "results": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# File: benchmarks/bench_llm_clients.py
+"""
+Compares per-request overhead of building a fresh ChatGroq for every call
+(the old behaviour) against the shared, pooled client from the registry.
+
+Runs fully offline against a local OpenAI-compatible stub server that counts
+the TCP connections it accepts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_llm_clients [--requests 200]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        body = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def _run(label, get_model, n_requests, server):
+    server.connections = 0
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        get_model().invoke("hi")
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": label,
+        "requests": n_requests,
+        "connections": server.connections,
+        "total_s": round(elapsed, 4),
+        "per_request_ms": round(elapsed / n_requests * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GROQ_API_BASE"] = server.url
+
+    from langchain_groq import ChatGroq
+    from src.LLMs.groq_llm import GroqLLM
+    from src.LLMs.client_registry import clear_registry
+
+    def fresh_model():
+        return ChatGroq(model="stub", api_key="stub", temperature=0.7, max_tokens=1024)
+
+    pooled = GroqLLM("stub", "stub")
+
+    try:
+        results = [
+            _run("fresh client per call", fresh_model, args.requests, server),
+            _run("registry (pooled)", pooled.get_llm_model, args.requests, server),
+        ]
+    finally:
+        clear_registry()
+        server.shutdown()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# File: benchmarks/bench_ollama_residency.py
+"""
+First-request latency with and without the Ollama residency manager.
+
+Runs fully offline against FakeOllamaServer, where loading a model takes
+--load-delay seconds:
+
+    cold       the model is not loaded; the first chat pays the load
+    preloaded  the manager preloaded it at startup
+    switching  alternating between two models with OLLAMA_MAX_LOADED_MODELS=1
+               (every switch reloads) and with room for both
+
+Usage (from backend/):
+    python -m benchmarks.bench_ollama_residency [--load-delay 2] [--switches 6]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from langchain_core.messages import HumanMessage
+from benchmarks.fakes import FakeOllamaServer
+
+
+async def first_request(server, preload: bool) -> float:
+    from src.LLMs.ollama_residency import OllamaResidencyManager, ResidentChatModel
+    from langchain_ollama import ChatOllama
+
+    manager = OllamaResidencyManager(base_url=server.url, preload=["bench"] if preload else [])
+    if preload:
+        await manager.load("bench", "preload")
+    model = ResidentChatModel(model=ChatOllama(model="bench", base_url=server.url, keep_alive=manager.keep_alive),
+                              manager=manager, model_name="bench")
+    start = time.perf_counter()
+    await model.ainvoke([HumanMessage("hello")])
+    elapsed = time.perf_counter() - start
+    await manager.unload("bench")
+    await manager.stop()
+    return elapsed
+
+
+async def switching(server, max_loaded: int, switches: int) -> dict:
+    from src.LLMs.ollama_residency import OllamaResidencyManager
+
+    manager = OllamaResidencyManager(base_url=server.url, preload=[], max_loaded=max_loaded)
+    loads_before = server.loads
+    start = time.perf_counter()
+    for index in range(switches):
+        async with manager.slot("model-a" if index % 2 == 0 else "model-b"):
+            pass
+    elapsed = time.perf_counter() - start
+    for model in list(manager.stats()["resident"]):
+        await manager.unload(model)
+    await manager.stop()
+    return {"seconds": round(elapsed, 3), "loads": server.loads - loads_before}
+
+
+async def run(args) -> dict:
+    server = FakeOllamaServer(load_delay=args.load_delay).start()
+    os.environ["OLLAMA_HOST"] = server.url
+    try:
+        return {
+            "cold_first_request_s": round(await first_request(server, preload=False), 3),
+            "preloaded_first_request_s": round(await first_request(server, preload=True), 3),
+            "switching_max_loaded_1": await switching(server, 1, args.switches),
+            "switching_max_loaded_2": await switching(server, 2, args.switches),
+        }
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama residency benchmark against a fake Ollama server")
+    parser.add_argument("--load-delay", type=float, default=2.0, help="Fake model load time (s)")
+    parser.add_argument("--switches", type=int, default=6, help="Model switches in the switching scenario")
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# File: benchmarks/bench_startup.py
+"""
+API cold start: import time of main.py and time until the server is live
+and ready.
+
+    import      `python -X importtime -c "import main"`: total import time
+                of main, its slowest direct imports, and which heavy
+                modules (provider SDKs, LangGraph, numpy) got loaded
+    startup     starts `uvicorn main:app` and polls /health (live) and
+                /ready (Redis connected or fallen back to memory)
+
+Runs offline: by default REDIS_URL points at a closed port, so readiness
+measures the in-memory fallback. Pass --redis-url to measure a real Redis.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 5] [--redis-url redis://localhost:6379]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules main.py should only load on first use (or in the background)
+WATCHED_MODULES = [
+    "langchain_groq", "langchain_ollama", "langchain_tavily", "langgraph.graph",
+    "langgraph.checkpoint.redis", "numpy", "src.graph.graph_builder"
+]
+
+
+def environment(redis_url: str) -> dict:
+    env = dict(os.environ)
+    env["REDIS_URL"] = redis_url
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def parse_importtime(stderr: str) -> list:
+    """Returns (module, self_us, cumulative_us, depth) per line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure_imports(runs: int, env: dict, top: int) -> dict:
+    totals, slowest = [], {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                                cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+        rows = parse_importtime(result.stderr)
+        totals.append(next(cumulative for name, _, cumulative, _ in rows if name == "main") / 1e6)
+        # Depth 1: the modules main imports directly
+        for name, _self_us, cumulative, depth in rows:
+            if depth == 1:
+                slowest.setdefault(name, []).append(cumulative / 1e6)
+
+    loaded = subprocess.run(
+        [sys.executable, "-c",
+         f"import json, sys, main; print(json.dumps(sorted(set({WATCHED_MODULES!r}) & set(sys.modules))))"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    ranked = sorted(((name, statistics.median(times)) for name, times in slowest.items()),
+                    key=lambda item: item[1], reverse=True)
+    return {
+        "import_main_s": round(statistics.median(totals), 3),
+        "import_main_runs_s": [round(total, 3) for total in totals],
+        "slowest_direct_imports_s": {name: round(seconds, 3) for name, seconds in ranked[:top]},
+        "watched_modules_loaded": json.loads(loaded.stdout.strip().splitlines()[-1])
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_startup(env: dict, timeout: float) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while ready is None and time.perf_counter() - start < timeout:
+                try:
+                    if live is None and client.get("/health").status_code == 200:
+                        live = time.perf_counter() - start
+                    if live is not None and client.get("/ready").status_code == 200:
+                        ready = time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "time_to_live_s": round(live, 3) if live is not None else None,
+        "time_to_ready_s": round(ready, 3) if ready is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API import time and time-to-ready")
+    parser.add_argument("--runs", type=int, default=5, help="Import and startup runs (medians are reported)")
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:1", help="Redis for the startup runs")
+    parser.add_argument("--top", type=int, default=8, help="Slowest direct imports to list")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up on readiness after (s)")
+    args = parser.parse_args()
+
+    env = environment(args.redis_url)
+    startups = [measure_startup(env, args.timeout) for _ in range(args.runs)]
+
+    def median(key):
+        values = [run[key] for run in startups if run[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    print(json.dumps({
+        **measure_imports(args.runs, env, args.top),
+        "time_to_live_s": median("time_to_live_s"),
+        "time_to_ready_s": median("time_to_ready_s"),
+        "startup_runs": startups
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
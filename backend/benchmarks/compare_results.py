@@ -0,0 +1,80 @@
+# File: benchmarks/compare_results.py
+"""
+Compares two load_test result files and flags regressions.
+
+Exits with status 1 when any tracked metric got worse by more than
+--threshold (relative), so it can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.compare_results <baseline.json> <candidate.json> [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+# (path into the results, True if higher is better)
+METRICS = [
+    (("latency", "chat", "p50_ms"), False),
+    (("latency", "chat", "p95_ms"), False),
+    (("latency", "chat", "p99_ms"), False),
+    (("latency", "approve", "p95_ms"), False),
+    (("latency", "turn", "p95_ms"), False),
+    (("totals", "throughput_turns_per_s"), True),
+    (("totals", "storage_bytes_per_thread"), False),
+    (("totals", "rss_growth_mb"), False),
+    (("totals", "errors"), False),
+]
+
+
+def _get(results: dict, path):
+    value = results
+    for key in path:
+        value = value.get(key, {}) if isinstance(value, dict) else {}
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    """Returns (rows, regressions) for the tracked metrics"""
+    rows, regressions = [], []
+    for path, higher_is_better in METRICS:
+        name = ".".join(path)
+        old, new = _get(baseline, path), _get(candidate, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = -change if higher_is_better else change
+        regressed = worse > threshold
+        rows.append((name, old, new, change, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('git_commit')} ({baseline.get('timestamp')}) -> "
+          f"candidate {candidate.get('git_commit')} ({candidate.get('timestamp')})")
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    for name, old, new, change, regressed in rows:
+        flag = "❌" if regressed else "✅"
+        print(f"{flag} {name:<36} {old:>12} -> {new:>12}  ({change:+.1%})")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
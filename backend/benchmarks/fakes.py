@@ -0,0 +1,276 @@
+# File: benchmarks/fakes.py
+"""
+Deterministic offline stand-ins used by the load tests and benchmarks: a
+scripted chat model, a fake Tavily search tool, a fake Twilio Messages API
+server and a fake Ollama server.
+
+The fake model decides what to do from the conversation itself, so many
+threads can run concurrently without sharing a script:
+
+    "search: <query>"     -> tavily_search tool call, then a final answer
+    "whatsapp: <text>"    -> send_whatsapp_message tool call (needs approval)
+    anything else         -> a plain answer of `reply_words` words
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Type
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model with a fixed per-call delay"""
+
+    delay: float = 0.0
+    reply_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        conversation = [m for m in messages if not isinstance(m, SystemMessage)]
+        last = conversation[-1] if conversation else None
+        # Unique within a thread, so WhatsApp idempotency keys never collide
+        call_id = f"call_{len(conversation)}"
+
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Here is what I found: {str(last.content)[:200]}")
+
+        text = last.content if isinstance(last, HumanMessage) and isinstance(last.content, str) else ""
+        if text.startswith("search:"):
+            return AIMessage(content="", tool_calls=[{
+                "name": "tavily_search",
+                "args": {"query": text[len("search:"):].strip()},
+                "id": call_id
+            }])
+        if text.startswith("whatsapp:"):
+            return AIMessage(content="", tool_calls=[{
+                "name": "send_whatsapp_message",
+                "args": {"message": text[len("whatsapp:"):].strip(), "phone_number": "+15550001111"},
+                "id": call_id
+            }])
+        words = (text.split() or ["ok"]) * self.reply_words
+        return AIMessage(content=" ".join(words[:self.reply_words]))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+class FakeLLM:
+    """Drop-in for GroqLLM / LlamaOllamaLLM backed by FakeChatModel"""
+
+    def __init__(self, model_name: str = "fake", delay: float = 0.0, reply_words: int = 40):
+        self.model_name = model_name
+        self.model = FakeChatModel(delay=delay, reply_words=reply_words)
+
+    def get_llm_model(self):
+        return self.model
+
+    def invoke(self, messages):
+        return self.model.invoke(messages)
+
+    async def ainvoke(self, messages):
+        return await self.model.ainvoke(messages)
+
+
+class _SearchInput(BaseModel):
+    query: str = Field(description="Search query")
+
+
+class FakeTavilySearch(BaseTool):
+    """Stands in for TavilySearch: fixed latency, canned results"""
+
+    name: str = "tavily_search"
+    description: str = "A search engine optimized for comprehensive, accurate, and trusted results."
+    args_schema: Optional[Type[BaseModel]] = _SearchInput
+    delay: float = 0.0
+    max_results: int = 2
+
+    def _results(self, query: str) -> dict:
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"https://example.com/{i}",
+                    "content": f"Canned search result {i} about {query}. " * 5
+                }
+                for i in range(self.max_results)
+            ]
+        }
+
+    def _run(self, query: str, run_manager=None) -> dict:
+        time.sleep(self.delay)
+        return self._results(query)
+
+    async def _arun(self, query: str, run_manager=None) -> dict:
+        await asyncio.sleep(self.delay)
+        return self._results(query)
+
+
+class _TwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.sent += 1
+            sid = f"SM{self.server.sent:032d}"
+        body = json.dumps({"sid": sid, "status": "queued"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    """Local Twilio Messages API; point TWILIO_API_BASE at `url`"""
+
+    daemon_threads = True
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _TwilioHandler)
+        self.delay = delay
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _send_json(self, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            self._send_json({"models": self.server.resident_models()})
+        else:
+            self._send_json({"models": []})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "")
+        if request.get("keep_alive") == 0:
+            self.server.unload(model)
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "unload"})
+            return
+
+        self.server.ensure_loaded(model, request.get("options") or {})
+        if self.path == "/api/generate":
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True})
+            return
+
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            time.sleep(self.server.delay)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+        words = ["ok"] * self.server.reply_words
+        lines = [{"model": model, "created_at": _now(), "message": {"role": "assistant", "content": w + " "},
+                  "done": False} for w in words]
+        lines.append({"model": model, "created_at": _now(), "message": {"role": "assistant", "content": ""},
+                      "done": True, "done_reason": "stop", "prompt_eval_count": 10, "eval_count": len(words)})
+        if request.get("stream", True):
+            self._send_json(b"".join(json.dumps(line).encode() + b"\n" for line in lines),
+                            content_type="application/x-ndjson")
+        else:
+            final = dict(lines[-1], message={"role": "assistant", "content": " ".join(words)})
+            self._send_json(final)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Local Ollama API (/api/generate, /api/chat, /api/ps); point OLLAMA_HOST
+    at `url`. Loading a model takes `load_delay` seconds, as does reloading
+    it with different options; models expire after their keep_alive.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, load_delay: float = 0.5, delay: float = 0.0, reply_words: int = 5):
+        super().__init__(("127.0.0.1", 0), _OllamaHandler)
+        self.load_delay = load_delay
+        self.delay = delay
+        self.reply_words = reply_words
+        self.loaded = {}  # model -> options
+        self.loads = 0
+        self.unloads = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def ensure_loaded(self, model: str, options: dict):
+        # One model loads at a time, like Ollama's scheduler
+        with self._load_lock:
+            if self.loaded.get(model) == options:
+                return
+            time.sleep(self.load_delay)
+            with self.lock:
+                self.loaded[model] = options
+                self.loads += 1
+
+    def unload(self, model: str):
+        with self.lock:
+            if self.loaded.pop(model, None) is not None:
+                self.unloads += 1
+
+    def resident_models(self) -> list:
+        with self.lock:
+            return [{"name": model, "model": model, "size": 1} for model in self.loaded]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
@@ -0,0 +1,275 @@
+# File: benchmarks/load_test.py
+"""
+Offline load test of the FastAPI app: drives N concurrent threads through
+/chat and /approve for a number of turns and records latency percentiles,
+throughput, checkpoint bytes per turn and RSS growth as conversations lengthen.
+
+The real app (main.py, GraphBuilder, checkpointer, caches, delivery queue)
+runs in-process; only the edges are faked (see benchmarks/fakes.py). Without
+--redis-url the checkpointer falls back to the in-memory saver and checkpoint
+size is measured from its serialized blobs; with --redis-url it is measured
+from Redis `used_memory`.
+
+Usage (from backend/):
+    python -m benchmarks.load_test [--threads 20] [--turns 12] [--llm-delay 0.05]
+    python -m benchmarks.compare_results <baseline.json> <candidate.json>
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import time
+from datetime import datetime
+
+DEFAULT_MIX = "chat,search,chat,whatsapp"
+TOPICS = ["weather in paris", "python 3.13 release", "langgraph checkpoints", "redis streams", "fastapi tips"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(values, p: float) -> float:
+    """Linear-interpolated percentile of `values` (p in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(values) -> dict:
+    """p50/p95/p99/max in milliseconds"""
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0
+    }
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def turn_message(kind: str, thread_index: int, turn: int) -> str:
+    if kind == "search":
+        return f"search: {TOPICS[(thread_index + turn) % len(TOPICS)]}"
+    if kind == "whatsapp":
+        return f"whatsapp: summary of turn {turn}"
+    return f"Tell me something interesting about topic {turn} for thread {thread_index}"
+
+
+def configure_environment(args, twilio_url: str):
+    """Point every external dependency at a local fake before main.py is imported"""
+    os.environ["REDIS_URL"] = args.redis_url or "redis://127.0.0.1:1"
+    os.environ["SEARCH_CACHE_REDIS"] = "true" if args.redis_url else "false"
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+    os.environ["TWILIO_ACCOUNT_SID"] = "ACbenchmark"
+    os.environ["TWILIO_AUTH_TOKEN"] = "benchmark"
+    os.environ["TWILIO_WHATSAPP_FROM"] = "whatsapp:+15550000000"
+    os.environ["TWILIO_API_BASE"] = twilio_url
+    os.environ["TWILIO_RATE_PER_SEC"] = str(args.twilio_rate)
+    os.environ["TWILIO_RATE_BURST"] = str(max(1, int(args.twilio_rate)))
+
+
+def install_fakes(args):
+    """Swap the LLM factory and Tavily for the deterministic fakes"""
+    import src.graph.graph_cache as graph_cache
+    import src.tools.search_tool as search_tool
+    from benchmarks.fakes import FakeLLM, FakeTavilySearch
+
+    graph_cache.create_llm = lambda llm_provider, model_name, *_args, **_kwargs: FakeLLM(
+        model_name, delay=args.llm_delay, reply_words=args.reply_words
+    )
+    search_tool.TavilySearch = lambda **kwargs: FakeTavilySearch(delay=args.search_delay, **kwargs)
+
+
+async def run_thread_turn(client, thread_id: str, message: str, latencies: dict, errors: list):
+    """One user turn: /chat, plus /approve when the turn stops for approval"""
+    turn_start = time.perf_counter()
+
+    start = time.perf_counter()
+    response = await client.post("/chat", json={"message": message, "thread_id": thread_id})
+    latencies["chat"].append(time.perf_counter() - start)
+    if response.status_code != 200:
+        errors.append({"endpoint": "/chat", "status": response.status_code, "detail": response.text[:200]})
+        return
+
+    if response.json().get("pending_approval"):
+        start = time.perf_counter()
+        response = await client.post("/approve", json={"thread_id": thread_id, "approved": True})
+        latencies["approve"].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append({"endpoint": "/approve", "status": response.status_code, "detail": response.text[:200]})
+            return
+
+    latencies["turn"].append(time.perf_counter() - turn_start)
+
+
+async def run(args) -> dict:
+    import httpx
+    from benchmarks.fakes import FakeTwilioServer
+
+    twilio = FakeTwilioServer(delay=args.twilio_delay).start()
+    configure_environment(args, twilio.url)
+    install_fakes(args)
+
+    import main
+    from src.checkpoint.retention import memory_saver_bytes
+    from src.tools.search_cache import get_search_cache
+    from src.tools.whatsapp_delivery import get_delivery_queue
+
+    await main.startup_event()
+    await main.wait_ready()
+    checkpointer = main.redis_checkpointer
+    redis_client = None
+    if args.redis_url:
+        from redis.asyncio import Redis as AsyncRedis
+        redis_client = AsyncRedis.from_url(args.redis_url.replace("rediss://", "redis://", 1))
+
+    async def storage_bytes() -> int:
+        if redis_client is not None:
+            return (await redis_client.info("memory"))["used_memory"]
+        if hasattr(checkpointer, "blobs"):
+            return memory_saver_bytes(checkpointer)
+        return 0
+
+    mix = args.mix.split(",")
+    thread_ids = [f"bench-{os.getpid()}-{i}" for i in range(args.threads)]
+    latencies = {"chat": [], "approve": [], "turn": []}
+    errors = []
+    rounds = []
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for thread_id in thread_ids:
+            await client.post("/initialize", json={
+                "llm_provider": "Groq",
+                "model_name": "fake",
+                "groq_api_key": "benchmark",
+                "usecase": args.usecase,
+                "thread_id": thread_id
+            })
+
+        rss_start = rss_bytes()
+        bytes_start = await storage_bytes()
+        bytes_before = bytes_start
+        elapsed = 0.0
+
+        for turn in range(args.turns):
+            kind = mix[turn % len(mix)]
+            round_latencies = {"chat": [], "approve": [], "turn": []}
+            round_start = time.perf_counter()
+            await asyncio.gather(*(
+                run_thread_turn(client, thread_id, turn_message(kind, i, turn), round_latencies, errors)
+                for i, thread_id in enumerate(thread_ids)
+            ))
+            round_elapsed = time.perf_counter() - round_start
+            elapsed += round_elapsed
+            for name, values in round_latencies.items():
+                latencies[name].extend(values)
+
+            bytes_now = await storage_bytes()
+            rounds.append({
+                "turn": turn + 1,
+                "kind": kind,
+                "turn_p50_ms": round(percentile(round_latencies["turn"], 50) * 1000, 2),
+                "turn_p95_ms": round(percentile(round_latencies["turn"], 95) * 1000, 2),
+                "round_s": round(round_elapsed, 4),
+                "storage_bytes_per_thread": round((bytes_now - bytes_start) / args.threads),
+                "storage_bytes_per_turn": round((bytes_now - bytes_before) / args.threads),
+                "rss_mb": round(rss_bytes() / 1024 / 1024, 2)
+            })
+            bytes_before = bytes_now
+            print(f"   turn {turn + 1:>3} ({kind:<8}) p50 {rounds[-1]['turn_p50_ms']:>8} ms  "
+                  f"p95 {rounds[-1]['turn_p95_ms']:>8} ms  {rounds[-1]['storage_bytes_per_thread']:>9} B/thread  "
+                  f"{rounds[-1]['rss_mb']:>8} MB")
+
+        # Let queued WhatsApp sends finish so every run delivers the same work
+        queue = get_delivery_queue()
+        if queue is not None and not await queue.join(timeout=30):
+            errors.append({"endpoint": "whatsapp", "status": None, "detail": "delivery queue did not drain"})
+
+        caches = {
+            "graph": main.graph_cache.stats(),
+            "search": get_search_cache().stats()
+        }
+
+    await main.shutdown_event()
+    if redis_client is not None:
+        await redis_client.aclose()
+    twilio.shutdown()
+
+    turns = len(latencies["turn"])
+    rss_end = rss_bytes()
+    return {
+        "benchmark": "load_test",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "config": vars(args),
+        "checkpointer": type(checkpointer).__name__,
+        "totals": {
+            "turns": turns,
+            "errors": len(errors),
+            "elapsed_s": round(elapsed, 4),
+            "throughput_turns_per_s": round(turns / elapsed, 2) if elapsed else 0.0,
+            "whatsapp_sent": twilio.sent,
+            "storage_bytes_per_thread": rounds[-1]["storage_bytes_per_thread"] if rounds else 0,
+            "rss_growth_mb": round((rss_end - rss_start) / 1024 / 1024, 2)
+        },
+        "latency": {name: summarize_latencies(values) for name, values in latencies.items()},
+        "rounds": rounds,
+        "caches": caches,
+        "errors": errors[:20]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20, help="Concurrent conversation threads")
+    parser.add_argument("--turns", type=int, default=12, help="User turns per thread")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated turn kinds: chat, search, whatsapp")
+    parser.add_argument("--usecase", default="Chatbot With Web")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="Fake LLM latency per call (s)")
+    parser.add_argument("--reply-words", type=int, default=40, help="Words per fake LLM answer")
+    parser.add_argument("--search-delay", type=float, default=0.1, help="Fake Tavily latency (s)")
+    parser.add_argument("--twilio-delay", type=float, default=0.05, help="Fake Twilio latency (s)")
+    parser.add_argument("--twilio-rate", type=float, default=100, help="WhatsApp sends per second")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis instead of the in-memory saver")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    print(f"🔄 Load test: {args.threads} threads x {args.turns} turns, mix={args.mix}")
+    results = asyncio.run(run(args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({"totals": results["totals"], "latency": results["latency"]}, indent=2))
+    print(f"✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
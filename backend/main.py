@@ -1,12 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import asyncio
+import importlib
+import json
+import os
+import time
+import uuid
 import uvicorn
-from src.graph.graph_builder import GraphBuilder
-from src.LLMs.ollama_llm import LlamaOllamaLLM
-from src.LLMs.groq_llm import GroqLLM
+from src.graph.graph_cache import GraphCache
+from src.LLMs.client_registry import aclear_registry
+from src.LLMs.provider_errors import RateLimitExceeded, ProviderUnavailableError, rate_limit_info
 from src.checkpoint.redis_checkpoint import RedisCheckpointer
+from src.checkpoint.thread_registry import ThreadRegistry, ThreadBusyError, ThreadSecretMissingError
+from src.checkpoint.retention import CheckpointCompactor
+from src.checkpoint.write_behind import WriteBehindCheckpointer
+from src.tools.search_cache import get_search_cache, connect_search_cache
+from src.tools.whatsapp_delivery import start_delivery_queue, stop_delivery_queue, get_delivery_queue
+from src.graph.batch import abatch_chat, get_max_concurrency
+from src.jobs.job_queue import JobQueue
+from src.graph.stream_events import STREAM_MODES, to_stream_events, get_pending_approval, get_bot_response
+from src.nodes.parallel_tool_node import pending_tool_calls, needs_approval
+from src.monitoring.metrics import registry, timed
+from src.monitoring.instrumentation import get_callback_handler, instrument_checkpointer, cache_collector
+from src.api.payloads import (
+    message_to_dict, messages_after, paginate_messages,
+    make_etag, etag_matches, wants_msgpack, encode_response, not_modified
+)
 
 app = FastAPI(title="LangGraph Chatbot API")
 
@@ -17,29 +41,86 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# Global state for graphs (in production, use proper session management)
-graphs = {}
+# Compress large JSON/msgpack bodies for clients sending Accept-Encoding: gzip
+# (Server-Sent Events are never compressed)
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1000")))
+
+# Compiled graphs are shared across threads; per-thread settings live in Redis
+# Long-term memory is enabled by setting MEMORY_STORE_DIR,
+# the semantic response cache by setting RESPONSE_CACHE_ENABLED=true
+memory_store = None
+if os.getenv("MEMORY_STORE_DIR"):
+    from src.memory.memory_store import MemoryStore
+    memory_store = MemoryStore(os.environ["MEMORY_STORE_DIR"])
+response_cache = None
+if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+    from src.memory.response_cache import SemanticResponseCache
+    response_cache = SemanticResponseCache()
+graph_cache = GraphCache(memory_store=memory_store, response_cache=response_cache)
+thread_registry = ThreadRegistry()
+# Turns sent with "queue": true (or every turn with CHAT_JOB_QUEUE=true) run
+# on the worker pool (python worker.py) instead of in the API process
+job_queue = JobQueue()
 redis_checkpointer = None
+checkpoint_compactor = None
+# Redis connects in the background; /ready answers 200 (and requests that
+# need a checkpointer proceed) once it is done
+startup_task = None
+# Background summaries in flight (thread_id -> task), at most one per thread
+summary_tasks = {}
+
+# Imported in a background thread during startup (STARTUP_PRELOAD=true), so
+# the first graph build does not pay for them; provider SDKs stay lazy
+# (see src/LLMs/provider_registry.py)
+PRELOAD_MODULES = ("src.graph.graph_builder", "src.LLMs.ollama_residency")
+
+# Metrics are on by default (METRICS_ENABLED=false turns them off);
+# OTEL_ENABLED=true adds OpenTelemetry spans per thread
+metrics_handler = get_callback_handler()
+HTTP_DURATION = registry.histogram(
+    "chatbot_http_request_duration_seconds",
+    "Duration of HTTP requests",
+    labels=("method", "route", "status")
+)
+registry.add_collector(cache_collector({
+    "graph": graph_cache,
+    "search": get_search_cache,
+    "response": response_cache,
+    "checkpoint": lambda: hot_checkpoints()
+}))
 
 # Pydantic models
+class FallbackProvider(BaseModel):
+    llm_provider: str  # "Ollama" or "Groq"
+    model_name: str
+
 class InitializeRequest(BaseModel):
     llm_provider: str  # "Ollama" or "Groq"
     model_name: str
     groq_api_key: Optional[str] = None
     usecase: str = "Chatbot With Web"
     thread_id: str = "thread_1"
+    user_id: Optional[str] = None  # Shares long-term memory across a user's threads
+    fallbacks: Optional[List[FallbackProvider]] = None  # Tried in order when the primary fails
+    hedge: bool = False  # Race a fallback when the primary is slower than its p95
 
 class ChatRequest(BaseModel):
     message: str
     thread_id: str = "thread_1"
+    delta: bool = False  # Return only the messages of this turn
+    queue: Optional[bool] = None  # Run as a background job (defaults to CHAT_JOB_QUEUE)
 
 class ApprovalRequest(BaseModel):
     thread_id: str
     approved: bool
+    delta: bool = False  # Return only the messages created by the resumed run
+    queue: Optional[bool] = None  # Run as a background job (defaults to CHAT_JOB_QUEUE)
 
 class Message(BaseModel):
+    id: Optional[str] = None
     role: str
     content: str
 
@@ -48,43 +129,152 @@ class ChatResponse(BaseModel):
     pending_approval: Optional[Dict[str, Any]] = None
     messages: List[Message]
 
+class BatchChatItem(BaseModel):
+    thread_id: str
+    message: str
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+    max_concurrency: Optional[int] = None  # Defaults to BATCH_MAX_CONCURRENCY
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize Redis checkpointer on startup"""
-    global redis_checkpointer
-    redis_checkpointer = RedisCheckpointer().get_checkpointer()
-    print("✅ FastAPI server started with Redis checkpointer")
+    """Start connecting to Redis in the background; the server accepts requests right away"""
+    global startup_task
+    start_delivery_queue(on_status=record_delivery_status)
+    startup_task = asyncio.create_task(connect_backends())
+    print("✅ FastAPI server started (connecting to Redis)")
+
+async def connect_backends():
+    """Connect the checkpointer, thread registry, job queue and search cache, and preload the graph stack"""
+    global redis_checkpointer, checkpoint_compactor
+    start = time.perf_counter()
+    preload = os.getenv("STARTUP_PRELOAD", "true").lower() == "true"
+    checkpointer, *_ = await asyncio.gather(
+        RedisCheckpointer().get_async_checkpointer(),
+        thread_registry.connect(),
+        job_queue.connect(),
+        asyncio.to_thread(connect_search_cache),
+        asyncio.to_thread(preload_modules) if preload else asyncio.sleep(0)
+    )
+    if metrics_handler is not None:
+        instrument_checkpointer(checkpointer)
+    # Prune superseded checkpoints of active threads in the background
+    checkpoint_compactor = CheckpointCompactor(checkpointer)
+    checkpoint_compactor.start()
+    # Preload and keep warm the configured Ollama models
+    from src.LLMs.ollama_residency import start_residency_manager
+    start_residency_manager()
+    redis_checkpointer = checkpointer
+    # Turns end with their checkpoints in Redis (see src/checkpoint/write_behind.py)
+    thread_registry.before_release = flush_checkpoints
+    print(f"✅ Ready in {time.perf_counter() - start:.2f}s")
+
+async def flush_checkpoints(thread_id: str):
+    """Wait until a thread's checkpoints are stored (a no-op without CHECKPOINT_WRITE_BEHIND)"""
+    flush = getattr(redis_checkpointer, "aflush", None)
+    if flush is not None:
+        await flush(thread_id)
+
+def preload_modules():
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+async def wait_ready(timeout: float = None):
+    """
+    Wait for startup to finish connecting to Redis; answers 503 with
+    Retry-After if it takes longer than STARTUP_READY_WAIT_SECONDS
+    """
+    if startup_task is None:
+        raise HTTPException(status_code=503, detail="Server is starting", headers={"Retry-After": "1"})
+    if timeout is None:
+        timeout = float(os.getenv("STARTUP_READY_WAIT_SECONDS", "30"))
+    try:
+        await asyncio.wait_for(asyncio.shield(startup_task), timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server is starting", headers={"Retry-After": "1"})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close Redis checkpointer and pooled LLM clients on shutdown"""
+    if startup_task is not None and not startup_task.done():
+        startup_task.cancel()
+    if checkpoint_compactor is not None:
+        await checkpoint_compactor.stop()
+    # Skipped summaries are picked up after the thread's next turn
+    for task in list(summary_tasks.values()):
+        task.cancel()
+    await stop_delivery_queue()
+    from src.LLMs.ollama_residency import stop_residency_manager
+    await stop_residency_manager()
+    await RedisCheckpointer().aclose()
+    await thread_registry.close()
+    await job_queue.close()
+    await aclear_registry()
+    if memory_store is not None:
+        memory_store.close()
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """Time every request, labelled by route template rather than raw path"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_DURATION.observe(
+        time.perf_counter() - start,
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code)
+    )
+    return response
 
 @app.get("/")
 async def root():
     return {"message": "LangGraph Chatbot API", "status": "running"}
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving (Redis may still be connecting)"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once Redis is connected (or fell back to memory), 503 before"""
+    if startup_task is None or not startup_task.done():
+        return JSONResponse(status_code=503, content={"status": "starting"}, headers={"Retry-After": "1"})
+    if startup_task.cancelled() or startup_task.exception() is not None:
+        return JSONResponse(status_code=503, content={"status": "failed"})
+    return {"status": "ready", "checkpointer": type(redis_checkpointer).__name__,
+            "job_queue": job_queue.enabled}
+
 @app.post("/initialize")
 async def initialize_chatbot(request: InitializeRequest):
     """Initialize a chatbot instance with specified configuration"""
+    await wait_ready()
     try:
         # Validate Groq API key if needed
-        if request.llm_provider == "Groq" and not request.groq_api_key:
+        fallbacks = ([f.model_dump() for f in request.fallbacks] if request.fallbacks is not None
+                     else get_default_fallbacks())
+        providers = [request.llm_provider] + [f["llm_provider"] for f in fallbacks]
+        if "Groq" in providers and not request.groq_api_key:
             raise HTTPException(status_code=400, detail="Groq API key is required")
         
-        # Create LLM instance
-        if request.llm_provider == "Ollama":
-            llm = LlamaOllamaLLM(request.model_name)
-        else:
-            llm = GroqLLM(request.model_name, request.groq_api_key)
-        
-        # Build graph
-        builder = GraphBuilder(llm)
-        graph = builder.setup_graph(request.usecase, redis_checkpointer)
-        
-        # Store graph (use thread_id as key)
-        graphs[request.thread_id] = {
-            "graph": graph,
+        settings = {
             "llm_provider": request.llm_provider,
             "model_name": request.model_name,
-            "usecase": request.usecase
+            "groq_api_key": request.groq_api_key,
+            "usecase": request.usecase,
+            "user_id": request.user_id,
+            "fallbacks": fallbacks,
+            "hedge": request.hedge
         }
         
+        # Build (or reuse) the shared graph for this configuration
+        await build_graph(settings)
+        
+        # Persist thread settings so any worker can serve this thread
+        await thread_registry.save(request.thread_id, settings)
+        
         return {
             "status": "success",
             "message": f"{request.usecase} initialized successfully with {request.llm_provider}",
@@ -95,193 +285,715 @@ async def initialize_chatbot(request: InitializeRequest):
         raise HTTPException(status_code=500, detail=f"Error initializing chatbot: {str(e)}")
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """Send a message and get a response"""
     try:
         # Check if graph exists for this thread
-        if request.thread_id not in graphs:
+        graph, config = await get_thread_graph(request.thread_id)
+        if graph is None:
             raise HTTPException(status_code=400, detail="Chatbot not initialized. Please initialize first.")
         
-        graph_data = graphs[request.thread_id]
-        graph = graph_data["graph"]
-        
-        # Prepare state
-        config = {"configurable": {"thread_id": request.thread_id}}
+        if use_job_queue(request.queue):
+            return await enqueue_job("chat", {
+                "thread_id": request.thread_id,
+                "message": request.message,
+                "message_id": str(uuid.uuid4()),
+                "delta": request.delta
+            })
         
-        # Get current state to build on existing messages
-        try:
-            snapshot = graph.get_state(config)
-            existing_messages = snapshot.values.get("messages", []) if snapshot.values else []
-        except:
-            existing_messages = []
+        async with thread_registry.lock(request.thread_id):
+            # Send only the new user message; the add_messages reducer appends it
+            # to the history already stored in the checkpoint. The explicit id
+            # marks where this turn starts for delta responses.
+            from langchain_core.messages import HumanMessage
+            human_message = HumanMessage(content=request.message, id=str(uuid.uuid4()))
+            state = {
+                "messages": [human_message]
+            }
         
-        # Add user message
-        from langchain_core.messages import HumanMessage
-        state = {
-            "messages": existing_messages + [HumanMessage(content=request.message)]
-        }
+            # Stream through graph
+            final_state = None
+            async for event in graph.astream(state, config, stream_mode="values"):
+                final_state = event
+            schedule_summary(graph, config)
         
-        # Stream through graph
-        final_state = None
-        for event in graph.stream(state, config, stream_mode="values"):
-            final_state = event
+            # Check for interrupts (human approval needed)
+            snapshot = await graph.aget_state(config)
+            messages = snapshot.values.get("messages", [])
         
-        # Check for interrupts (human approval needed)
-        snapshot = graph.get_state(config)
+            if request.delta:
+                response_messages = messages_after(messages, human_message.id, inclusive=True)
+            else:
+                response_messages = convert_messages_to_dict(messages)
         
-        if snapshot.next and "human_approval" in snapshot.next:
-            # Pending approval
-            last_message = snapshot.values["messages"][-1]
-            
-            if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-                tool_call = last_message.tool_calls[0]
-                
-                return ChatResponse(
+            pending_approval = get_pending_approval(snapshot)
+            if pending_approval:
+                return encode_chat_response(http_request, ChatResponse(
                     response="",
-                    pending_approval={
-                        "tool_call": {
-                            "name": tool_call["name"],
-                            "args": tool_call["args"]
-                        }
-                    },
-                    messages=convert_messages_to_dict(snapshot.values["messages"])
-                )
-        
-        # Normal completion
-        result_state = snapshot.values
-        messages = result_state.get("messages", [])
+                    pending_approval=pending_approval,
+                    messages=response_messages
+                ))
         
-        # Extract assistant response
-        bot_response = ""
-        if messages:
-            for msg in reversed(messages):
-                if hasattr(msg, "type") and msg.type == "ai":
-                    content = msg.content
-                    if content and not (hasattr(msg, "tool_calls") and msg.tool_calls and not content):
-                        bot_response = content
-                        break
+            # Extract assistant response
+            bot_response = get_bot_response(messages)
         
-        return ChatResponse(
-            response=bot_response,
-            pending_approval=None,
-            messages=convert_messages_to_dict(messages)
-        )
+            return encode_chat_response(http_request, ChatResponse(
+                response=bot_response,
+                pending_approval=None,
+                messages=response_messages
+            ))
     
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
+        unavailable = provider_unavailable(e)
+        if unavailable is not None:
+            raise unavailable
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 @app.post("/approve")
-async def approve_action(request: ApprovalRequest):
+async def approve_action(request: ApprovalRequest, http_request: Request):
     """Approve or reject a pending action"""
     try:
-        if request.thread_id not in graphs:
+        graph, config = await get_thread_graph(request.thread_id)
+        if graph is None:
             raise HTTPException(status_code=400, detail="Chatbot not initialized")
         
-        graph = graphs[request.thread_id]["graph"]
-        config = {"configurable": {"thread_id": request.thread_id}}
+        if use_job_queue(request.queue):
+            return await enqueue_job("approve", {
+                "thread_id": request.thread_id,
+                "approved": request.approved,
+                "delta": request.delta
+            })
         
-        if request.approved:
-            # Continue execution
-            for event in graph.stream(None, config, stream_mode="values"):
-                pass
-            
-            snapshot = graph.get_state(config)
-            result_state = snapshot.values
-            messages = result_state.get("messages", [])
+        async with thread_registry.lock(request.thread_id):
+            # Records a rejection (once, even for a retried request) and remembers
+            # the last message the client already has for delta responses
+            last_seen_id = await prepare_approval(graph, config, request.approved, request.delta)
+        
+            if request.approved:
+                # Continue execution
+                async for event in graph.astream(None, config, stream_mode="values"):
+                    pass
+                schedule_summary(graph, config)
             
-            # Extract response
-            bot_response = ""
-            if messages:
-                for msg in reversed(messages):
-                    if hasattr(msg, "type") and msg.type == "ai":
-                        content = msg.content
-                        if content and not (hasattr(msg, "tool_calls") and msg.tool_calls and not content):
-                            bot_response = content
-                            break
+                snapshot = await graph.aget_state(config)
+                result_state = snapshot.values
+                messages = result_state.get("messages", [])
             
-            return {
-                "status": "approved",
-                "response": bot_response,
-                "messages": convert_messages_to_dict(messages)
-            }
-        else:
-            # Reject
-            from langchain_core.messages import AIMessage
+                # Extract response
+                bot_response = get_bot_response(messages)
             
-            graph.update_state(
-                config,
-                {"messages": [AIMessage(content="❌ WhatsApp message was not sent (rejected by user). How else can I help you?")]},
-                as_node="chatbot"
-            )
+                payload = {
+                    "status": "approved",
+                    "response": bot_response,
+                    "messages": messages_after(messages, last_seen_id) if request.delta else convert_messages_to_dict(messages)
+                }
+            else:
+                snapshot = await graph.aget_state(config)
+                messages = snapshot.values.get("messages", [])
             
-            snapshot = graph.get_state(config)
-            messages = snapshot.values.get("messages", [])
-            
-            return {
-                "status": "rejected",
-                "response": "❌ WhatsApp message was not sent (rejected by user). How else can I help you?",
-                "messages": convert_messages_to_dict(messages)
-            }
+                payload = {
+                    "status": "rejected",
+                    "response": "❌ WhatsApp message was not sent (rejected by user). How else can I help you?",
+                    "messages": messages_after(messages, last_seen_id) if request.delta else convert_messages_to_dict(messages)
+                }
+        
+            return encode_response(http_request, payload) if wants_msgpack(http_request) else payload
     
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
+        unavailable = provider_unavailable(e)
+        if unavailable is not None:
+            raise unavailable
         raise HTTPException(status_code=500, detail=f"Error processing approval: {str(e)}")
 
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """
+    Run many (thread_id, message) turns with bounded concurrency and stream
+    the results back as NDJSON: one line per item as it completes (in
+    completion order, with its index in the request), then a summary line
+    with aggregate throughput. Turns of the same thread run in order.
+    """
+    max_items = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=400, detail=f"A batch holds at most {max_items} items")
+    
+    # Resolve each thread's graph once; threads sharing a setup share a graph
+    graphs, errors = {}, {}
+    for thread_id in dict.fromkeys(item.thread_id for item in request.items):
+        try:
+            graphs[thread_id] = await get_thread_graph(thread_id)
+        except HTTPException as e:
+            # One unusable thread fails its own items, not the batch
+            if e.status_code != 400:
+                raise
+            graphs[thread_id], errors[thread_id] = (None, None), e.detail
+    
+    return StreamingResponse(
+        stream_batch_results(request, graphs, errors),
+        media_type="application/x-ndjson"
+    )
+
+async def stream_batch_results(request: BatchChatRequest, graphs: dict, errors: dict = None):
+    """Yields the NDJSON lines of a batch run, one graph at a time"""
+    errors = errors or {}
+    start = time.perf_counter()
+    counts = {"ok": 0, "pending_approval": 0, "error": 0}
+    groups = {}  # id(graph) -> (graph, items)
+    for index, item in enumerate(request.items):
+        graph, config = graphs[item.thread_id]
+        if graph is None:
+            counts["error"] += 1
+            yield json.dumps({"index": index, "thread_id": item.thread_id, "status": "error",
+                              "error": errors.get(item.thread_id,
+                                                  "Chatbot not initialized. Please initialize first.")}) + "\n"
+            continue
+        entry = {"index": index, "thread_id": item.thread_id, "message": item.message, "config": config}
+        groups.setdefault(id(graph), (graph, []))[1].append(entry)
+    
+    for graph, entries in groups.values():
+        async for result in abatch_chat(graph, entries, request.max_concurrency, lock=thread_registry.lock):
+            entry = entries[result["index"]]
+            line = {key: value for key, value in result.items() if key != "state"}
+            line["index"] = entry["index"]
+            if "state" in result:
+                line["messages"] = messages_after(result["state"].get("messages", []), result["message_id"],
+                                                  inclusive=True)
+            counts[result["status"]] += 1
+            if result["status"] == "ok":
+                schedule_summary(graph, entry["config"])
+            yield json.dumps(line, default=str) + "\n"
+    
+    duration = time.perf_counter() - start
+    yield json.dumps({"summary": {
+        "items": len(request.items),
+        **counts,
+        "max_concurrency": get_max_concurrency(request.max_concurrency),
+        "duration_s": round(duration, 3),
+        "items_per_second": round(len(request.items) / duration, 2) if duration else None
+    }}) + "\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Send a message and stream tokens, tool events and interrupts as Server-Sent Events"""
+    graph, config = await get_thread_graph(request.thread_id)
+    if graph is None:
+        raise HTTPException(status_code=400, detail="Chatbot not initialized. Please initialize first.")
+    
+    # Held until the stream finishes (or the client disconnects)
+    lock = await acquire_thread_lock(request.thread_id)
+    
+    # Send only the new user message; the add_messages reducer appends it
+    # to the history already stored in the checkpoint
+    from langchain_core.messages import HumanMessage
+    human_message = HumanMessage(content=request.message, id=str(uuid.uuid4()))
+    state = {"messages": [human_message]}
+    
+    return StreamingResponse(
+        stream_graph_events(
+            graph, state, config,
+            since_id=human_message.id if request.delta else None,
+            include_since=True
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(lock.release)
+    )
+
+@app.post("/approve/stream")
+async def approve_stream(request: ApprovalRequest):
+    """Approve or reject a pending action, streaming the resumed run as Server-Sent Events"""
+    graph, config = await get_thread_graph(request.thread_id)
+    if graph is None:
+        raise HTTPException(status_code=400, detail="Chatbot not initialized")
+    
+    lock = await acquire_thread_lock(request.thread_id)
+    
+    try:
+        last_seen_id = await prepare_approval(graph, config, request.approved, request.delta)
+    except Exception:
+        await lock.release()
+        raise
+    
+    return StreamingResponse(
+        stream_graph_events(graph, None, config, resume=request.approved, since_id=last_seen_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(lock.release)
+    )
+
+async def acquire_thread_lock(thread_id: str):
+    """Acquire a thread's turn lock, answering 409 if another turn holds it too long"""
+    try:
+        return await thread_registry.lock(thread_id).acquire()
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+async def prepare_approval(graph, config, approved: bool, delta: bool):
+    """
+    Records a rejection in the thread state before an approval runs;
+    returns the id of the last message the client already has when
+    `delta` is set, otherwise None
+    """
+    snapshot = await graph.aget_state(config)
+    previous = snapshot.values.get("messages", []) if snapshot.values else []
+    last_seen_id = previous[-1].id if delta and previous else None
+    
+    if not approved:
+        from langchain_core.messages import AIMessage
+        
+        # A redelivered job finds the call already rejected: write nothing
+        # again, and answer with the rejection it wrote the first time
+        if get_pending_approval(snapshot) is None:
+            if delta and len(previous) > 1 and str(previous[-1].id).startswith("rejected-"):
+                last_seen_id = previous[-2].id
+            return last_seen_id
+        
+        tool_call_id = next(call["id"] for call in pending_tool_calls(previous) if needs_approval(call))
+        await graph.aupdate_state(
+            config,
+            {"messages": [AIMessage(
+                content="❌ WhatsApp message was not sent (rejected by user). How else can I help you?",
+                id=f"rejected-{tool_call_id}"
+            )]},
+            as_node="chatbot"
+        )
+    return last_seen_id
+
+async def stream_graph_events(graph, graph_input, config, resume=True, since_id=None, include_since=False):
+    """
+    Runs the graph and yields Server-Sent Events as they happen:
+    token, tool_start, tool_end, interrupt, done (or error).
+    With `since_id`, the done event only carries messages after that id.
+    """
+    async for event, data in graph_events(graph, graph_input, config, resume, since_id, include_since):
+        yield format_sse(event, data)
+
+async def graph_events(graph, graph_input, config, resume=True, since_id=None, include_since=False):
+    """The (event, data) pairs behind stream_graph_events, also published by job workers"""
+    try:
+        if resume:
+            async for mode, payload in graph.astream(graph_input, config, stream_mode=STREAM_MODES):
+                for event in to_stream_events(mode, payload):
+                    yield event["event"], event["data"]
+        
+        snapshot = await graph.aget_state(config)
+        messages = snapshot.values.get("messages", []) if snapshot.values else []
+        # Durable before the client (or job) sees the turn finish
+        await flush_checkpoints(config["configurable"]["thread_id"])
+        schedule_summary(graph, config)
+        
+        pending_approval = get_pending_approval(snapshot)
+        if pending_approval:
+            yield "interrupt", pending_approval
+        
+        yield "done", {
+            "response": "" if pending_approval else get_bot_response(messages),
+            "pending_approval": pending_approval,
+            "messages": (
+                messages_after(messages, since_id, inclusive=include_since)
+                if since_id else convert_messages_to_dict(messages)
+            )
+        }
+    
+    except Exception as e:
+        unavailable = provider_unavailable(e)
+        if unavailable is not None:
+            yield "error", {"detail": unavailable.detail, "status": unavailable.status_code,
+                            "retry_after": (unavailable.headers or {}).get("Retry-After")}
+        else:
+            yield "error", {"detail": f"Error processing chat: {str(e)}"}
+
+def schedule_summary(graph, config):
+    """
+    Folds old turns into the thread's summary in the background once the
+    turn is done, so the reply never waits for the summarization call
+    """
+    summarizer = getattr(graph, "summarizer", None)
+    thread_id = config["configurable"]["thread_id"]
+    if summarizer is None or thread_id in summary_tasks:
+        return
+    task = asyncio.create_task(summarize_thread(graph, config, summarizer))
+    summary_tasks[thread_id] = task
+    task.add_done_callback(lambda _: summary_tasks.pop(thread_id, None))
+
+async def summarize_thread(graph, config, summarizer):
+    """
+    Summarizes a finished turn's thread without holding its lock, then
+    applies the summary with aupdate_state unless a newer turn changed
+    what it covers
+    """
+    thread_id = config["configurable"]["thread_id"]
+    try:
+        snapshot = await graph.aget_state(config)
+        # A thread waiting for approval resumes from its interrupt; leave it alone
+        if snapshot.next or not summarizer.context_policy.should_summarize(snapshot.values):
+            return
+        update = await summarizer.as_runnable().ainvoke(
+            snapshot.values,
+            {**config, "metadata": {"thread_id": thread_id}}
+        )
+        if not update:
+            return
+        
+        async with thread_registry.lock(thread_id):
+            current = await graph.aget_state(config)
+            values = current.values or {}
+            if (current.next
+                    or values.get("summarized_until") != snapshot.values.get("summarized_until")
+                    or not any(msg.id == update["summarized_until"] for msg in values.get("messages", []))):
+                # Summarized, cleared or interrupted in the meantime; the next turn retries
+                return
+            await graph.aupdate_state(config, update, as_node="summarize")
+    except asyncio.CancelledError:
+        raise
+    except ThreadBusyError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Summarizing thread {thread_id} failed: {e}")
+
+def format_sse(event: str, data, event_id: str = None) -> str:
+    """Format a single Server-Sent Event"""
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def use_job_queue(queue: Optional[bool]) -> bool:
+    """Whether a turn runs on the worker pool: the request's choice, else CHAT_JOB_QUEUE"""
+    if queue is None:
+        queue = os.getenv("CHAT_JOB_QUEUE", "false").lower() == "true"
+    return queue
+
+async def enqueue_job(kind: str, payload: dict):
+    """Queue a turn for the worker pool and answer 202 with the job id"""
+    await wait_ready()
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="Job queue unavailable (it requires Redis)")
+    job = await job_queue.enqueue(kind, payload)
+    return JSONResponse(status_code=202, content={
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}",
+        "events_url": f"/jobs/{job['id']}/events"
+    })
+
+@app.get("/jobs/stats")
+async def job_stats():
+    """Get job queue depth: queued and running jobs, worker consumers"""
+    await wait_ready()
+    try:
+        return await job_queue.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job stats: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Poll a queued turn: status (queued, running, succeeded, failed), plus
+    its result (the /chat/stream done payload) or error once finished
+    """
+    await wait_ready()
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="Job queue unavailable (it requires Redis)")
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, http_request: Request):
+    """
+    Follow a queued turn as Server-Sent Events, with the same events as
+    /chat/stream. Events carry ids, so a client reconnecting with
+    Last-Event-ID resumes where it left off; finished jobs replay their events.
+    """
+    await wait_ready()
+    if not job_queue.enabled:
+        raise HTTPException(status_code=503, detail="Job queue unavailable (it requires Redis)")
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    async def stream():
+        last_id = http_request.headers.get("Last-Event-ID") or "0"
+        async for event_id, event, data in job_queue.events(job_id, last_id):
+            yield format_sse(event, data, event_id)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def encode_chat_response(http_request: Request, response: ChatResponse):
+    """Return the ChatResponse as msgpack when requested, otherwise as-is"""
+    if wants_msgpack(http_request):
+        return encode_response(http_request, response.model_dump())
+    return response
+
 @app.get("/history/{thread_id}")
-async def get_history(thread_id: str):
-    """Get conversation history for a thread"""
+async def get_history(
+    thread_id: str,
+    http_request: Request,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """
+    Get conversation history for a thread.
+    
+    Paginate with `?before=<msg_id>&limit=N` (older pages) or fetch only
+    unseen messages with `?after=<msg_id>`. Responses carry an ETag; send it
+    back as If-None-Match to get 304 Not Modified while nothing changed.
+    """
     try:
-        if thread_id not in graphs:
-            return {"messages": []}
+        graph, config = await get_thread_graph(thread_id)
+        if graph is None:
+            return {"messages": [], "has_more": False, "next_before": None}
         
-        graph = graphs[thread_id]["graph"]
-        config = {"configurable": {"thread_id": thread_id}}
+        snapshot = await graph.aget_state(config)
+        etag = make_etag(http_request, snapshot)
+        if etag_matches(http_request, etag):
+            return not_modified(etag)
         
-        snapshot = graph.get_state(config)
         messages = snapshot.values.get("messages", []) if snapshot.values else []
+        page = paginate_messages(messages, before=before, after=after, limit=limit)
         
-        return {"messages": convert_messages_to_dict(messages)}
+        return encode_response(http_request, page, etag=etag)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
 
 @app.delete("/history/{thread_id}")
 async def clear_history(thread_id: str):
-    """Clear conversation history for a thread"""
+    """Clear conversation history for a thread (its settings are kept)"""
     try:
-        if thread_id not in graphs:
+        graph, config = await get_thread_graph(thread_id)
+        if graph is None:
             return {"status": "success", "message": "No history to clear"}
         
-        graph = graphs[thread_id]["graph"]
-        config = {"configurable": {"thread_id": thread_id}}
-        
-        graph.update_state(
-            config,
-            {"messages": []},
-            as_node="chatbot"
-        )
+        # Delete the checkpoints; writing an empty update would only add another one
+        async with thread_registry.lock(thread_id):
+            await redis_checkpointer.adelete_thread(thread_id)
         
         return {"status": "success", "message": "History cleared"}
     
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing history: {str(e)}")
 
-def convert_messages_to_dict(messages):
-    """Convert LangChain messages to simple dicts"""
-    result = []
-    for msg in messages:
-        if isinstance(msg, dict):
-            role = msg.get("role", "assistant")
-            content = msg.get("content", "")
-        elif hasattr(msg, "type"):
-            role = "user" if msg.type == "human" else "assistant"
-            content = msg.content if hasattr(msg, "content") else str(msg)
-        else:
-            continue
+@app.delete("/threads/{thread_id}")
+async def delete_thread(thread_id: str):
+    """Delete a thread: its checkpoints, pending writes and settings"""
+    try:
+        await wait_ready()
+        async with thread_registry.lock(thread_id):
+            await redis_checkpointer.adelete_thread(thread_id)
+            await thread_registry.delete(thread_id)
         
-        if content and role in ["user", "assistant"]:
-            result.append({"role": role, "content": content})
+        return {"status": "success", "message": f"Thread {thread_id} deleted"}
+    
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting thread: {str(e)}")
+
+@app.post("/checkpoints/compact")
+async def compact_checkpoints(all_threads: bool = False):
+    """
+    Prune superseded checkpoints now: threads active since the last run,
+    or every stored thread with ?all_threads=true. Returns bytes reclaimed.
+    """
+    await wait_ready()
+    try:
+        if all_threads:
+            return await checkpoint_compactor.compact()
+        return await checkpoint_compactor.compact_dirty()
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error compacting checkpoints: {str(e)}")
+
+@app.get("/checkpoints/compaction")
+async def compaction_report():
+    """Get the report of the last checkpoint compaction"""
+    await wait_ready()
+    return {
+        "keep_last": checkpoint_compactor.keep_last,
+        "interval_s": checkpoint_compactor.interval,
+        "last_report": checkpoint_compactor.last_report
+    }
+
+@app.get("/graph-cache/stats")
+async def graph_cache_stats():
+    """Get compiled-graph cache metrics"""
+    return graph_cache.stats()
+
+@app.get("/search-cache/stats")
+async def search_cache_stats():
+    """Get web search cache metrics"""
+    return get_search_cache().stats()
+
+@app.get("/response-cache/stats")
+async def response_cache_stats():
+    """Get semantic response cache metrics"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.get("/checkpoint-cache/stats")
+async def checkpoint_cache_stats():
+    """Get hot-thread checkpoint cache and write-behind metrics"""
+    hot = hot_checkpoints()
+    if hot is None:
+        return {"enabled": False}
+    return {"enabled": True, **hot.stats()}
+
+def hot_checkpoints():
+    """The write-behind checkpoint tier, or None when it is off (or Redis is not connected yet)"""
+    return redis_checkpointer if isinstance(redis_checkpointer, WriteBehindCheckpointer) else None
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request, node, LLM, tool and checkpoint timings, tokens, errors, cache hits"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/deliveries/{thread_id}")
+async def get_deliveries(thread_id: str):
+    """
+    Get WhatsApp delivery statuses for a thread: final statuses stored in the
+    thread state (written by whichever worker sent them) plus this worker's
+    in-flight deliveries
+    """
+    deliveries = {}
+    graph, config = await get_thread_graph(thread_id)
+    if graph is not None:
+        snapshot = await graph.aget_state(config)
+        for delivery_id, record in (snapshot.values.get("deliveries") or {}).items():
+            deliveries[delivery_id] = {"id": delivery_id, "thread_id": thread_id, **record}
+    
+    queue = get_delivery_queue()
+    if queue is not None:
+        for record in queue.list_for_thread(thread_id):
+            deliveries.setdefault(record["id"], record)
+    
+    return {"deliveries": list(deliveries.values())}
+
+async def record_delivery_status(record: dict):
+    """Write final WhatsApp delivery statuses back into the thread state"""
+    if record["status"] not in ("sent", "failed") or not record["thread_id"]:
+        return
     
-    return result
+    graph, config = await get_thread_graph(record["thread_id"])
+    if graph is None:
+        return
+    
+    # Wait (briefly) for the turn that queued the message to finish; the
+    # thread lock keeps the write from racing a new turn on any worker
+    for _ in range(20):
+        try:
+            async with thread_registry.lock(record["thread_id"]):
+                snapshot = await graph.aget_state(config)
+                if not snapshot.next:
+                    await graph.aupdate_state(
+                        config,
+                        {"deliveries": {record["id"]: {
+                            "to": record["to"],
+                            "status": record["status"],
+                            "sid": record["sid"],
+                            "attempts": record["attempts"],
+                            "error": record["error"]
+                        }}},
+                        as_node="record_delivery"
+                    )
+                    return
+        except ThreadBusyError:
+            pass
+        await asyncio.sleep(0.5)
+
+async def build_graph(settings: dict):
+    """Return the shared compiled graph for a thread's settings (built off the event loop)"""
+    return await graph_cache.aget_or_build(
+        settings["llm_provider"],
+        settings["model_name"],
+        settings["usecase"],
+        checkpointer=redis_checkpointer,
+        groq_api_key=settings.get("groq_api_key"),
+        fallbacks=settings.get("fallbacks"),
+        hedge=settings.get("hedge", False)
+    )
+
+def get_default_fallbacks() -> list:
+    """
+    Fallback providers from LLM_FALLBACKS, e.g. "Ollama:llama3.2,Groq:llama-3.1-8b-instant"
+    """
+    fallbacks = []
+    for entry in filter(None, (e.strip() for e in os.getenv("LLM_FALLBACKS", "").split(","))):
+        provider, _, model_name = entry.partition(":")
+        fallbacks.append({"llm_provider": provider, "model_name": model_name})
+    return fallbacks
+
+def provider_unavailable(e: Exception) -> Optional[HTTPException]:
+    """
+    429 when the client-side rate limiter sheds the call, 503 when the LLM
+    provider (or every provider of a router) is down or rate limited, both
+    with Retry-After; None for other errors
+    """
+    if isinstance(e, RateLimitExceeded):
+        status_code, retry_after, detail = 429, e.retry_after, str(e)
+    elif isinstance(e, ProviderUnavailableError):
+        status_code, retry_after, detail = 503, e.retry_after, f"LLM provider unavailable: {str(e)}"
+    else:
+        rate_limited, retry_after = rate_limit_info(e)
+        if not rate_limited:
+            return None
+        status_code, detail = 503, f"LLM provider unavailable: {str(e)}"
+    headers = {"Retry-After": str(max(1, int(retry_after + 0.999)))} if retry_after else None
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+async def get_thread_graph(thread_id: str):
+    """
+    Look up a thread's settings and return (graph, config),
+    or (None, None) if the thread was not initialized
+    """
+    await wait_ready()
+    try:
+        settings = await thread_registry.load(thread_id)
+    except ThreadSecretMissingError as e:
+        raise HTTPException(status_code=400, detail=f"{str(e)}. Please initialize the thread again.")
+    if settings is None:
+        return None, None
+    
+    if checkpoint_compactor is not None:
+        checkpoint_compactor.mark_dirty(thread_id)
+    
+    config = {"configurable": {"thread_id": thread_id}}
+    if settings.get("user_id"):
+        config["configurable"]["user_id"] = settings["user_id"]
+    if metrics_handler is not None:
+        config["callbacks"] = [metrics_handler]
+    return await build_graph(settings), config
+
+@timed()
+def convert_messages_to_dict(messages):
+    """Convert LangChain messages to simple dicts"""
+    return [d for d in (message_to_dict(msg) for msg in messages) if d is not None]
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Workers share nothing but Redis, so the API can run with several of them
+    workers = int(os.getenv("UVICORN_WORKERS", "1"))
+    if workers > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
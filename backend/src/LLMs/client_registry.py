@@ -0,0 +1,108 @@
+# File: src/LLMs/client_registry.py
+
+import hashlib
+import os
+import threading
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Process-wide caches, shared by every LLM wrapper instance
+_lock = threading.Lock()
+_models = {}
+_bound_models = {}
+_http_clients = {}
+
+
+def get_pool_limits():
+    """
+    Returns the httpx connection pool limits, configurable via environment:
+    LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_KEEPALIVE, LLM_POOL_KEEPALIVE_EXPIRY
+    """
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "30"))
+    )
+
+
+def get_http_clients(provider: str):
+    """
+    Returns the shared (sync, async) pooled httpx clients for a provider.
+    HTTP/2 is used when the `h2` package is installed, unless LLM_HTTP2=false.
+    """
+    with _lock:
+        if provider not in _http_clients:
+            http2 = HTTP2_AVAILABLE and os.getenv("LLM_HTTP2", "true").lower() == "true"
+            limits = get_pool_limits()
+            timeout = httpx.Timeout(float(os.getenv("LLM_HTTP_TIMEOUT", "60")))
+            _http_clients[provider] = (
+                httpx.Client(limits=limits, http2=http2, timeout=timeout),
+                httpx.AsyncClient(limits=limits, http2=http2, timeout=timeout)
+            )
+        return _http_clients[provider]
+
+
+def make_key(provider: str, model_name: str, api_key: str = None, **params):
+    """
+    Builds the registry key for a chat model. The API key is hashed so it
+    is never kept in plain text as part of the key.
+    """
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+    return (provider, model_name, api_key_hash, tuple(sorted(params.items())))
+
+
+def get_or_create_model(key, factory):
+    """
+    Returns the cached chat model for `key`, creating it with `factory` on first use.
+    """
+    with _lock:
+        model = _models.get(key)
+    if model is None:
+        model = factory()
+        with _lock:
+            model = _models.setdefault(key, model)
+    return model
+
+
+def get_bound_model(model, tools):
+    """
+    Returns `model.bind_tools(tools)`, cached per model and tool names.
+    """
+    key = (id(model), tuple(getattr(tool, "name", repr(tool)) for tool in tools))
+    with _lock:
+        cached = _bound_models.get(key)
+        # Guard against id() reuse by checking the cached model is the same object
+        if cached is not None and cached[0] is model:
+            return cached[1]
+    bound = model.bind_tools(tools)
+    with _lock:
+        _bound_models[key] = (model, bound)
+    return bound
+
+
+def _pop_clients():
+    """Empties the registry and returns the pooled HTTP clients it held"""
+    with _lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+        _models.clear()
+        _bound_models.clear()
+    return clients
+
+
+def clear_registry():
+    """Drops all cached models and closes the pooled sync HTTP clients"""
+    for sync_client, _ in _pop_clients():
+        sync_client.close()
+
+
+async def aclear_registry():
+    """Drops all cached models and closes both sync and async pooled HTTP clients"""
+    for sync_client, async_client in _pop_clients():
+        sync_client.close()
+        await async_client.aclose()
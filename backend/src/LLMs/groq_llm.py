@@ -1,4 +1,7 @@
+import os
 from langchain_groq import ChatGroq
+from src.LLMs.client_registry import get_or_create_model, get_http_clients, make_key
+from src.LLMs.rate_limiter import RateLimitedChatModel, get_scheduler
 
 class GroqLLM:
     def __init__(self, model_name: str = "llama-3.3-70b-versatile", api_key: str = None):
@@ -26,22 +29,52 @@ class GroqLLM:
         response = llm.invoke(messages)
         return response
 
+    async def ainvoke(self, messages):
+        """
+        Async version of invoke that does not block the event loop.
+        
+        Args:
+            messages: List of message objects or dicts with 'role' and 'content'.
+        
+        Returns:
+            Response from the LLM
+        """
+        llm = self.get_llm_model()
+        response = await llm.ainvoke(messages)
+        return response
+
     def get_llm_model(self):
         """
-        Returns the ChatGroq model instance.
+        Returns the ChatGroq model instance, shared process-wide per
+        (model, api key, params) and backed by a pooled keep-alive HTTP client.
+        Calls go through the API key's rate limit scheduler (GROQ_RPM, GROQ_TPM).
         
         Returns:
-            ChatGroq: Configured Groq model
+            RateLimitedChatModel: Configured Groq model behind the rate limiter
         
         Raises:
             Exception: If model loading fails
         """
         try:
-            return ChatGroq(
-                model=self.model_name,
-                api_key=self.api_key,
-                temperature=0.7,
-                max_tokens=1024
-            )
+            params = {"temperature": 0.7, "max_tokens": 1024}
+            key = make_key("groq", self.model_name, self.api_key, **params)
+            
+            def create_model():
+                http_client, http_async_client = get_http_clients("groq")
+                model = ChatGroq(
+                    model=self.model_name,
+                    api_key=self.api_key,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    **params
+                )
+                return RateLimitedChatModel(
+                    model=model,
+                    scheduler=get_scheduler("groq", self.api_key),
+                    model_name=self.model_name,
+                    completion_tokens=int(os.getenv("GROQ_COMPLETION_TOKENS", "256"))
+                )
+            
+            return get_or_create_model(key, create_model)
         except Exception as e:
             raise Exception(f"Error occurred while loading Groq model '{self.model_name}': {e}")
\ No newline at end of file
@@ -1,6 +1,8 @@
 # File: src/LLMs/ollama_llm.py
 
 from langchain_ollama import ChatOllama
+from src.LLMs.client_registry import get_or_create_model, get_pool_limits, make_key
+from src.LLMs.ollama_residency import ResidentChatModel, get_residency_manager
 
 class LlamaOllamaLLM:
     def __init__(self, model_name: str = "llama3.1:8b"):
@@ -22,8 +24,37 @@ class LlamaOllamaLLM:
         response = llm.invoke(messages)
         return response
 
+    async def ainvoke(self, messages):
+        """
+        Async version of invoke that does not block the event loop.
+        messages: List of message objects or dicts with 'role' and 'content'.
+        """
+        llm = self.get_llm_model()
+        response = await llm.ainvoke(messages)
+        return response
+
     def get_llm_model(self):
+        """
+        Returns the ChatOllama model instance, shared process-wide per model
+        so its underlying HTTP connections are kept alive between calls.
+        Calls go through the residency manager, which keeps the model loaded
+        (OLLAMA_KEEP_ALIVE, keep-warm pings) and caps them at OLLAMA_NUM_PARALLEL;
+        the stable prompt prefix then hits Ollama's warm KV cache.
+        """
         try:
-            return ChatOllama(model=self.model_name)
+            manager = get_residency_manager()
+            key = make_key("ollama", self.model_name, keep_alive=manager.keep_alive, **manager.options)
+            
+            def create_model():
+                model = ChatOllama(
+                    model=self.model_name,
+                    base_url=manager.base_url,
+                    keep_alive=manager.keep_alive,
+                    client_kwargs={"limits": get_pool_limits()},
+                    **manager.options
+                )
+                return ResidentChatModel(model=model, manager=manager, model_name=self.model_name)
+            
+            return get_or_create_model(key, create_model)
         except Exception as e:
             raise Exception(f"Error occurred while loading Ollama model '{self.model_name}': {e}")
\ No newline at end of file
@@ -0,0 +1,396 @@
+# File: src/LLMs/ollama_residency.py
+"""
+Ollama model residency: keeps the models the app uses loaded in memory.
+
+The first request after a model was unloaded pays its load into RAM (many
+seconds on CPU-only boxes), and switching models back and forth makes
+Ollama evict and reload them. OllamaResidencyManager:
+
+- preloads OLLAMA_PRELOAD_MODELS at startup and pings them every
+  OLLAMA_KEEP_WARM_INTERVAL seconds so they never expire
+- loads every model with the same keep_alive and options (num_ctx,
+  num_thread) as the chat calls, so Ollama never reloads a model just
+  because the options changed
+- caps in-flight calls per model at OLLAMA_NUM_PARALLEL, the number of
+  requests the server runs in parallel per model
+- with OLLAMA_MAX_LOADED_MODELS, unloads the least recently used model
+  (never a preloaded or busy one) before loading another
+- exports loads, unloads, load durations and resident models as metrics
+"""
+
+import asyncio
+import contextlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.LLMs.rate_limiter import QUIET_CONFIG, as_generation_chunk
+from src.monitoring.metrics import registry
+
+MODEL_LOADS = registry.counter(
+    "chatbot_ollama_model_loads_total", "Ollama model loads, by reason", labels=("model", "reason")
+)
+MODEL_UNLOADS = registry.counter(
+    "chatbot_ollama_model_unloads_total", "Ollama model unloads, by reason", labels=("model", "reason")
+)
+LOAD_DURATION = registry.histogram(
+    "chatbot_ollama_model_load_duration_seconds", "Time to load an Ollama model into memory", labels=("model",)
+)
+KEEP_WARM_PINGS = registry.counter(
+    "chatbot_ollama_keep_warm_pings_total", "Keep-warm pings sent for resident Ollama models", labels=("model",)
+)
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def get_keep_alive():
+    """OLLAMA_KEEP_ALIVE as Ollama expects it; plain numbers are seconds (-1 keeps models loaded)"""
+    keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    return int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+
+
+def keep_alive_seconds(keep_alive) -> float:
+    """Seconds a model stays loaded after a request; inf for negative values"""
+    if isinstance(keep_alive, (int, float)):
+        return float("inf") if keep_alive < 0 else float(keep_alive)
+    total = sum(float(value) * _DURATION_UNITS[unit]
+                for value, unit in re.findall(r"(-?[\d.]+)([smh])", keep_alive))
+    return float("inf") if total < 0 else total
+
+
+def get_model_options() -> dict:
+    """Model options shared by loads and chat calls (OLLAMA_NUM_CTX, OLLAMA_NUM_THREAD)"""
+    options = {}
+    if os.getenv("OLLAMA_NUM_CTX"):
+        options["num_ctx"] = int(os.environ["OLLAMA_NUM_CTX"])
+    if os.getenv("OLLAMA_NUM_THREAD"):
+        options["num_thread"] = int(os.environ["OLLAMA_NUM_THREAD"])
+    return options
+
+
+class OllamaResidencyManager:
+    """
+    Tracks which Ollama models are loaded and loads, pings and unloads them.
+    Use `slot(model)` / `slot_sync(model)` around every call to a model.
+    """
+
+    def __init__(self, base_url: str = None, preload=None, keep_alive=None, options: dict = None,
+                 num_parallel: int = None, max_loaded: int = None, ping_interval: float = None):
+        base_url = base_url or os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        self.base_url = base_url if "://" in base_url else f"http://{base_url}"
+        if preload is None:
+            preload = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if m.strip()]
+        self.preload = list(preload)
+        self.keep_alive = keep_alive if keep_alive is not None else get_keep_alive()
+        self.options = options if options is not None else get_model_options()
+        self.num_parallel = num_parallel or int(os.getenv("OLLAMA_NUM_PARALLEL", "1"))
+        self.max_loaded = max_loaded if max_loaded is not None else int(os.getenv("OLLAMA_MAX_LOADED_MODELS", "0"))
+        self.ping_interval = ping_interval or float(os.getenv("OLLAMA_KEEP_WARM_INTERVAL", "240"))
+        self._resident = OrderedDict()  # model -> expiry (monotonic), least recently used first
+        self._active = {}  # model -> calls in flight
+        self._async_slots = {}
+        self._sync_slots = {}
+        self._load_locks = {}
+        self._async_load_locks = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._task = None
+
+    # -- bookkeeping --------------------------------------------------------
+
+    def is_resident(self, model: str) -> bool:
+        with self._lock:
+            expiry = self._resident.get(model)
+            return expiry is not None and expiry > time.monotonic()
+
+    def _touch(self, model: str):
+        with self._lock:
+            self._resident[model] = time.monotonic() + keep_alive_seconds(self.keep_alive)
+            self._resident.move_to_end(model)
+
+    def _evictions_for(self, model: str) -> list:
+        """Least recently used models to unload so `model` fits in OLLAMA_MAX_LOADED_MODELS"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [m for m, expiry in self._resident.items() if expiry <= now]
+            for m in expired:
+                del self._resident[m]
+        for m in expired:
+            MODEL_UNLOADS.inc(m, "expired")
+        with self._lock:
+            if self.max_loaded <= 0 or model in self._resident:
+                return []
+            excess = len(self._resident) + 1 - self.max_loaded
+            candidates = [m for m in self._resident if m not in self.preload and not self._active.get(m)]
+            return candidates[:max(0, excess)]
+
+    def _slots(self, model: str):
+        with self._lock:
+            if model not in self._sync_slots:
+                self._sync_slots[model] = threading.BoundedSemaphore(self.num_parallel)
+                self._async_slots[model] = asyncio.Semaphore(self.num_parallel)
+                self._load_locks[model] = threading.Lock()
+                self._async_load_locks[model] = asyncio.Lock()
+            return self._sync_slots[model], self._async_slots[model]
+
+    def _set_active(self, model: str, delta: int):
+        with self._lock:
+            self._active[model] = self._active.get(model, 0) + delta
+
+    def _load_payload(self, model: str, keep_alive=None) -> dict:
+        # A generate request without a prompt only loads the model
+        return {"model": model, "keep_alive": self.keep_alive if keep_alive is None else keep_alive,
+                "options": self.options}
+
+    def _loaded(self, model: str, reason: str, start: float):
+        LOAD_DURATION.observe(time.monotonic() - start, model)
+        MODEL_LOADS.inc(model, reason)
+        self._touch(model)
+
+    def _unloaded(self, model: str, reason: str):
+        with self._lock:
+            self._resident.pop(model, None)
+        MODEL_UNLOADS.inc(model, reason)
+
+    # -- HTTP clients -------------------------------------------------------
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(base_url=self.base_url, timeout=None)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=None)
+        return self._async_client
+
+    # -- async API ----------------------------------------------------------
+
+    async def load(self, model: str, reason: str = "on_demand"):
+        """Loads a model (unloading least recently used ones first if at the limit)"""
+        for victim in self._evictions_for(model):
+            await self.unload(victim, "evicted")
+        start = time.monotonic()
+        response = await self._get_async_client().post("/api/generate", json=self._load_payload(model))
+        response.raise_for_status()
+        self._loaded(model, reason, start)
+
+    async def unload(self, model: str, reason: str = "requested"):
+        response = await self._get_async_client().post("/api/generate", json=self._load_payload(model, 0))
+        response.raise_for_status()
+        self._unloaded(model, reason)
+
+    async def ensure_loaded(self, model: str):
+        """Loads the model unless it is known to be resident"""
+        if self.is_resident(model):
+            return
+        self._slots(model)
+        # Concurrent first calls wait for one load instead of each issuing one
+        async with self._async_load_locks[model]:
+            if not self.is_resident(model):
+                await self.load(model)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model: str):
+        """Holds one of the model's OLLAMA_NUM_PARALLEL slots, loading it first if needed"""
+        _sync_slot, async_slot = self._slots(model)
+        async with async_slot:
+            await self.ensure_loaded(model)
+            self._set_active(model, 1)
+            try:
+                yield
+            finally:
+                self._set_active(model, -1)
+                self._touch(model)
+
+    async def sync_resident(self):
+        """Reconciles the bookkeeping with /api/ps; models that expired count as unloads"""
+        response = await self._get_async_client().get("/api/ps")
+        response.raise_for_status()
+        loaded = {entry.get("name") or entry.get("model") for entry in response.json().get("models", [])}
+        with self._lock:
+            gone = [m for m in self._resident if m not in loaded]
+            for model in loaded - set(self._resident):
+                self._resident[model] = time.monotonic() + keep_alive_seconds(self.keep_alive)
+        for model in gone:
+            self._unloaded(model, "expired")
+
+    async def keep_warm(self):
+        """Pings the preloaded models, reloading any that were unloaded"""
+        for model in self.preload:
+            if self.is_resident(model):
+                response = await self._get_async_client().post("/api/generate", json=self._load_payload(model))
+                response.raise_for_status()
+                KEEP_WARM_PINGS.inc(model)
+                self._touch(model)
+            else:
+                await self.load(model, "keep_warm")
+
+    async def _run(self):
+        for model in self.preload:
+            try:
+                await self.load(model, "preload")
+                print(f"✅ Preloaded Ollama model {model}")
+            except Exception as e:
+                print(f"⚠️ Could not preload Ollama model {model}: {e}")
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                await self.sync_resident()
+                await self.keep_warm()
+            except Exception as e:
+                print(f"⚠️ Ollama keep-warm failed: {e}")
+
+    def start(self):
+        """Preload and keep-warm in the background on the running event loop"""
+        if self._task is None and self.preload:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # -- sync API -----------------------------------------------------------
+
+    def load_sync(self, model: str, reason: str = "on_demand"):
+        """Blocking version of load"""
+        for victim in self._evictions_for(model):
+            self.unload_sync(victim, "evicted")
+        start = time.monotonic()
+        self._get_client().post("/api/generate", json=self._load_payload(model)).raise_for_status()
+        self._loaded(model, reason, start)
+
+    def unload_sync(self, model: str, reason: str = "requested"):
+        self._get_client().post("/api/generate", json=self._load_payload(model, 0)).raise_for_status()
+        self._unloaded(model, reason)
+
+    @contextlib.contextmanager
+    def slot_sync(self, model: str):
+        """Blocking version of slot"""
+        sync_slot, _async_slot = self._slots(model)
+        with sync_slot:
+            if not self.is_resident(model):
+                with self._load_locks[model]:
+                    if not self.is_resident(model):
+                        self.load_sync(model)
+            self._set_active(model, 1)
+            try:
+                yield
+            finally:
+                self._set_active(model, -1)
+                self._touch(model)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "resident": {m: round(expiry - now, 1) for m, expiry in self._resident.items() if expiry > now},
+                "in_flight": {m: count for m, count in self._active.items() if count},
+                "preload": list(self.preload),
+                "num_parallel": self.num_parallel,
+                "max_loaded": self.max_loaded
+            }
+
+
+class ResidentChatModel(BaseChatModel):
+    """Chat model whose calls run inside the residency manager's slot for the model"""
+
+    model: Any
+    manager: Any
+    model_name: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-resident"
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def bind_tools(self, tools, **kwargs):
+        return ResidentChatModel(model=self.model.bind_tools(tools, **kwargs),
+                                 manager=self.manager, model_name=self.model_name)
+
+    @staticmethod
+    def _call_kwargs(stop, kwargs):
+        return {**kwargs, "stop": stop} if stop else kwargs
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with self.manager.slot_sync(self.model_name):
+            message = self.model.invoke(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self.manager.slot(self.model_name):
+            message = await self.model.ainvoke(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with self.manager.slot_sync(self.model_name):
+            for chunk in self.model.stream(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs)):
+                yield as_generation_chunk(chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async with self.manager.slot(self.model_name):
+            async for chunk in self.model.astream(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs)):
+                yield as_generation_chunk(chunk)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_residency_manager() -> OllamaResidencyManager:
+    """Returns the process-wide residency manager, creating it on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = OllamaResidencyManager()
+        return _manager
+
+
+def start_residency_manager() -> OllamaResidencyManager:
+    """Start preloading and keep-warm pings for OLLAMA_PRELOAD_MODELS, if any"""
+    manager = get_residency_manager()
+    manager.start()
+    if manager.preload:
+        print(f"✅ Ollama residency manager started (preloading {', '.join(manager.preload)})")
+    return manager
+
+
+async def stop_residency_manager():
+    """Stop the keep-warm loop and close the manager's HTTP clients"""
+    if _manager is not None:
+        await _manager.stop()
+
+
+def _collect():
+    """Scrape-time gauges of the resident models and their in-flight calls"""
+    manager = _manager
+    if manager is None:
+        return []
+    stats = manager.stats()
+    return [
+        ("chatbot_ollama_model_resident", "gauge", "Ollama models currently loaded", ("model",),
+         {(model,): 1 for model in stats["resident"]}),
+        ("chatbot_ollama_model_in_flight", "gauge", "Calls in flight per Ollama model", ("model",),
+         {(model,): count for model, count in stats["in_flight"].items()}),
+    ]
+
+
+registry.add_collector(_collect)
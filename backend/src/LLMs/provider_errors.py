@@ -0,0 +1,36 @@
+# File: src/LLMs/provider_errors.py
+
+# Errors shared by the LLM wrappers and the API. Kept free of LangChain
+# imports so main.py can map them to HTTP responses without loading a provider.
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would wait longer than the queue allows"""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when every provider in the pool failed or is rate limited"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def rate_limit_info(error):
+    """Returns (is_rate_limited, retry_after seconds or None) for a provider error"""
+    if isinstance(error, RateLimitExceeded):
+        return True, error.retry_after
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return False, None
+    try:
+        return True, float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return True, None
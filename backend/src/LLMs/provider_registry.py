@@ -0,0 +1,42 @@
+# File: src/LLMs/provider_registry.py
+
+import importlib
+import threading
+
+# Provider name -> "module:attribute" of its LLM wrapper. A provider's
+# module (and its SDK, e.g. langchain_groq) is only imported the first time
+# a graph uses it, so a process serving one provider never loads the others.
+_providers = {
+    "Ollama": "src.LLMs.ollama_llm:LlamaOllamaLLM",
+    "Groq": "src.LLMs.groq_llm:GroqLLM",
+    "Router": "src.LLMs.router_llm:RouterLLM",
+}
+_loaded = {}
+_lock = threading.Lock()
+
+
+def register_provider(name: str, target):
+    """Registers (or replaces) a provider: an LLM wrapper class or a "module:attribute" path"""
+    with _lock:
+        _providers[name] = target
+        _loaded.pop(name, None)
+
+
+def get_provider(name: str):
+    """Returns the LLM wrapper class of a provider, importing it on first use"""
+    with _lock:
+        if name not in _loaded:
+            if name not in _providers:
+                raise ValueError(f"Unknown LLM provider: {name}")
+            target = _providers[name]
+            if isinstance(target, str):
+                module_name, _, attribute = target.partition(":")
+                target = getattr(importlib.import_module(module_name), attribute)
+            _loaded[name] = target
+        return _loaded[name]
+
+
+def loaded_providers() -> list:
+    """Names of the providers imported so far"""
+    with _lock:
+        return list(_loaded)
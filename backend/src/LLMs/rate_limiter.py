@@ -0,0 +1,412 @@
+# File: src/LLMs/rate_limiter.py
+"""
+Client-side rate limiting for Groq.
+
+Groq enforces requests-per-minute and tokens-per-minute quotas per API key.
+Each key gets a RateLimitScheduler with two token buckets (GROQ_RPM,
+GROQ_TPM, both off unless set, since quotas depend on the account tier and
+model); calls wait in a fair queue until both buckets can pay for them:
+
+- Interactive calls go before background ones (background summaries)
+- Within a priority, threads are served round-robin, so one busy thread
+  cannot starve the others
+- A call whose estimated wait exceeds GROQ_MAX_QUEUE_WAIT is rejected
+  right away with RateLimitExceeded (answered as 429 with Retry-After)
+
+Calls are charged their estimated prompt tokens plus GROQ_COMPLETION_TOKENS
+and settled against the usage Groq reports once they finish.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessageChunk
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.LLMs.provider_errors import RateLimitExceeded, rate_limit_info  # noqa: F401
+from src.monitoring.metrics import registry
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = {"interactive": INTERACTIVE, "background": BACKGROUND}
+
+QUEUE_WAIT = registry.histogram(
+    "chatbot_llm_rate_limit_wait_seconds", "Time calls waited for the client-side rate limiter",
+    labels=("priority",)
+)
+REJECTED = registry.counter(
+    "chatbot_llm_rate_limit_rejected_total", "Calls rejected by the client-side rate limiter",
+    labels=("priority",)
+)
+
+# Inner model calls run without callbacks; the wrapper is the chat model
+# the graph sees, so tokens are streamed (and measured) exactly once
+QUIET_CONFIG = {"callbacks": []}
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to `per_minute`. The balance
+    may go negative when a call turns out to cost more than estimated.
+    A bucket with per_minute <= 0 never limits.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` (capped at the capacity) can be taken"""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount: float, now: float):
+        if not self.unlimited:
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Gives back (positive) or charges (negative) tokens after the fact"""
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    """A queued call; woken from any thread once it has been granted"""
+
+    def __init__(self, tokens: int, thread_id: str, priority: int, loop=None):
+        self.tokens = tokens
+        self.thread_id = thread_id
+        self.priority = priority
+        self.granted = False
+        self._loop = loop
+        self._event = asyncio.Event() if loop is not None else threading.Event()
+
+    def grant(self):
+        self.granted = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._event.set()
+
+    async def wait_async(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def wait(self, timeout: float):
+        self._event.wait(timeout)
+
+
+class RateLimitScheduler:
+    """
+    Fair, prioritized admission queue in front of one API key's RPM and TPM
+    buckets. Use `acquire`/`aacquire` before a call and `settle` after it.
+    """
+
+    def __init__(self, rpm: float = None, tpm: float = None, max_wait: float = None):
+        self.requests = TokenBucket(rpm if rpm is not None else float(os.getenv("GROQ_RPM", "0")))
+        self.tokens = TokenBucket(tpm if tpm is not None else float(os.getenv("GROQ_TPM", "0")))
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("GROQ_MAX_QUEUE_WAIT", "10"))
+        self.blocked_until = 0.0
+        self._queues = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}  # thread_id -> deque of waiters
+        self._lock = threading.Lock()
+
+    # -- queue --------------------------------------------------------------
+
+    def _head(self):
+        for priority in sorted(self._queues):
+            threads = self._queues[priority]
+            if threads:
+                return threads[next(iter(threads))][0]
+        return None
+
+    def _pop(self, waiter, rotate: bool = True):
+        threads = self._queues[waiter.priority]
+        waiters = threads[waiter.thread_id]
+        waiters.remove(waiter)
+        if not waiters:
+            del threads[waiter.thread_id]
+        elif rotate:
+            threads.move_to_end(waiter.thread_id)  # round-robin across threads
+
+    def _wait_time(self, requests: int, tokens: int, now: float) -> float:
+        return max(self.blocked_until - now,
+                   self.requests.wait_time(requests, now),
+                   self.tokens.wait_time(tokens, now))
+
+    def _estimate_wait(self, tokens: int, priority: int, now: float) -> float:
+        """Wait for a new call behind every queued call of the same or higher priority"""
+        ahead = [w for p, threads in self._queues.items() if p <= priority
+                 for waiters in threads.values() for w in waiters]
+        # Capped like TokenBucket.wait_time: a call larger than the bucket runs once it is full
+        capacity = self.tokens.capacity
+        total_tokens = sum(min(w.tokens, capacity) for w in ahead) + min(tokens, capacity)
+        if self.tokens.unlimited:
+            token_wait = 0.0
+        else:
+            token_wait = max(0.0, (total_tokens - self.tokens.tokens) / self.tokens.rate)
+        request_wait = 0.0 if self.requests.unlimited else max(
+            0.0, (len(ahead) + 1 - self.requests.tokens) / self.requests.rate
+        )
+        return max(self.blocked_until - now, token_wait, request_wait)
+
+    def _dispatch(self, now: float):
+        """Grants queued calls in order while both buckets can pay for them"""
+        while True:
+            head = self._head()
+            if head is None or self._wait_time(1, head.tokens, now) > 0:
+                return
+            self.requests.take(1, now)
+            self.tokens.take(head.tokens, now)
+            self._pop(head)
+            head.grant()
+
+    def _next_check(self, now: float) -> float:
+        head = self._head()
+        delay = self._wait_time(1, head.tokens, now) if head is not None else 0.0
+        return min(max(delay, 0.01), 1.0)
+
+    def _enqueue(self, tokens: int, thread_id: str, priority: int, loop=None) -> _Waiter:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            wait = self._estimate_wait(tokens, priority, now)
+            if wait > self.max_wait:
+                REJECTED.inc(_priority_name(priority))
+                raise RateLimitExceeded(
+                    f"LLM rate limit reached, retry in {wait:.1f}s", retry_after=wait
+                )
+            waiter = _Waiter(tokens, thread_id, priority, loop)
+            self._queues[priority].setdefault(thread_id, deque()).append(waiter)
+            self._dispatch(now)
+            return waiter
+
+    def _cancel(self, waiter: _Waiter):
+        with self._lock:
+            if waiter.granted:
+                # Granted but never used: give the reservation back
+                self.requests.adjust(1)
+                self.tokens.adjust(waiter.tokens)
+            else:
+                self._pop(waiter, rotate=False)
+            self._dispatch(time.monotonic())
+
+    # -- public API ---------------------------------------------------------
+
+    async def aacquire(self, tokens: int, thread_id: str = "default", priority: int = INTERACTIVE):
+        """Waits until the call may be sent; raises RateLimitExceeded when the queue is too long"""
+        start = time.monotonic()
+        waiter = self._enqueue(tokens, thread_id, priority, asyncio.get_running_loop())
+        try:
+            while not waiter.granted:
+                with self._lock:
+                    self._dispatch(time.monotonic())
+                    delay = self._next_check(time.monotonic())
+                if not waiter.granted:
+                    await waiter.wait_async(delay)
+        except BaseException:
+            self._cancel(waiter)
+            raise
+        QUEUE_WAIT.observe(time.monotonic() - start, _priority_name(priority))
+
+    def acquire(self, tokens: int, thread_id: str = "default", priority: int = INTERACTIVE):
+        """Blocking version of aacquire"""
+        start = time.monotonic()
+        waiter = self._enqueue(tokens, thread_id, priority)
+        try:
+            while not waiter.granted:
+                with self._lock:
+                    self._dispatch(time.monotonic())
+                    delay = self._next_check(time.monotonic())
+                if not waiter.granted:
+                    waiter.wait(delay)
+        except BaseException:
+            self._cancel(waiter)
+            raise
+        QUEUE_WAIT.observe(time.monotonic() - start, _priority_name(priority))
+
+    def settle(self, estimated: int, actual: int = None):
+        """Corrects the token bucket with the usage the provider reported"""
+        if actual is not None:
+            with self._lock:
+                self.tokens.adjust(estimated - actual)
+
+    def block(self, seconds: float):
+        """Pauses admissions, e.g. after the provider answered 429 with Retry-After"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "queued": {_priority_name(p): sum(len(w) for w in threads.values())
+                           for p, threads in self._queues.items()},
+                "requests_available": None if self.requests.unlimited else round(self.requests.tokens, 2),
+                "tokens_available": None if self.tokens.unlimited else round(self.tokens.tokens),
+                "blocked_for": round(max(0.0, self.blocked_until - now), 2)
+            }
+
+
+def _priority_name(priority: int) -> str:
+    return "background" if priority == BACKGROUND else "interactive"
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str, api_key: str = None) -> RateLimitScheduler:
+    """Returns the process-wide scheduler for a provider's API key"""
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+    with _schedulers_lock:
+        scheduler = _schedulers.get((provider, api_key_hash))
+        if scheduler is None:
+            scheduler = RateLimitScheduler()
+            _schedulers[(provider, api_key_hash)] = scheduler
+        return scheduler
+
+
+def _collect():
+    """Scrape-time gauge of the calls waiting in every scheduler"""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.items())
+    queued = {}
+    for (provider, _key), scheduler in schedulers:
+        for priority, count in scheduler.stats()["queued"].items():
+            queued[(provider, priority)] = queued.get((provider, priority), 0) + count
+    return [("chatbot_llm_rate_limit_queued", "gauge", "Calls waiting for the client-side rate limiter",
+             ("provider", "priority"), queued)]
+
+
+registry.add_collector(_collect)
+
+
+def as_generation_chunk(message) -> ChatGenerationChunk:
+    """Wraps a streamed message; models without native streaming yield whole messages"""
+    if not isinstance(message, BaseMessageChunk):
+        message = AIMessageChunk(**message.model_dump(exclude={"type"}))
+    return ChatGenerationChunk(message=message)
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Chat model that admits calls to `model` through a RateLimitScheduler.
+
+    The thread and priority come from the run's metadata: `thread_id` (set
+    by LangGraph from the config) and `llm_priority` ("interactive" or
+    "background").
+    """
+
+    model: Any
+    scheduler: Any
+    model_name: str = ""
+    completion_tokens: int = 256
+
+    @property
+    def _llm_type(self) -> str:
+        return "rate-limited"
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def bind_tools(self, tools, **kwargs):
+        return RateLimitedChatModel(
+            model=self.model.bind_tools(tools, **kwargs),
+            scheduler=self.scheduler,
+            model_name=self.model_name,
+            completion_tokens=self.completion_tokens
+        )
+
+    def _admission(self, messages, run_manager):
+        metadata = getattr(run_manager, "metadata", None) or {}
+        priority = PRIORITIES.get(metadata.get("llm_priority"), INTERACTIVE)
+        tokens = count_tokens_approximately(messages) + self.completion_tokens
+        return tokens, str(metadata.get("thread_id", "default")), priority
+
+    def _settle(self, estimated: int, message):
+        usage = getattr(message, "usage_metadata", None)
+        self.scheduler.settle(estimated, usage.get("total_tokens") if usage else None)
+
+    def _failed(self, error):
+        rate_limited, retry_after = rate_limit_info(error)
+        if rate_limited and not isinstance(error, RateLimitExceeded):
+            self.scheduler.block(retry_after or 1.0)
+
+    @staticmethod
+    def _call_kwargs(stop, kwargs):
+        return {**kwargs, "stop": stop} if stop else kwargs
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, thread_id, priority = self._admission(messages, run_manager)
+        self.scheduler.acquire(tokens, thread_id, priority)
+        try:
+            message = self.model.invoke(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._settle(tokens, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, thread_id, priority = self._admission(messages, run_manager)
+        await self.scheduler.aacquire(tokens, thread_id, priority)
+        try:
+            message = await self.model.ainvoke(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._settle(tokens, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, thread_id, priority = self._admission(messages, run_manager)
+        self.scheduler.acquire(tokens, thread_id, priority)
+        final = None
+        try:
+            for chunk in self.model.stream(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs)):
+                chunk = as_generation_chunk(chunk)
+                final = chunk.message if final is None else final + chunk.message
+                yield chunk
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._settle(tokens, final)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens, thread_id, priority = self._admission(messages, run_manager)
+        await self.scheduler.aacquire(tokens, thread_id, priority)
+        final = None
+        try:
+            async for chunk in self.model.astream(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs)):
+                chunk = as_generation_chunk(chunk)
+                final = chunk.message if final is None else final + chunk.message
+                yield chunk
+        except Exception as e:
+            self._failed(e)
+            raise
+        self._settle(tokens, final)
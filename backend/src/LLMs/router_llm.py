@@ -0,0 +1,449 @@
+# File: src/LLMs/router_llm.py
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, List
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.LLMs.client_registry import get_or_create_model, make_key
+from src.LLMs.provider_errors import ProviderUnavailableError, rate_limit_info
+from src.LLMs.rate_limiter import QUIET_CONFIG, as_generation_chunk
+from src.monitoring.metrics import registry
+
+PROVIDER_REQUESTS = registry.counter(
+    "chatbot_llm_provider_requests_total",
+    "Provider attempts made by the LLM router, by outcome",
+    labels=("provider", "outcome")
+)
+HEDGES = registry.counter(
+    "chatbot_llm_hedges_total", "Hedged requests fired by the LLM router", labels=("provider",)
+)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures (or immediately on
+    a 429) and lets a single probe through once `reset_timeout` has passed.
+
+    Attempts take a ticket with `acquire()` right before they run and hand
+    it back with `release()` when they finish; a probe ticket that ends
+    without a recorded outcome (skipped or cancelled) frees the probe.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until = 0.0
+        self._probe = None  # ticket of the half-open probe in flight
+        self._lock = threading.Lock()
+
+    @property
+    def probing(self) -> bool:
+        return self._probe is not None
+
+    @property
+    def state(self) -> str:
+        if self.open_until > time.monotonic():
+            return "open"
+        return "half_open" if self.failures >= self.failure_threshold else "closed"
+
+    def allow(self) -> bool:
+        """True if an attempt could start now; claims nothing"""
+        with self._lock:
+            state = self.state
+            return state == "closed" or (state == "half_open" and self._probe is None)
+
+    def acquire(self):
+        """Returns a ticket for one attempt, or None if the breaker refuses it"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return object()
+            if state == "half_open" and self._probe is None:
+                self._probe = object()
+                return self._probe
+            return None
+
+    def release(self, ticket):
+        """Ends an attempt; frees the probe if it was one and recorded nothing"""
+        with self._lock:
+            if ticket is not None and ticket is self._probe:
+                self._probe = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._probe = None
+
+    def record_failure(self, retry_after: float = None, rate_limited: bool = False):
+        with self._lock:
+            self.failures += 1
+            self._probe = None
+            if rate_limited:
+                self.failures = max(self.failures, self.failure_threshold)
+            if self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + (retry_after or self.reset_timeout)
+
+    def retry_after(self) -> float:
+        return max(0.0, self.open_until - time.monotonic())
+
+
+class ProviderHealth:
+    """
+    Per-provider state shared by every router using that provider:
+    concurrency slots, circuit breaker and recent first-token latencies.
+    """
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            int(os.getenv("ROUTER_BREAKER_FAILURES", "5")),
+            float(os.getenv("ROUTER_BREAKER_RESET_SECONDS", "30"))
+        )
+        self.max_concurrency = max_concurrency
+        self.sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self.async_slots = asyncio.Semaphore(max_concurrency)
+        self.latencies = deque(maxlen=200)
+
+    def has_free_slot(self) -> bool:
+        return not self.async_slots.locked()
+
+    def hedge_delay(self) -> float:
+        """p95 of recent first-token latencies, or ROUTER_HEDGE_DELAY until enough samples"""
+        minimum = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.25"))
+        if len(self.latencies) < 20:
+            return max(minimum, float(os.getenv("ROUTER_HEDGE_DELAY", "2.0")))
+        ordered = sorted(self.latencies)
+        # Nearest-rank p95
+        return max(minimum, ordered[math.ceil(len(ordered) * 0.95) - 1])
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.breaker.record_success()
+        PROVIDER_REQUESTS.inc(self.name, "ok")
+
+    def record_failure(self, error):
+        rate_limited, retry_after = rate_limit_info(error)
+        self.breaker.record_failure(retry_after, rate_limited)
+        PROVIDER_REQUESTS.inc(self.name, "rate_limited" if rate_limited else "error")
+
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def get_provider_health(key, name: str) -> ProviderHealth:
+    """Returns the process-wide health record for a provider key"""
+    with _health_lock:
+        health = _health.get(key)
+        if health is None:
+            limit = int(os.getenv(f"ROUTER_MAX_CONCURRENCY_{name.split(':')[0].upper()}",
+                                  os.getenv("ROUTER_MAX_CONCURRENCY", "16")))
+            health = ProviderHealth(name, limit)
+            _health[key] = health
+        return health
+
+
+class ProviderSlot:
+    """A chat model (or tool-bound runnable) together with its provider's health"""
+
+    def __init__(self, model, health: ProviderHealth):
+        self.model = model
+        self.health = health
+
+    @property
+    def name(self) -> str:
+        return self.health.name
+
+
+class RouterChatModel(BaseChatModel):
+    """
+    Chat model over an ordered pool of providers.
+
+    - Providers whose circuit breaker is open are skipped; a provider at its
+      concurrency limit is skipped while a later one has a free slot
+    - A failed or rate-limited attempt fails over to the next provider
+    - With `hedge`, if the running attempt has not produced its first token
+      (or, without streaming, its answer) within the provider's p95-based
+      deadline, the next provider is started too; the first to respond wins
+      and the other is cancelled
+    - When every provider failed, ProviderUnavailableError carries the
+      shortest breaker wait as `retry_after`
+
+    Hedging applies to the async paths; the sync paths fail over only.
+    """
+
+    slots: List[Any]
+    hedge: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    @property
+    def _identifying_params(self):
+        return {"providers": [slot.name for slot in self.slots], "hedge": self.hedge}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.slots[0].name
+        return params
+
+    def bind_tools(self, tools, **kwargs):
+        return RouterChatModel(
+            slots=[ProviderSlot(slot.model.bind_tools(tools, **kwargs), slot.health) for slot in self.slots],
+            hedge=self.hedge
+        )
+
+    # -- provider selection -------------------------------------------------
+
+    def _candidates(self) -> list:
+        """
+        Providers their breaker would admit, those with a free slot first.
+        Nothing is claimed here: a half-open provider's probe is only taken
+        (with `breaker.acquire()`) when its attempt actually starts.
+        """
+        allowed = [slot for slot in self.slots if slot.health.breaker.allow()]
+        if not allowed:
+            retry_after = min(slot.health.breaker.retry_after() for slot in self.slots)
+            raise ProviderUnavailableError("All LLM providers are unavailable", retry_after or None)
+        free = [slot for slot in allowed if slot.health.has_free_slot()]
+        return free + [slot for slot in allowed if slot not in free]
+
+    def _unavailable(self, errors) -> ProviderUnavailableError:
+        retry_after = min((slot.health.breaker.retry_after() for slot in self.slots), default=0)
+        detail = "; ".join(f"{name}: {error}" for name, error in errors)
+        return ProviderUnavailableError(f"All LLM providers failed ({detail})", retry_after or None)
+
+    @staticmethod
+    def _call_kwargs(stop, kwargs):
+        return {**kwargs, "stop": stop} if stop else kwargs
+
+    # -- sync paths (failover only) -----------------------------------------
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        errors = []
+        for slot in self._candidates():
+            ticket = slot.health.breaker.acquire()
+            if ticket is None:
+                continue
+            try:
+                with slot.health.sync_slots:
+                    start = time.monotonic()
+                    try:
+                        message = slot.model.invoke(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+                    except Exception as e:
+                        slot.health.record_failure(e)
+                        errors.append((slot.name, e))
+                        continue
+                    slot.health.record_success(time.monotonic() - start)
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+            finally:
+                slot.health.breaker.release(ticket)
+        raise self._unavailable(errors) from (errors[-1][1] if errors else None)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        errors = []
+        for slot in self._candidates():
+            ticket = slot.health.breaker.acquire()
+            if ticket is None:
+                continue
+            try:
+                with slot.health.sync_slots:
+                    start = time.monotonic()
+                    stream = slot.model.stream(messages, QUIET_CONFIG, **self._call_kwargs(stop, kwargs))
+                    try:
+                        first = next(stream)
+                    except StopIteration:
+                        first = AIMessageChunk(content="")
+                    except Exception as e:
+                        slot.health.record_failure(e)
+                        errors.append((slot.name, e))
+                        continue
+                    slot.health.record_success(time.monotonic() - start)
+                    yield as_generation_chunk(first)
+                    for chunk in stream:
+                        yield as_generation_chunk(chunk)
+                    return
+            finally:
+                slot.health.breaker.release(ticket)
+        raise self._unavailable(errors) from (errors[-1][1] if errors else None)
+
+    # -- async paths (failover and hedging) ---------------------------------
+
+    async def _race(self, start_attempt, discard=None):
+        """
+        Runs attempts (one coroutine per provider, from `start_attempt(slot)`)
+        with failover and optional hedging. Returns (slot, result) of the
+        first attempt to succeed; the others are cancelled, and any other
+        attempt that succeeded anyway is handed to `discard(slot, result)`
+        to free what it holds.
+        """
+        candidates = self._candidates()
+        running = {}  # task -> slot
+        errors = []
+
+        async def run(slot, ticket):
+            try:
+                return await start_attempt(slot)
+            finally:
+                # A cancelled hedge or failover must not keep the probe
+                slot.health.breaker.release(ticket)
+
+        def launch():
+            """Starts the next candidate its breaker admits; returns its slot, or None"""
+            while candidates:
+                slot = candidates.pop(0)
+                ticket = slot.health.breaker.acquire()
+                if ticket is not None:
+                    running[asyncio.ensure_future(run(slot, ticket))] = slot
+                    return slot
+            return None
+
+        if launch() is None:
+            raise self._unavailable(errors)
+        try:
+            while running:
+                primary = next(iter(running.values()))
+                can_hedge = self.hedge and candidates and len(running) == 1
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=primary.health.hedge_delay() if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedge = launch()
+                    if hedge is not None:
+                        HEDGES.inc(hedge.name)
+                    continue
+
+                winner = None
+                for task in done:
+                    slot = running.pop(task)
+                    if task.exception() is not None:
+                        errors.append((slot.name, task.exception()))
+                    elif winner is None:
+                        winner = slot, task.result()
+                    elif discard is not None:
+                        # Primary and hedge finished in the same round
+                        await discard(slot, task.result())
+                if winner is not None:
+                    return winner
+                if not running and candidates:
+                    launch()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for task, slot in running.items():
+                if task.cancelled():
+                    PROVIDER_REQUESTS.inc(slot.name, "cancelled")
+                elif task.exception() is None and discard is not None:
+                    # Finished before the cancellation reached it
+                    await discard(slot, task.result())
+
+        raise self._unavailable(errors) from (errors[-1][1] if errors else None)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        call_kwargs = self._call_kwargs(stop, kwargs)
+
+        async def attempt(slot):
+            async with slot.health.async_slots:
+                start = time.monotonic()
+                try:
+                    message = await slot.model.ainvoke(messages, QUIET_CONFIG, **call_kwargs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    slot.health.record_failure(e)
+                    raise
+                slot.health.record_success(time.monotonic() - start)
+                return message
+
+        _slot, message = await self._race(attempt)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        call_kwargs = self._call_kwargs(stop, kwargs)
+
+        async def attempt(slot):
+            # Holds the provider's slot until the winning stream is consumed
+            await slot.health.async_slots.acquire()
+            stream = slot.model.astream(messages, QUIET_CONFIG, **call_kwargs)
+            start = time.monotonic()
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                first = AIMessageChunk(content="")
+            except BaseException as e:
+                slot.health.async_slots.release()
+                await stream.aclose()
+                if not isinstance(e, asyncio.CancelledError):
+                    slot.health.record_failure(e)
+                raise
+            slot.health.record_success(time.monotonic() - start)
+            return stream, first
+
+        async def discard(slot, result):
+            stream, _first = result
+            slot.health.async_slots.release()
+            await stream.aclose()
+
+        slot, (stream, first) = await self._race(attempt, discard)
+        try:
+            yield as_generation_chunk(first)
+            async for chunk in stream:
+                yield as_generation_chunk(chunk)
+        finally:
+            slot.health.async_slots.release()
+            await stream.aclose()
+
+
+class RouterLLM:
+    """
+    LLM wrapper over an ordered pool of wrappers (GroqLLM, LlamaOllamaLLM),
+    with the same invoke/ainvoke/get_llm_model interface.
+    """
+
+    def __init__(self, llms: list, hedge: bool = False):
+        self.llms = llms
+        self.hedge = hedge
+        self.model_name = "+".join(self._provider_name(llm) for llm in llms)
+
+    @staticmethod
+    def _provider_name(llm) -> str:
+        provider = type(llm).__name__.replace("LLM", "").replace("Llama", "").lower() or "llm"
+        return f"{provider}:{llm.model_name}"
+
+    def invoke(self, messages):
+        """Generate a response, failing over between providers"""
+        return self.get_llm_model().invoke(messages)
+
+    async def ainvoke(self, messages):
+        """Async version of invoke, with hedging when enabled"""
+        return await self.get_llm_model().ainvoke(messages)
+
+    def get_llm_model(self):
+        """
+        Returns the RouterChatModel over the providers' shared chat models,
+        cached per provider list and hedge setting.
+        """
+        def create_model():
+            slots = []
+            for llm in self.llms:
+                name = self._provider_name(llm)
+                health_key = make_key(name, llm.model_name, getattr(llm, "api_key", None))
+                slots.append(ProviderSlot(llm.get_llm_model(), get_provider_health(health_key, name)))
+            return RouterChatModel(slots=slots, hedge=self.hedge)
+
+        api_keys = "|".join(getattr(llm, "api_key", None) or "" for llm in self.llms)
+        key = make_key("router", self.model_name, api_keys or None, hedge=self.hedge)
+        return get_or_create_model(key, create_model)
@@ -0,0 +1,132 @@
+# File: src/api/payloads.py
+
+import json
+from fastapi import Request
+from fastapi.responses import Response
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def message_to_dict(msg):
+    """
+    Convert one LangChain message (or dict) to {"id", "role", "content"},
+    or None for messages without text (e.g. bare tool calls).
+    """
+    if isinstance(msg, dict):
+        role = msg.get("role", "assistant")
+        content = msg.get("content", "")
+        message_id = msg.get("id")
+    elif hasattr(msg, "type"):
+        role = "user" if msg.type == "human" else "assistant"
+        content = msg.content if hasattr(msg, "content") else str(msg)
+        message_id = getattr(msg, "id", None)
+    else:
+        return None
+
+    if content and role in ["user", "assistant"]:
+        return {"id": message_id, "role": role, "content": content}
+    return None
+
+
+def _index_of(messages, message_id):
+    for index in range(len(messages) - 1, -1, -1):
+        msg = messages[index]
+        if (msg.get("id") if isinstance(msg, dict) else getattr(msg, "id", None)) == message_id:
+            return index
+    return None
+
+
+def messages_after(messages, message_id, inclusive: bool = False) -> list:
+    """
+    Returns the visible messages after `message_id` (and the message itself
+    if `inclusive`). Unknown ids return every message, so a client that
+    lost its place resynchronizes instead of missing messages.
+    """
+    index = _index_of(messages, message_id) if message_id else None
+    start = 0 if index is None else (index if inclusive else index + 1)
+    return [d for d in (message_to_dict(msg) for msg in messages[start:]) if d is not None]
+
+
+def paginate_messages(messages, before: str = None, after: str = None, limit: int = None) -> dict:
+    """
+    Cursor-based page of visible messages, oldest first.
+
+    - `after`: only messages newer than this id (what the client has not seen)
+    - `before`: only messages older than this id (scrolling back)
+    - `limit`: keep the newest `limit` messages of the range
+
+    Only the messages in the page are converted. Returns the page plus
+    `has_more` (older messages remain in the range; they may all be hidden
+    tool calls) and `next_before` (the cursor for the next, older page).
+    """
+    end = len(messages)
+    if before:
+        index = _index_of(messages, before)
+        end = index if index is not None else end
+    start = 0
+    if after:
+        index = _index_of(messages, after)
+        start = index + 1 if index is not None else 0
+
+    page = []
+    index = end - 1
+    while index >= start and (limit is None or len(page) < limit):
+        converted = message_to_dict(messages[index])
+        if converted is not None:
+            page.append(converted)
+        index -= 1
+    page.reverse()
+
+    has_more = index >= start
+    return {
+        "messages": page,
+        "has_more": has_more,
+        "next_before": page[0]["id"] if has_more and page else None
+    }
+
+
+def make_etag(request: Request, snapshot) -> str:
+    """
+    Weak ETag from the thread's latest checkpoint id, which changes on every
+    write, and the response encoding
+    """
+    checkpoint_id = (snapshot.config or {}).get("configurable", {}).get("checkpoint_id") if snapshot else None
+    encoding = "msgpack" if wants_msgpack(request) else "json"
+    return f'W/"{checkpoint_id or "empty"}-{encoding}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers `etag`"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def encode_response(request: Request, payload: dict, etag: str = None, status_code: int = 200) -> Response:
+    """
+    Encode `payload` as msgpack when the client asks for it (Accept:
+    application/msgpack), JSON otherwise. Large JSON/msgpack bodies are
+    gzipped by the GZip middleware when the client accepts it.
+    """
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if etag:
+        headers["ETag"] = etag
+
+    if wants_msgpack(request):
+        import ormsgpack
+
+        return Response(ormsgpack.packb(payload), status_code=status_code,
+                        media_type="application/msgpack", headers=headers)
+    return Response(json.dumps(payload, default=str), status_code=status_code,
+                    media_type="application/json", headers=headers)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept, Accept-Encoding"})
@@ -0,0 +1,177 @@
+# File: src/checkpoint/compact_history.py
+"""
+One-off migration that removes duplicated history from existing threads.
+
+Older clients re-sent the whole conversation on every turn. The Streamlit app
+sent it as id-less dicts, so each turn appended a full replay of the visible
+transcript to the checkpoint. This module drops those replays (and any
+messages duplicated by id) and rewrites each thread once.
+
+Run with --dry-run first: it lists every message that would be dropped.
+A rewrite adds a new checkpoint; the one before it (printed) still holds
+the original history until retention prunes it.
+
+Usage:
+    python -m src.checkpoint.compact_history [--dry-run] [thread_id ...]
+"""
+
+import argparse
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from src.state.state import State
+
+
+def _visible_key(msg):
+    """
+    Returns (role, content) for messages shown in the transcript, or None for
+    tool traffic (tool calls and tool results) that clients never replayed.
+    """
+    if isinstance(msg, HumanMessage):
+        return ("user", msg.content)
+    if isinstance(msg, AIMessage) and not msg.tool_calls and msg.content:
+        return ("assistant", msg.content)
+    return None
+
+
+def _generated(msg):
+    """True for assistant messages produced by a model (replayed dicts carry no response metadata)"""
+    return isinstance(msg, AIMessage) and bool(msg.response_metadata or msg.usage_metadata)
+
+
+def dedupe_messages(messages):
+    """
+    Removes duplicated messages from a thread's history.
+
+    Messages are first deduplicated by id. Then only the exact replay
+    signature is dropped: the whole visible transcript kept so far, re-sent
+    in order and directly followed by a new user message, whose assistant
+    messages were rebuilt from the client's dicts rather than generated by
+    the model. A conversation that merely repeats an exchange (the same "hi"
+    getting the same greeting) has model replies and is kept.
+
+    Args:
+        messages: List of LangChain messages from the checkpoint
+
+    Returns:
+        The compacted list of messages, in original order
+    """
+    seen_ids = set()
+    unique = []
+    for msg in messages:
+        msg_id = getattr(msg, "id", None)
+        if msg_id is not None:
+            if msg_id in seen_ids:
+                continue
+            seen_ids.add(msg_id)
+        unique.append(msg)
+
+    kept = []
+    visible = []  # (role, content) of kept transcript messages
+    i = 0
+    while i < len(unique):
+        # Collect the run of visible messages starting here
+        run = []
+        j = i
+        while j < len(unique) and _visible_key(unique[j]) is not None:
+            run.append(_visible_key(unique[j]))
+            j += 1
+
+        # A replay is the entire transcript so far, then the new user message
+        replayed = len(visible)
+        if (replayed and len(run) > replayed and run[:replayed] == visible
+                and run[replayed][0] == "user"
+                and not any(_generated(msg) for msg in unique[i:i + replayed])):
+            i += replayed
+            continue
+
+        msg = unique[i]
+        kept.append(msg)
+        if _visible_key(msg) is not None:
+            visible.append(_visible_key(msg))
+        i += 1
+
+    return kept
+
+
+def _build_rewrite_graph(checkpointer):
+    """
+    Builds a minimal graph over the shared State used only to rewrite
+    checkpointed messages; no LLM is needed for the migration.
+    """
+    graph_builder = StateGraph(State)
+    graph_builder.add_node("chatbot", lambda state: {})
+    graph_builder.add_edge(START, "chatbot")
+    graph_builder.add_edge("chatbot", END)
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def list_thread_ids(checkpointer):
+    """Returns the ids of all threads stored in the checkpointer"""
+    return sorted({
+        checkpoint.config["configurable"]["thread_id"]
+        for checkpoint in checkpointer.list(None)
+    })
+
+
+def compact_thread(checkpointer, thread_id, dry_run=False):
+    """
+    Compacts the history of a single thread.
+
+    Threads paused at a pending approval are skipped so their interrupt is
+    not lost.
+
+    Returns:
+        Tuple of (messages before, messages after, dropped messages, id of
+        the checkpoint holding the original history or None)
+    """
+    graph = _build_rewrite_graph(checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+
+    snapshot = graph.get_state(config)
+    messages = snapshot.values.get("messages", []) if snapshot.values else []
+    if snapshot.next:
+        return len(messages), len(messages), [], None
+
+    compacted = dedupe_messages(messages)
+    kept = {id(msg) for msg in compacted}
+    dropped = [msg for msg in messages if id(msg) not in kept]
+    original = snapshot.config["configurable"].get("checkpoint_id") if dropped else None
+    if not dry_run and dropped:
+        graph.update_state(
+            config,
+            {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + compacted},
+            as_node="chatbot"
+        )
+
+    return len(messages), len(compacted), dropped, original
+
+
+def main():
+    from src.checkpoint.redis_checkpoint import RedisCheckpointer
+
+    parser = argparse.ArgumentParser(description="Remove duplicated history from checkpointed threads")
+    parser.add_argument("thread_ids", nargs="*", help="Threads to compact (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Report without rewriting")
+    args = parser.parse_args()
+
+    checkpointer = RedisCheckpointer().get_checkpointer()
+    thread_ids = args.thread_ids or list_thread_ids(checkpointer)
+
+    total_before = total_after = 0
+    for thread_id in thread_ids:
+        before, after, dropped, original = compact_thread(checkpointer, thread_id, dry_run=args.dry_run)
+        total_before += before
+        total_after += after
+        if before != after:
+            print(f"   {thread_id}: {before} -> {after} messages (original history in checkpoint {original})")
+            if args.dry_run:
+                for msg in dropped:
+                    print(f"      - {msg.type}: {str(msg.content)[:80]!r}")
+
+    action = "Would remove" if args.dry_run else "Removed"
+    print(f"✅ {action} {total_before - total_after} duplicated messages across {len(thread_ids)} threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import os
 from dotenv import load_dotenv
+from src.checkpoint.retention import get_ttl_config
+from src.checkpoint.serializer import wrap_checkpointer
+from src.checkpoint.write_behind import wrap_write_behind
 
 load_dotenv()
 
@@ -11,6 +14,7 @@ class RedisCheckpointer:
     
     _instance = None
     _checkpointer = None
+    _async_checkpointer = None
     
     def __new__(cls):
         """Singleton pattern to reuse Redis connection"""
@@ -54,7 +58,10 @@ class RedisCheckpointer:
                 redis_conn.close()
                 
                 # Create checkpointer - pass URL string, not connection object!
-                self._checkpointer = RedisSaver.from_conn_string(redis_url)
+                # (from_conn_string is a context manager, so construct directly)
+                # Idle threads expire after CHECKPOINT_TTL_MINUTES (if set)
+                self._checkpointer = RedisSaver(redis_url=redis_url, ttl=get_ttl_config())
+                self._checkpointer.setup()
                 print(f"   ✅ RedisSaver created")
                 
                 # Get info
@@ -63,6 +70,7 @@ class RedisCheckpointer:
                 print(f"   Version: {info.get('redis_version', 'unknown')}")
                 print(f"   Memory: {info.get('used_memory_human', 'unknown')}")
                 
+                self._checkpointer = wrap_checkpointer(self._checkpointer)
                 return self._checkpointer
                 
             except ImportError as ie:
@@ -71,7 +79,7 @@ class RedisCheckpointer:
                 print("   Falling back to in-memory checkpointer...")
                 
                 from langgraph.checkpoint.memory import MemorySaver
-                self._checkpointer = MemorySaver()
+                self._checkpointer = wrap_checkpointer(MemorySaver())
                 
             except Exception as e:
                 print(f"❌ Redis connection failed: {e}")
@@ -85,9 +93,67 @@ class RedisCheckpointer:
                 print("\n   Falling back to in-memory checkpointer...")
                 
                 from langgraph.checkpoint.memory import MemorySaver
-                self._checkpointer = MemorySaver()
+                self._checkpointer = wrap_checkpointer(MemorySaver())
         
         return self._checkpointer
+
+    async def get_async_checkpointer(self):
+        """
+        Returns an async Redis checkpointer for graphs driven with
+        astream/aget_state/aupdate_state, so checkpoint I/O never blocks the event loop.
+        
+        Returns:
+            AsyncRedisSaver or MemorySaver: Async Redis checkpointer or in-memory fallback
+        """
+        if self._async_checkpointer is None:
+            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+            
+            try:
+                print(f"🔄 Connecting to Redis (async)...")
+                print(f"   URL: {self._mask_url(redis_url)}")
+                
+                from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+                from redis.asyncio import Redis as AsyncRedis
+                
+                if redis_url.startswith("rediss://"):
+                    redis_url = redis_url.replace("rediss://", "redis://", 1)
+                    print(f"   Changed to non-SSL (redis://)")
+                
+                # Test connection first
+                redis_conn = AsyncRedis.from_url(
+                    redis_url,
+                    decode_responses=False,
+                    socket_connect_timeout=10,
+                    socket_timeout=10
+                )
+                await redis_conn.ping()
+                await redis_conn.aclose()
+                print(f"   ✅ Redis connection test successful")
+                
+                checkpointer = AsyncRedisSaver(redis_url=redis_url, ttl=get_ttl_config())
+                await checkpointer.asetup()
+                # CHECKPOINT_CODEC=zstd stores messages compressed and delta-encoded;
+                # CHECKPOINT_WRITE_BEHIND=true serves active threads from memory
+                self._async_checkpointer = wrap_write_behind(wrap_checkpointer(checkpointer))
+                print(f"✅ AsyncRedisSaver ready!")
+                
+            except ImportError as ie:
+                print(f"❌ Import Error: {ie}")
+                print(f"   Run: pip install langgraph-checkpoint-redis")
+                print("   Falling back to in-memory checkpointer...")
+                
+                from langgraph.checkpoint.memory import MemorySaver
+                self._async_checkpointer = wrap_checkpointer(MemorySaver())
+                
+            except Exception as e:
+                print(f"❌ Redis connection failed: {e}")
+                print(f"   Error type: {type(e).__name__}")
+                print("   Falling back to in-memory checkpointer...")
+                
+                from langgraph.checkpoint.memory import MemorySaver
+                self._async_checkpointer = wrap_checkpointer(MemorySaver())
+        
+        return self._async_checkpointer
     
     def _mask_url(self, url: str) -> str:
         """Mask password in URL"""
@@ -110,4 +176,19 @@ class RedisCheckpointer:
             except Exception as e:
                 print(f"⚠️ Error closing: {e}")
             finally:
-                self._checkpointer = None
\ No newline at end of file
+                self._checkpointer = None
+
+    async def aclose(self):
+        """Close async Redis connection"""
+        if self._async_checkpointer is not None:
+            try:
+                # Write out anything the write-behind tier still holds
+                if hasattr(self._async_checkpointer, 'aflush'):
+                    await self._async_checkpointer.aflush()
+                if hasattr(self._async_checkpointer, '_redis'):
+                    await self._async_checkpointer._redis.aclose()
+                print("✅ Async Redis connection closed")
+            except Exception as e:
+                print(f"⚠️ Error closing: {e}")
+            finally:
+                self._async_checkpointer = None
\ No newline at end of file
@@ -0,0 +1,225 @@
+# File: src/checkpoint/retention.py
+"""
+Checkpoint retention: keeps the last K checkpoints per thread and reports
+the bytes reclaimed.
+
+Every graph super-step writes a checkpoint and the savers keep all of them,
+so Redis memory grows with every turn. Idle threads expire via
+CHECKPOINT_TTL_MINUTES (see RedisCheckpointer); CheckpointCompactor prunes
+superseded checkpoints and their pending writes of active threads.
+
+Usage:
+    python -m src.checkpoint.retention [--keep-last 5] [thread_id ...]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+# Key prefixes written by langgraph-checkpoint-redis and the number of
+# ":"-separated segments after the thread id (namespace, checkpoint id, ...).
+# Thread ids may contain ":" themselves, so they are cut from both ends.
+REDIS_KEY_LAYOUTS = {
+    "checkpoint:": 2,
+    "checkpoint_write:": 4,
+    "checkpoint_latest:": 1,
+    "write_keys_zset:": 2
+}
+
+
+def get_ttl_config():
+    """
+    TTL config for the Redis savers: idle threads expire after
+    CHECKPOINT_TTL_MINUTES (refreshed on every read). None disables expiry.
+    """
+    ttl_minutes = float(os.getenv("CHECKPOINT_TTL_MINUTES", "0"))
+    if ttl_minutes <= 0:
+        return None
+    return {"default_ttl": ttl_minutes, "refresh_on_read": True}
+
+
+def memory_saver_bytes(saver, thread_ids=None) -> int:
+    """Serialized bytes held by an in-memory checkpointer (optionally for some threads)"""
+    selected = set(thread_ids) if thread_ids is not None else None
+    total = 0
+    for thread_id, namespaces in saver.storage.items():
+        if selected is not None and thread_id not in selected:
+            continue
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _parent in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    for key, (_type, blob) in saver.blobs.items():
+        if selected is None or key[0] in selected:
+            total += len(blob)
+    for key, writes in saver.writes.items():
+        if selected is None or key[0] in selected:
+            total += sum(len(write[2][1]) for write in writes.values())
+    return total
+
+
+def prune_memory_saver(saver, thread_id: str, keep_last: int) -> int:
+    """
+    Keeps the newest `keep_last` checkpoints of each namespace of a thread
+    in an in-memory saver, dropping older ones, their pending writes and
+    channel blobs no kept checkpoint references. Returns checkpoints removed.
+    """
+    removed = 0
+    referenced = set()
+    for checkpoint_ns, checkpoints in saver.storage.get(thread_id, {}).items():
+        ordered = sorted(checkpoints, reverse=True)  # ids are time-ordered
+        for checkpoint_id in ordered[keep_last:]:
+            del checkpoints[checkpoint_id]
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            removed += 1
+        for checkpoint, _metadata, _parent in checkpoints.values():
+            versions = saver.serde.loads_typed(checkpoint).get("channel_versions", {})
+            referenced.update((checkpoint_ns, channel, version) for channel, version in versions.items())
+
+    for key in [k for k in saver.blobs if k[0] == thread_id and k[1:] not in referenced]:
+        del saver.blobs[key]
+    return removed
+
+
+class CheckpointCompactor:
+    """
+    Prunes superseded checkpoints so each thread keeps only its newest
+    `keep_last` (CHECKPOINT_KEEP_LAST) per namespace.
+
+    Threads touched since the last run are tracked with `mark_dirty`; the
+    background loop (every CHECKPOINT_COMPACT_INTERVAL seconds, 0 disables
+    it) compacts only those. `compact()` with no dirty tracking compacts
+    every stored thread. Works with AsyncRedisSaver and the in-memory saver.
+    """
+
+    def __init__(self, checkpointer, keep_last: int = None, interval: float = None):
+        self.checkpointer = checkpointer
+        self.keep_last = keep_last if keep_last is not None else int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+        self.interval = interval if interval is not None else float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "600"))
+        self.last_report = None
+        self._dirty = set()
+        self._task = None
+
+    @property
+    def _redis(self):
+        # AsyncRedisSaver keeps its client here; None for the in-memory saver
+        return getattr(self.checkpointer, "_redis", None)
+
+    def mark_dirty(self, thread_id: str):
+        """Record that a thread got new checkpoints"""
+        self._dirty.add(thread_id)
+
+    async def _redis_usage(self, thread_ids=None) -> dict:
+        """Returns {thread_id: (keys, bytes)} from one SCAN over the checkpoint keys"""
+        selected = set(thread_ids) if thread_ids is not None else None
+        keys_by_thread = {}
+        for prefix, trailing in REDIS_KEY_LAYOUTS.items():
+            async for key in self._redis.scan_iter(match=prefix + "*", count=1000):
+                key = key.decode() if isinstance(key, bytes) else key
+                parts = key[len(prefix):].rsplit(":", trailing)
+                if len(parts) <= trailing or (selected is not None and parts[0] not in selected):
+                    continue
+                keys_by_thread.setdefault(parts[0], []).append(key)
+
+        usage = {}
+        for thread_id, keys in keys_by_thread.items():
+            pipeline = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipeline.memory_usage(key)
+            sizes = await pipeline.execute()
+            usage[thread_id] = (len(keys), sum(size or 0 for size in sizes))
+        return usage
+
+    async def compact(self, thread_ids=None) -> dict:
+        """
+        Prunes the given threads (default: every stored thread) and returns
+        a report with the bytes reclaimed.
+        """
+        start = time.perf_counter()
+        if self._redis is not None:
+            before = await self._redis_usage(thread_ids)
+            thread_ids = list(before) if thread_ids is None else list(thread_ids)
+            if thread_ids:
+                await self.checkpointer.aprune(thread_ids, keep_last=self.keep_last)
+            after = await self._redis_usage(thread_ids)
+            bytes_before = sum(size for _keys, size in before.values())
+            bytes_after = sum(size for _keys, size in after.values())
+            keys_before = sum(keys for keys, _size in before.values())
+            keys_after = sum(keys for keys, _size in after.values())
+            removed = None
+        elif hasattr(self.checkpointer, "storage"):
+            thread_ids = list(self.checkpointer.storage) if thread_ids is None else list(thread_ids)
+            bytes_before = memory_saver_bytes(self.checkpointer, thread_ids)
+            # A delta-encoding wrapper keeps back to a keyframe, so kept deltas stay decodable
+            keep_count = getattr(self.checkpointer, "keep_count", lambda _thread_id, keep_last: keep_last)
+            removed = sum(prune_memory_saver(self.checkpointer, t, keep_count(t, self.keep_last))
+                          for t in thread_ids)
+            bytes_after = memory_saver_bytes(self.checkpointer, thread_ids)
+            keys_before = keys_after = None
+        else:
+            raise TypeError(f"Compaction is not supported for {type(self.checkpointer).__name__}")
+
+        self.last_report = {
+            "threads": len(thread_ids),
+            "keep_last": self.keep_last,
+            "checkpoints_removed": removed,
+            "keys_before": keys_before,
+            "keys_after": keys_after,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_reclaimed": bytes_before - bytes_after,
+            "duration_s": round(time.perf_counter() - start, 4),
+            "finished_at": time.time()
+        }
+        return self.last_report
+
+    async def compact_dirty(self) -> dict:
+        """Compacts only the threads marked dirty since the last run"""
+        thread_ids, self._dirty = list(self._dirty), set()
+        return await self.compact(thread_ids)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._dirty:
+                continue
+            try:
+                report = await self.compact_dirty()
+                print(f"✅ Compacted {report['threads']} threads, reclaimed {report['bytes_reclaimed']} bytes")
+            except Exception as e:
+                print(f"⚠️ Checkpoint compaction failed: {e}")
+
+    def start(self):
+        """Start the background compaction loop on the running event loop"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+async def _main(args):
+    from src.checkpoint.redis_checkpoint import RedisCheckpointer
+
+    checkpointer = await RedisCheckpointer().get_async_checkpointer()
+    compactor = CheckpointCompactor(checkpointer, keep_last=args.keep_last)
+    report = await compactor.compact(args.thread_ids or None)
+    await RedisCheckpointer().aclose()
+
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+    print(f"✅ Reclaimed {report['bytes_reclaimed']} bytes across {report['threads']} threads")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune superseded checkpoints and report bytes reclaimed")
+    parser.add_argument("thread_ids", nargs="*", help="Threads to compact (default: all)")
+    parser.add_argument("--keep-last", type=int, default=None, help="Checkpoints to keep per thread")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+# File: src/checkpoint/serializer.py
+"""
+Compact checkpoint storage: msgpack + zstd, with delta-encoded message lists.
+
+Every graph super-step writes a checkpoint holding the whole conversation,
+so without this each step rewrites every message (Tavily results included)
+as JSON. With CHECKPOINT_CODEC=zstd the checkpointer is wrapped in a
+DeltaCheckpointer, which stores the messages channel as:
+
+    keyframe  every message, msgpack-encoded and zstd-compressed
+    delta     only the messages appended since the parent checkpoint, plus
+              the parent's id; at most CHECKPOINT_KEYFRAME_INTERVAL - 1
+              deltas follow a keyframe
+
+Reading a delta walks back to the nearest keyframe (or to a checkpoint
+decoded recently, which stay in an in-process LRU). Checkpoints written
+without the codec stay readable, so it can be turned on for existing
+threads; turning it off again needs the threads cleared.
+
+zstd can use a shared dictionary (CHECKPOINT_ZSTD_DICT) trained on our own
+messages, which pays off on short messages:
+
+    python -m src.checkpoint.serializer train-dict --out chatbot.zdict [thread_id ...]
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+import zstandard
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from src.monitoring.metrics import registry
+
+# Channel values written by DeltaCheckpointer are dicts tagged with MARKER
+MARKER = "__checkpoint_codec__"
+CODEC = "mpz1"
+
+ENCODED_BYTES = registry.counter(
+    "chatbot_checkpoint_encoded_bytes_total",
+    "Compressed bytes of message channels written, by frame kind",
+    labels=("kind",)
+)
+BASE_FETCHES = registry.counter(
+    "chatbot_checkpoint_delta_fetches_total",
+    "Parent checkpoints read to decode a delta (decode cache misses)"
+)
+
+
+class ZstdMsgpackSerializer:
+    """
+    Serializer (SerializerProtocol) writing msgpack compressed with zstd.
+
+    Objects are packed with LangGraph's msgpack encoding (so LangChain
+    messages round-trip with their types) at CHECKPOINT_ZSTD_LEVEL, with the
+    optional shared dictionary from CHECKPOINT_ZSTD_DICT. Usable as any
+    saver's `serde`; data of other types is loaded by JsonPlusSerializer.
+    """
+
+    TYPE = "msgpack+zstd"
+
+    def __init__(self, level: int = None, dictionary: bytes = None):
+        self.level = level if level is not None else int(os.getenv("CHECKPOINT_ZSTD_LEVEL", "3"))
+        if dictionary is None and os.getenv("CHECKPOINT_ZSTD_DICT"):
+            with open(os.environ["CHECKPOINT_ZSTD_DICT"], "rb") as f:
+                dictionary = f.read()
+        self.dictionary = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        self._packer = JsonPlusSerializer()
+        # Compressor objects are not thread-safe; building one digests the dictionary
+        self._local = threading.local()
+
+    @property
+    def dict_id(self) -> int:
+        return self.dictionary.dict_id() if self.dictionary is not None else 0
+
+    def _compressor(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary)
+            self._local.decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+        return self._local.compressor, self._local.decompressor
+
+    def dumps(self, obj) -> bytes:
+        type_, data = self._packer.dumps_typed(obj)
+        compressor, _ = self._compressor()
+        # One type byte ("m" msgpack, "j" json, ...) ahead of the zstd frame
+        return type_[:1].encode() + compressor.compress(data)
+
+    def loads(self, data: bytes):
+        packed_type = {"m": "msgpack", "j": "json", "b": "bytes", "n": "null"}[data[:1].decode()]
+        _, decompressor = self._compressor()
+        return self._packer.loads_typed((packed_type, decompressor.decompress(data[1:])))
+
+    def dumps_typed(self, obj) -> tuple:
+        return self.TYPE, self.dumps(obj)
+
+    def loads_typed(self, data: tuple):
+        type_, payload = data
+        if type_ == self.TYPE:
+            return self.loads(payload)
+        return self._packer.loads_typed(data)
+
+
+def train_dictionary(samples, size: int = 16384) -> bytes:
+    """Trains a zstd dictionary on sample objects (e.g. message lists) packed as msgpack"""
+    packer = JsonPlusSerializer()
+    packed = [packer.dumps_typed(sample)[1] for sample in samples]
+    return zstandard.train_dictionary(size, packed).as_bytes()
+
+
+class _Decoded:
+    __slots__ = ("messages", "depth")
+
+    def __init__(self, messages, depth: int):
+        self.messages = tuple(messages)
+        self.depth = depth
+
+
+def _extends(prefix, messages) -> bool:
+    """True if `messages` starts with exactly the messages of `prefix`"""
+    if len(prefix) > len(messages):
+        return False
+    return all(a is b or a == b for a, b in zip(prefix, messages))
+
+
+def is_encoded(value) -> bool:
+    return isinstance(value, dict) and value.get(MARKER) == CODEC
+
+
+class DeltaCheckpointer(BaseCheckpointSaver):
+    """
+    Wraps a checkpointer (AsyncRedisSaver, the in-memory saver, ...) and
+    stores its message-list `channels` as zstd-compressed msgpack keyframes
+    and deltas (see the module docstring). Everything else, including
+    pending writes (which only hold a step's new messages), is passed
+    through, as are the wrapped saver's own attributes (`_redis`, ...).
+
+    Pruning only drops whole keyframe groups: a thread keeps at least the
+    asked number of checkpoints, extended back to the nearest keyframe
+    (`keep_count`), so every kept delta can still reach its keyframe.
+    """
+
+    def __init__(self, saver, codec: ZstdMsgpackSerializer = None, channels=("messages",),
+                 keyframe_interval: int = None, cache_size: int = None):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.codec = codec or ZstdMsgpackSerializer()
+        self.channels = tuple(channels)
+        self.keyframe_interval = max(1, keyframe_interval if keyframe_interval is not None
+                                     else int(os.getenv("CHECKPOINT_KEYFRAME_INTERVAL", "16")))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv("CHECKPOINT_DECODE_CACHE", "512"))
+        self._cache = OrderedDict()  # (thread_id, ns, channel, checkpoint_id) -> _Decoded
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only reached for attributes the wrapper lacks, e.g. the saver's `_redis` or `storage`
+        if name == "saver":
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    def _is_keyframe(self, checkpoint_tuple) -> bool:
+        """True if no channel of the checkpoint depends on an older one"""
+        values = checkpoint_tuple.checkpoint.get("channel_values") or {}
+        return not any(is_encoded(values.get(channel)) and values[channel].get("depth", 0) > 0
+                       for channel in self.channels)
+
+    def keep_count(self, thread_id: str, keep_last: int) -> int:
+        """
+        How many of a thread's newest checkpoints to keep so at least
+        `keep_last` remain and the oldest kept one is a keyframe
+        """
+        kept = 0
+        for checkpoint_tuple in self.saver.list(self._base_config(thread_id, "", None)):
+            kept += 1
+            if kept >= keep_last and self._is_keyframe(checkpoint_tuple):
+                break
+        return kept
+
+    async def akeep_count(self, thread_id: str, keep_last: int) -> int:
+        """Async keep_count"""
+        kept = 0
+        async for checkpoint_tuple in self.saver.alist(self._base_config(thread_id, "", None)):
+            kept += 1
+            if kept >= keep_last and self._is_keyframe(checkpoint_tuple):
+                break
+        return kept
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    # Decode cache
+
+    def _cache_get(self, key) -> Optional[_Decoded]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, messages, depth: int):
+        with self._lock:
+            self._cache[key] = _Decoded(messages, depth)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget_thread(self, thread_id: str):
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == thread_id]:
+                del self._cache[key]
+
+    # Encoding
+
+    def _encode(self, config, checkpoint):
+        configurable = config["configurable"]
+        thread_id, checkpoint_ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        parent_id = configurable.get("checkpoint_id")
+        values = dict(checkpoint.get("channel_values") or {})
+        for channel in self.channels:
+            messages = values.get(channel)
+            if not isinstance(messages, list):
+                continue
+            parent = self._cache_get((thread_id, checkpoint_ns, channel, parent_id)) if parent_id else None
+            if (parent is not None and parent.depth + 1 < self.keyframe_interval
+                    and _extends(parent.messages, messages)):
+                kind, depth = "delta", parent.depth + 1
+                payload = {"base": parent_id, "keep": len(parent.messages),
+                           "append": messages[len(parent.messages):]}
+            else:
+                kind, depth = "keyframe", 0
+                payload = {"append": messages}
+            data = self.codec.dumps(payload)
+            ENCODED_BYTES.inc(kind, amount=len(data))
+            values[channel] = {MARKER: CODEC, "id": checkpoint["id"], "depth": depth,
+                               "dict_id": self.codec.dict_id, "data": base64.b64encode(data).decode()}
+            self._cache_put((thread_id, checkpoint_ns, channel, checkpoint["id"]), messages, depth)
+        return {**checkpoint, "channel_values": values}
+
+    # Decoding: _resolve yields the ids of the base checkpoints it needs and
+    # is driven by a sync or async fetch
+
+    def _resolve(self, thread_id: str, checkpoint_ns: str, channel: str, value):
+        chain = []
+        messages = None
+        while is_encoded(value):
+            cached = self._cache_get((thread_id, checkpoint_ns, channel, value["id"]))
+            if cached is not None:
+                messages = list(cached.messages)
+                break
+            if value.get("dict_id", 0) != self.codec.dict_id:
+                raise ValueError(f"Checkpoint {value['id']} needs zstd dictionary {value.get('dict_id')} "
+                                 f"(CHECKPOINT_ZSTD_DICT has {self.codec.dict_id})")
+            payload = self.codec.loads(base64.b64decode(value["data"]))
+            chain.append((value, payload))
+            if payload.get("base") is None:
+                messages = []
+                break
+            BASE_FETCHES.inc()
+            base_value = yield payload["base"]
+            if base_value is None:
+                raise ValueError(f"Checkpoint {value['id']} of thread {thread_id} is a delta whose base "
+                                 f"checkpoint {payload['base']} was deleted; it cannot be decoded")
+            value = base_value
+        if messages is None:
+            # Written before the codec was enabled
+            messages = list(value) if value is not None else []
+        for value, payload in reversed(chain):
+            messages = messages[:payload.get("keep", 0)] + list(payload["append"])
+            self._cache_put((thread_id, checkpoint_ns, channel, value["id"]), messages, value["depth"])
+        return messages
+
+    def _base_config(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> dict:
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint_id}}
+
+    def _decode(self, checkpoint_tuple):
+        if checkpoint_tuple is None:
+            return None
+        thread_id, checkpoint_ns, values = self._tuple_values(checkpoint_tuple)
+        for channel in self.channels:
+            if is_encoded(values.get(channel)):
+                steps = self._resolve(thread_id, checkpoint_ns, channel, values[channel])
+                try:
+                    base_id = next(steps)
+                    while True:
+                        base = self.saver.get_tuple(self._base_config(thread_id, checkpoint_ns, base_id))
+                        base_id = steps.send(base.checkpoint["channel_values"].get(channel) if base else None)
+                except StopIteration as done:
+                    values[channel] = done.value
+        return self._with_values(checkpoint_tuple, values)
+
+    async def _adecode(self, checkpoint_tuple):
+        if checkpoint_tuple is None:
+            return None
+        thread_id, checkpoint_ns, values = self._tuple_values(checkpoint_tuple)
+        for channel in self.channels:
+            if is_encoded(values.get(channel)):
+                steps = self._resolve(thread_id, checkpoint_ns, channel, values[channel])
+                try:
+                    base_id = next(steps)
+                    while True:
+                        base = await self.saver.aget_tuple(self._base_config(thread_id, checkpoint_ns, base_id))
+                        base_id = steps.send(base.checkpoint["channel_values"].get(channel) if base else None)
+                except StopIteration as done:
+                    values[channel] = done.value
+        return self._with_values(checkpoint_tuple, values)
+
+    @staticmethod
+    def _tuple_values(checkpoint_tuple):
+        configurable = checkpoint_tuple.config["configurable"]
+        values = dict(checkpoint_tuple.checkpoint.get("channel_values") or {})
+        return configurable["thread_id"], configurable.get("checkpoint_ns", ""), values
+
+    @staticmethod
+    def _with_values(checkpoint_tuple, values) -> CheckpointTuple:
+        return checkpoint_tuple._replace(checkpoint={**checkpoint_tuple.checkpoint, "channel_values": values})
+
+    # BaseCheckpointSaver
+
+    def get_tuple(self, config) -> Optional[CheckpointTuple]:
+        return self._decode(self.saver.get_tuple(config))
+
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        return await self._adecode(await self.saver.aget_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.saver.list(config, filter=filter, before=before, limit=limit):
+            yield self._decode(checkpoint_tuple)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for checkpoint_tuple in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield await self._adecode(checkpoint_tuple)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self.saver.put(config, self._encode(config, checkpoint), metadata, new_versions)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self.saver.aput(config, self._encode(config, checkpoint), metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id: str, task_path: str = ""):
+        return self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config, writes, task_id: str, task_path: str = ""):
+        return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str):
+        self._forget_thread(thread_id)
+        return self.saver.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id: str):
+        self._forget_thread(thread_id)
+        return await self.saver.adelete_thread(thread_id)
+
+    def prune(self, thread_ids, *, keep_last: int = None, **kwargs):
+        if keep_last is None:
+            return self.saver.prune(thread_ids, **kwargs)
+        for thread_id in thread_ids:
+            self.saver.prune([thread_id], keep_last=self.keep_count(thread_id, keep_last), **kwargs)
+
+    async def aprune(self, thread_ids, *, keep_last: int = None, **kwargs):
+        if keep_last is None:
+            return await self.saver.aprune(thread_ids, **kwargs)
+        for thread_id in thread_ids:
+            await self.saver.aprune([thread_id], keep_last=await self.akeep_count(thread_id, keep_last), **kwargs)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+
+def wrap_checkpointer(saver):
+    """Wraps the saver in a DeltaCheckpointer when CHECKPOINT_CODEC=zstd; returns it as-is otherwise"""
+    codec = os.getenv("CHECKPOINT_CODEC", "json").lower()
+    if codec == "zstd":
+        print(f"✅ Checkpoints stored as msgpack+zstd (keyframe every "
+              f"{os.getenv('CHECKPOINT_KEYFRAME_INTERVAL', '16')} checkpoints)")
+        return DeltaCheckpointer(saver)
+    if codec != "json":
+        print(f"⚠️ Unknown CHECKPOINT_CODEC {codec!r}, storing checkpoints as JSON")
+    return saver
+
+
+async def _train(args):
+    from src.checkpoint.redis_checkpoint import RedisCheckpointer
+
+    checkpointer = await RedisCheckpointer().get_async_checkpointer()
+    thread_ids = args.thread_ids
+    if not thread_ids:
+        seen = set()
+        async for checkpoint_tuple in checkpointer.alist(None, limit=args.max_threads * 20):
+            seen.add(checkpoint_tuple.config["configurable"]["thread_id"])
+        thread_ids = sorted(seen)[:args.max_threads]
+
+    samples = []
+    for thread_id in thread_ids:
+        checkpoint_tuple = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+        if checkpoint_tuple is not None:
+            samples.extend([message] for message in checkpoint_tuple.checkpoint["channel_values"].get("messages", []))
+    await RedisCheckpointer().aclose()
+
+    dictionary = train_dictionary(samples, args.size)
+    with open(args.out, "wb") as f:
+        f.write(dictionary)
+    print(f"✅ Trained a {len(dictionary)} byte dictionary on {len(samples)} messages "
+          f"from {len(thread_ids)} threads: {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint codec tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train-dict", help="Train a zstd dictionary on stored messages")
+    train.add_argument("thread_ids", nargs="*", help="Threads to sample (default: up to --max-threads)")
+    train.add_argument("--out", required=True, help="Dictionary file (set CHECKPOINT_ZSTD_DICT to it)")
+    train.add_argument("--size", type=int, default=16384, help="Dictionary size in bytes")
+    train.add_argument("--max-threads", type=int, default=200)
+    asyncio.run(_train(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# File: src/checkpoint/thread_registry.py
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import weakref
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class ThreadBusyError(Exception):
+    """Raised when a thread's lock could not be acquired in time"""
+
+
+class ThreadSecretMissingError(Exception):
+    """Raised when a thread's stored API key cannot be recovered by this worker"""
+
+
+class ThreadLock:
+    """
+    Per-thread lock that serializes turns across workers and pods.
+
+    Uses a Redis lock (SET NX with a token, released with compare-and-delete)
+    renewed by a watchdog while held, so a crashed worker frees the thread
+    after `ttl` seconds. Without Redis it is an in-process asyncio.Lock.
+    """
+
+    def __init__(self, registry, thread_id: str):
+        self.registry = registry
+        self.thread_id = thread_id
+        self._lock = None
+        self._watchdog = None
+
+    async def acquire(self):
+        registry = self.registry
+        if registry._redis is None:
+            self._lock = registry._local_locks.setdefault(self.thread_id, asyncio.Lock())
+            try:
+                await asyncio.wait_for(self._lock.acquire(), registry.lock_wait)
+            except asyncio.TimeoutError:
+                raise ThreadBusyError(f"Thread {self.thread_id} is busy")
+            return self
+
+        self._lock = registry._redis.lock(
+            registry.LOCK_PREFIX + self.thread_id,
+            timeout=registry.lock_ttl,
+            sleep=0.05,
+            blocking_timeout=registry.lock_wait,
+            thread_local=False
+        )
+        if not await self._lock.acquire():
+            raise ThreadBusyError(f"Thread {self.thread_id} is busy")
+        self._watchdog = asyncio.create_task(self._renew())
+        return self
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.registry.lock_ttl / 3)
+            try:
+                await self._lock.reacquire()
+            except Exception as e:
+                print(f"⚠️ Lost lock on thread {self.thread_id}: {e}")
+                return
+
+    async def release(self):
+        try:
+            # Make the turn's checkpoints durable before another worker can take the thread
+            if self._lock is not None and self.registry.before_release is not None:
+                await self.registry.before_release(self.thread_id)
+        finally:
+            await self._release()
+
+    async def _release(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        if isinstance(self._lock, asyncio.Lock):
+            self._lock.release()
+        elif self._lock is not None:
+            try:
+                await self._lock.release()
+            except Exception as e:
+                # Expired and possibly taken over; nothing left to release
+                print(f"⚠️ Releasing lock on thread {self.thread_id}: {e}")
+        self._lock = None
+
+    async def __aenter__(self):
+        return await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+
+class ThreadRegistry:
+    """
+    Stores per-thread chatbot settings (provider, model, usecase, API key)
+    in Redis so any worker can rebuild the graph for any thread.
+    Falls back to an in-process dict when Redis is unavailable.
+    With CHECKPOINT_TTL_MINUTES set, settings expire together with the
+    thread's checkpoints and every load refreshes the expiry.
+
+    API keys never reach Redis in plaintext. With THREAD_SECRET_KEY set
+    (any passphrase; needs the `cryptography` package) they are stored
+    Fernet-encrypted, so every worker sharing the passphrase can read them.
+    Without it only a reference is stored and the key stays in this
+    process: loading the thread anywhere else (another worker, or after a
+    restart) raises ThreadSecretMissingError, and the client has to
+    initialize the thread again.
+    """
+
+    KEY_PREFIX = "chatbot:thread:"
+    LOCK_PREFIX = "chatbot:lock:"
+    SECRET_FIELDS = ("groq_api_key",)
+
+    def __init__(self):
+        self._redis = None
+        self._local = {}
+        ttl_minutes = float(os.getenv("CHECKPOINT_TTL_MINUTES", "0"))
+        self.ttl_seconds = int(ttl_minutes * 60) if ttl_minutes > 0 else None
+        self.lock_ttl = float(os.getenv("THREAD_LOCK_TTL_SECONDS", "60"))
+        self.lock_wait = float(os.getenv("THREAD_LOCK_WAIT_SECONDS", "30"))
+        # Dropped once no ThreadLock holds or waits for them
+        self._local_locks = weakref.WeakValueDictionary()
+        # Awaited with the thread_id before a thread lock is released (e.g. a checkpoint flush)
+        self.before_release = None
+        self._secrets = {}  # reference -> secret, when THREAD_SECRET_KEY is not set
+        self._cipher = self._make_cipher()
+
+    @staticmethod
+    def _make_cipher():
+        passphrase = os.getenv("THREAD_SECRET_KEY")
+        if not passphrase:
+            return None
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            print("⚠️ THREAD_SECRET_KEY needs the cryptography package; API keys stay in this process")
+            return None
+        return Fernet(base64.urlsafe_b64encode(hashlib.sha256(passphrase.encode()).digest()))
+
+    def _seal(self, settings: dict) -> dict:
+        """Replaces secret fields with their ciphertext (or a reference) before they go to Redis"""
+        sealed = dict(settings)
+        for field in self.SECRET_FIELDS:
+            secret = sealed.pop(field, None)
+            if not secret:
+                continue
+            if self._cipher is not None:
+                sealed[field + "_encrypted"] = self._cipher.encrypt(secret.encode()).decode()
+            else:
+                reference = hashlib.sha256(secret.encode()).hexdigest()[:16]
+                self._secrets[reference] = secret
+                sealed[field + "_ref"] = reference
+        return sealed
+
+    def _unseal(self, sealed: dict) -> dict:
+        settings = dict(sealed)
+        for field in self.SECRET_FIELDS:
+            encrypted = settings.pop(field + "_encrypted", None)
+            reference = settings.pop(field + "_ref", None)
+            if encrypted is not None:
+                settings[field] = self._decrypt(encrypted)
+            elif reference is not None:
+                if reference not in self._secrets:
+                    raise ThreadSecretMissingError(
+                        f"The {field} of this thread is not available on this worker "
+                        "(set THREAD_SECRET_KEY to share it between workers)"
+                    )
+                settings[field] = self._secrets[reference]
+        return settings
+
+    def _decrypt(self, encrypted: str) -> str:
+        if self._cipher is None:
+            raise ThreadSecretMissingError("The thread's API key is encrypted but THREAD_SECRET_KEY is not set")
+        try:
+            return self._cipher.decrypt(encrypted.encode()).decode()
+        except Exception:
+            # Encrypted under a different THREAD_SECRET_KEY
+            raise ThreadSecretMissingError("The thread's API key cannot be decrypted with THREAD_SECRET_KEY")
+
+    async def connect(self):
+        """
+        Connects to Redis using REDIS_URL. On failure the registry keeps
+        working in-memory (single worker only).
+        """
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        if redis_url.startswith("rediss://"):
+            redis_url = redis_url.replace("rediss://", "redis://", 1)
+
+        try:
+            from redis.asyncio import Redis as AsyncRedis
+
+            redis_conn = AsyncRedis.from_url(
+                redis_url,
+                decode_responses=True,
+                socket_connect_timeout=10,
+                socket_timeout=10
+            )
+            await redis_conn.ping()
+            self._redis = redis_conn
+            print("✅ Thread registry using Redis")
+            if self._cipher is None:
+                print("❌ THREAD_SECRET_KEY is not set: API keys stay in this process, so threads "
+                      "initialized here cannot be served by other workers or after a restart")
+        except Exception as e:
+            print(f"⚠️ Thread registry falling back to in-memory: {e}")
+            self._redis = None
+
+    async def save(self, thread_id: str, settings: dict):
+        """Persist settings for a thread"""
+        if self._redis is None:
+            self._local[thread_id] = dict(settings)
+            return
+        await self._redis.set(self.KEY_PREFIX + thread_id, json.dumps(self._seal(settings)), ex=self.ttl_seconds)
+
+    async def load(self, thread_id: str):
+        """Returns the settings for a thread, or None if it was never initialized"""
+        if self._redis is None:
+            settings = self._local.get(thread_id)
+            return dict(settings) if settings is not None else None
+        if self.ttl_seconds:
+            raw = await self._redis.getex(self.KEY_PREFIX + thread_id, ex=self.ttl_seconds)
+        else:
+            raw = await self._redis.get(self.KEY_PREFIX + thread_id)
+        return self._unseal(json.loads(raw)) if raw else None
+
+    async def delete(self, thread_id: str):
+        """Remove the settings for a thread"""
+        if self._redis is None:
+            self._local.pop(thread_id, None)
+            return
+        await self._redis.delete(self.KEY_PREFIX + thread_id)
+
+    def lock(self, thread_id: str) -> ThreadLock:
+        """
+        Returns the thread's lock, used as `async with registry.lock(thread_id):`.
+        Raises ThreadBusyError if it is not acquired within THREAD_LOCK_WAIT_SECONDS.
+        """
+        return ThreadLock(self, thread_id)
+
+    async def close(self):
+        """Close the Redis connection"""
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
@@ -0,0 +1,292 @@
+# File: src/checkpoint/write_behind.py
+"""
+Hot-thread checkpoint tier: an in-process LRU holding the latest
+checkpoint of each active thread, in front of the Redis checkpointer, with
+write-behind.
+
+    reads   the latest checkpoint of a cached thread comes from memory,
+            after one GET of the saver's latest-checkpoint pointer (skipped
+            while this process still has the checkpoint queued). A pointer
+            naming another checkpoint means another worker wrote since: the
+            entry is dropped and Redis is read
+    writes  checkpoints and pending writes are cached and queued; a
+            per-thread flusher writes them to Redis in order in the
+            background. Puts wait once CHECKPOINT_WRITE_BEHIND_MAX_PENDING
+            operations are queued for a thread
+    flush   aflush(thread_id) waits until everything queued is in Redis.
+            The API calls it before a turn is answered and when the thread
+            lock is released, so the next worker to take the lock finds
+            every write there (and its pointer check sees the new head)
+
+Enabled with CHECKPOINT_WRITE_BEHIND=true, for the Redis saver only.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, CheckpointTuple, copy_checkpoint, get_checkpoint_id,
+    get_checkpoint_metadata
+)
+from src.monitoring.metrics import registry
+
+FLUSH_LAG = registry.histogram(
+    "chatbot_checkpoint_flush_lag_seconds",
+    "Time from a checkpoint write being queued to it being stored in Redis"
+)
+FLUSH_ERRORS = registry.counter(
+    "chatbot_checkpoint_flush_errors_total",
+    "Failed attempts to write a queued checkpoint write to Redis"
+)
+
+
+class _HotEntry:
+    __slots__ = ("config", "checkpoint", "metadata", "parent_config", "writes", "flushed")
+
+    def __init__(self, config, checkpoint, metadata, parent_config, writes=None, flushed=False):
+        self.config = config
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.parent_config = parent_config
+        # (task_id, index) -> (task_id, channel, value), as the savers key them
+        self.writes = writes if writes is not None else OrderedDict()
+        self.flushed = flushed
+
+    def to_tuple(self) -> CheckpointTuple:
+        # Copies: the graph loop updates the versions of the checkpoint it reads in place
+        return CheckpointTuple(
+            config=self.config,
+            checkpoint=copy_checkpoint(self.checkpoint),
+            metadata=dict(self.metadata),
+            parent_config=self.parent_config,
+            pending_writes=list(self.writes.values())
+        )
+
+
+def _thread_key(config) -> tuple:
+    configurable = config["configurable"]
+    return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+
+class WriteBehindCheckpointer(BaseCheckpointSaver):
+    """
+    Wraps an async checkpointer (AsyncRedisSaver, optionally inside a
+    DeltaCheckpointer) with the hot-thread tier described in the module
+    docstring. Async only, like the API; other calls and attributes
+    (`_redis`, `aprune`'s options, ...) reach the wrapped saver.
+    """
+
+    def __init__(self, saver, max_threads: int = None, max_pending: int = None, retries: int = None):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_threads = max_threads or int(os.getenv("CHECKPOINT_HOT_THREADS", "1024"))
+        self.max_pending = max_pending or int(os.getenv("CHECKPOINT_WRITE_BEHIND_MAX_PENDING", "64"))
+        self.retries = retries if retries is not None else int(os.getenv("CHECKPOINT_FLUSH_RETRIES", "3"))
+        self._entries = OrderedDict()  # (thread_id, checkpoint_ns) -> _HotEntry
+        self._pending = {}  # thread_id -> deque of (method, args, checkpoint_id, queued_at)
+        self._flushers = {}  # thread_id -> asyncio.Task
+        self._errors = {}  # thread_id -> last flush error
+        # The pointer check needs the Redis saver's latest-checkpoint pointer
+        self._validate = hasattr(saver, "_make_redis_checkpoint_latest_key")
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.flushed = 0
+
+    def __getattr__(self, name):
+        if name == "saver":
+            raise AttributeError(name)
+        return getattr(self.saver, name)
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    # Hot entries
+
+    def _store(self, key, entry: _HotEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_threads:
+            # Queued writes do not depend on the entry, so any thread can go
+            self._entries.popitem(last=False)
+
+    async def _is_head(self, key, entry: _HotEntry) -> bool:
+        """True if Redis' latest-checkpoint pointer still names the entry's checkpoint"""
+        if not self._validate:
+            return True
+        thread_id, checkpoint_ns = key
+        pointer = await self.saver._redis.get(self.saver._make_redis_checkpoint_latest_key(thread_id, checkpoint_ns))
+        if isinstance(pointer, bytes):
+            pointer = pointer.decode()
+        return pointer == self.saver._make_redis_checkpoint_key(thread_id, checkpoint_ns, entry.checkpoint["id"])
+
+    # Write-behind queue
+
+    def _start_flusher(self, thread_id: str) -> asyncio.Task:
+        flusher = self._flushers.get(thread_id)
+        if flusher is None or flusher.done():
+            flusher = self._flushers[thread_id] = asyncio.create_task(self._drain(thread_id))
+        return flusher
+
+    async def _enqueue(self, thread_id: str, method: str, args: tuple, checkpoint_id: str = None):
+        queue = self._pending.setdefault(thread_id, deque())
+        queue.append((method, args, checkpoint_id, time.perf_counter()))
+        self._start_flusher(thread_id)
+        if len(queue) >= self.max_pending:
+            await self.aflush(thread_id)
+
+    async def _drain(self, thread_id: str):
+        """Writes the thread's queued operations to the saver in order, retrying with backoff"""
+        queue = self._pending.get(thread_id)
+        failures = 0
+        while queue:
+            item = queue[0]
+            method, args, checkpoint_id, queued_at = item
+            try:
+                await getattr(self.saver, method)(*args)
+            except Exception as e:
+                FLUSH_ERRORS.inc()
+                self._errors[thread_id] = e
+                failures += 1
+                if failures > self.retries:
+                    # Left queued; the next aflush (or write) retries
+                    print(f"⚠️ Checkpoint write-behind for thread {thread_id} failed: {e}")
+                    return
+                await asyncio.sleep(min(0.1 * 2 ** failures, 2.0))
+                continue
+            failures = 0
+            self._errors.pop(thread_id, None)
+            if queue and queue[0] is item:
+                queue.popleft()
+            self.flushed += 1
+            FLUSH_LAG.observe(time.perf_counter() - queued_at)
+            if checkpoint_id is not None:
+                entry = self._entries.get(_thread_key(args[0]))
+                if entry is not None and entry.checkpoint["id"] == checkpoint_id:
+                    entry.flushed = True
+        # Drained: forget the thread until its next write
+        if self._pending.get(thread_id) is queue:
+            del self._pending[thread_id]
+            self._errors.pop(thread_id, None)
+            if self._flushers.get(thread_id) is asyncio.current_task():
+                del self._flushers[thread_id]
+
+    async def aflush(self, thread_id: str = None):
+        """
+        Waits until the queued writes of a thread (default: every thread)
+        are stored; raises the last error if they could not be
+        """
+        for thread_id in [thread_id] if thread_id is not None else list(self._pending):
+            if not self._pending.get(thread_id):
+                continue
+            flusher = self._start_flusher(thread_id)
+            # Shielded: a cancelled request must not stop the flush midway
+            await asyncio.shield(flusher)
+            if self._pending.get(thread_id):
+                raise self._errors.get(thread_id) or RuntimeError(f"Checkpoints of thread {thread_id} not flushed")
+
+    # BaseCheckpointSaver
+
+    async def aget_tuple(self, config) -> Optional[CheckpointTuple]:
+        key = _thread_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        entry = self._entries.get(key)
+        if entry is not None and checkpoint_id in (None, entry.checkpoint["id"]):
+            # A checkpoint never changes once written; only "latest" needs the pointer check
+            if checkpoint_id is not None or not entry.flushed or await self._is_head(key, entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.to_tuple()
+            self.stale += 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+        self.misses += 1
+        await self.aflush(key[0])
+        checkpoint_tuple = await self.saver.aget_tuple(config)
+        if checkpoint_tuple is not None and checkpoint_id is None:
+            current = self._entries.get(key)
+            # Unless a newer checkpoint was put meanwhile
+            if current is None or current.checkpoint["id"] < checkpoint_tuple.checkpoint["id"]:
+                writes, counts = OrderedDict(), {}
+                for task_id, channel, value in checkpoint_tuple.pending_writes or []:
+                    index = counts[task_id] = counts.get(task_id, -1) + 1
+                    writes[(task_id, WRITES_IDX_MAP.get(channel, index))] = (task_id, channel, value)
+                self._store(key, _HotEntry(checkpoint_tuple.config, copy_checkpoint(checkpoint_tuple.checkpoint),
+                                           dict(checkpoint_tuple.metadata), checkpoint_tuple.parent_config,
+                                           writes, flushed=True))
+        return checkpoint_tuple
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        await self.aflush(config["configurable"]["thread_id"] if config else None)
+        async for checkpoint_tuple in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        thread_id, checkpoint_ns = key = _thread_key(config)
+        parent_id = config["configurable"].get("checkpoint_id")
+        checkpoint = copy_checkpoint(checkpoint)
+        next_config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                        "checkpoint_id": checkpoint["id"]}}
+        parent_config = ({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                           "checkpoint_id": parent_id}} if parent_id else None)
+        self._store(key, _HotEntry(next_config, checkpoint, get_checkpoint_metadata(config, metadata), parent_config))
+        await self._enqueue(thread_id, "aput", (config, checkpoint, metadata, new_versions), checkpoint["id"])
+        return next_config
+
+    async def aput_writes(self, config, writes, task_id: str, task_path: str = ""):
+        key = _thread_key(config)
+        entry = self._entries.get(key)
+        if entry is not None and entry.checkpoint["id"] == config["configurable"].get("checkpoint_id"):
+            for index, (channel, value) in enumerate(writes):
+                write_key = (task_id, WRITES_IDX_MAP.get(channel, index))
+                # Special channels (errors, interrupts, ...) replace; others keep the first write
+                if write_key[1] < 0 or write_key not in entry.writes:
+                    entry.writes[write_key] = (task_id, channel, value)
+        await self._enqueue(key[0], "aput_writes", (config, list(writes), task_id, task_path))
+
+    async def adelete_thread(self, thread_id: str):
+        queue = self._pending.pop(thread_id, None)
+        if queue:
+            queue.clear()
+        flusher = self._flushers.pop(thread_id, None)
+        if flusher is not None and not flusher.done():
+            # Let the write in flight land before deleting under it
+            await asyncio.wait([flusher])
+        self._errors.pop(thread_id, None)
+        for key in [key for key in self._entries if key[0] == thread_id]:
+            del self._entries[key]
+        return await self.saver.adelete_thread(thread_id)
+
+    async def aprune(self, thread_ids, **kwargs):
+        for thread_id in thread_ids:
+            await self.aflush(thread_id)
+        return await self.saver.aprune(thread_ids, **kwargs)
+
+    def stats(self) -> dict:
+        """Returns hot-tier metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_threads": self.max_threads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "pending_writes": sum(len(queue) for queue in self._pending.values()),
+            "flushed_writes": self.flushed
+        }
+
+
+def wrap_write_behind(saver):
+    """Wraps the saver in a WriteBehindCheckpointer when CHECKPOINT_WRITE_BEHIND=true; returns it as-is otherwise"""
+    if os.getenv("CHECKPOINT_WRITE_BEHIND", "false").lower() != "true":
+        return saver
+    print("✅ Hot-thread checkpoint cache with write-behind enabled")
+    return WriteBehindCheckpointer(saver)
@@ -0,0 +1,128 @@
+# File: src/graph/batch.py
+"""
+Batch execution of chat turns through a compiled graph.
+
+Items are dicts {"thread_id", "message"} (plus an optional per-item
+"config", e.g. with callbacks or a user_id). Turns of different threads
+run concurrently through `graph.abatch_as_completed` / `graph.batch`,
+capped at `max_concurrency` (BATCH_MAX_CONCURRENCY); turns of the same
+thread run in item order, one after the other, in successive waves.
+
+Every turn goes through the same compiled graph, so the batch shares the
+pooled LLM clients, the search cache and the response cache with the API.
+"""
+
+import asyncio
+import os
+import uuid
+from langchain_core.messages import HumanMessage
+from src.graph.stream_events import approval_request, get_bot_response
+
+
+def get_max_concurrency(max_concurrency: int = None) -> int:
+    return max_concurrency or int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+def _waves(items) -> list:
+    """
+    Splits items into waves of at most one turn per thread: wave k holds
+    the k-th turn of every thread. Returns lists of (index, item).
+    """
+    waves = []
+    turns = {}
+    for index, item in enumerate(items):
+        turn = turns.get(item["thread_id"], 0)
+        turns[item["thread_id"]] = turn + 1
+        if turn == len(waves):
+            waves.append([])
+        waves[turn].append((index, item))
+    return waves
+
+
+def _prepare(wave, max_concurrency: int):
+    """Graph inputs and configs for a wave, plus the id of each new user message"""
+    inputs, configs, message_ids = [], [], []
+    for _index, item in wave:
+        message = HumanMessage(content=item["message"], id=str(uuid.uuid4()))
+        config = dict(item.get("config") or {})
+        config["configurable"] = {**config.get("configurable", {}), "thread_id": item["thread_id"]}
+        config["max_concurrency"] = max_concurrency
+        inputs.append({"messages": [message]})
+        configs.append(config)
+        message_ids.append(message.id)
+    return inputs, configs, message_ids
+
+
+def _result(index: int, item: dict, message_id: str, output) -> dict:
+    """
+    One item's outcome: status "ok", "pending_approval" (the turn stopped
+    before a tool call that needs approval) or "error"
+    """
+    result = {"index": index, "thread_id": item["thread_id"], "message_id": message_id}
+    if isinstance(output, Exception):
+        return {**result, "status": "error", "error": str(output)}
+    messages = output.get("messages", [])
+    pending_approval = approval_request(messages)
+    return {
+        **result,
+        "status": "pending_approval" if pending_approval else "ok",
+        "response": "" if pending_approval else get_bot_response(messages),
+        "pending_approval": pending_approval,
+        "state": output
+    }
+
+
+async def abatch_chat(graph, items, max_concurrency: int = None, lock=None):
+    """
+    Runs the items through `graph` and yields one result per item as soon
+    as it completes (see `_result`; "index" refers to the position in `items`).
+
+    `lock(thread_id)`, if given, returns the thread's turn lock (e.g.
+    ThreadRegistry.lock); it is held from the start of the item's wave until
+    the item completes, and an item whose lock cannot be acquired fails.
+    """
+    max_concurrency = get_max_concurrency(max_concurrency)
+    for wave in _waves(items):
+        locks = {}
+        if lock is not None:
+            wave, failed = await _acquire_locks(wave, lock, locks)
+            for index, item, error in failed:
+                yield _result(index, item, None, error)
+
+        inputs, configs, message_ids = _prepare(wave, max_concurrency)
+        try:
+            async for position, output in graph.abatch_as_completed(inputs, configs, return_exceptions=True):
+                index, item = wave[position]
+                held = locks.pop(item["thread_id"], None)
+                if held is not None:
+                    await held.release()
+                yield _result(index, item, message_ids[position], output)
+        finally:
+            for held in locks.values():
+                await held.release()
+
+
+async def _acquire_locks(wave, lock, locks: dict):
+    """Acquires the wave's thread locks concurrently; returns (acquired items, failed items)"""
+    results = await asyncio.gather(*(lock(item["thread_id"]).acquire() for _index, item in wave),
+                                   return_exceptions=True)
+    acquired, failed = [], []
+    for (index, item), result in zip(wave, results):
+        if isinstance(result, Exception):
+            failed.append((index, item, result))
+        else:
+            locks[item["thread_id"]] = result
+            acquired.append((index, item))
+    return acquired, failed
+
+
+def batch_chat(graph, items, max_concurrency: int = None) -> list:
+    """Blocking version of abatch_chat, using `graph.batch`; returns the results in item order"""
+    max_concurrency = get_max_concurrency(max_concurrency)
+    results = [None] * len(items)
+    for wave in _waves(items):
+        inputs, configs, message_ids = _prepare(wave, max_concurrency)
+        outputs = graph.batch(inputs, configs, return_exceptions=True)
+        for (index, item), message_id, output in zip(wave, message_ids, outputs):
+            results[index] = _result(index, item, message_id, output)
+    return results
@@ -2,14 +2,21 @@ from langgraph.graph import StateGraph
 from src.state.state import State   
 from langgraph.graph import START, END
 from src.nodes.basic_chatbot_node import BasicChatbotNode
-from src.tools.search_tool import get_tools, create_tool_node
+from src.tools.search_tool import get_tools
 from langgraph.prebuilt import tools_condition
 from src.nodes.chatbot_with_tool_node import ChatbotWithToolNode
+from src.nodes.summarization_node import SummarizationNode
+from src.nodes.context_policy import ContextPolicy
+from src.nodes.memory_node import MemoryNode
+from src.nodes.parallel_tool_node import ParallelToolNode, pending_tool_calls, needs_approval
 
 
 class GraphBuilder:
-    def __init__(self, model):
+    def __init__(self, model, context_policy: ContextPolicy = None, memory_store=None, response_cache=None):
         self.llm = model
+        self.context_policy = context_policy or ContextPolicy()
+        self.memory_store = memory_store
+        self.response_cache = response_cache
         self.graph_builder = StateGraph(State)
 
     def basic_chatbot_build_graph(self):
@@ -19,9 +26,9 @@ class GraphBuilder:
         and integrates it into the graph. The chatbot node is set as both the 
         entry and exit point of the graph.
         """
-        self.basic_chatbot_node = BasicChatbotNode(self.llm)
+        self.basic_chatbot_node = BasicChatbotNode(self.llm, self.context_policy)
 
-        self.graph_builder.add_node("chatbot", self.basic_chatbot_node.process)
+        self.graph_builder.add_node("chatbot", self.basic_chatbot_node.as_runnable())
         self.graph_builder.add_edge(START, "chatbot")
         self.graph_builder.add_edge("chatbot", END)
 
@@ -29,30 +36,50 @@ class GraphBuilder:
         """
         Builds an advanced chatbot graph with tool integration and selective human-in-the-loop.
         Only WhatsApp messages require human approval. Web searches execute automatically.
+        Independent tool calls in one turn run concurrently.
         
         Flow: 
         - Web search: START -> chatbot -> tools -> chatbot -> END
-        - WhatsApp: START -> chatbot -> human_approval (interrupt) -> tools -> chatbot -> END
+        - WhatsApp: START -> chatbot -> human_approval (interrupt) -> chatbot -> END
+        - Mixed: START -> chatbot -> tools -> human_approval (interrupt) -> chatbot -> END
+        - With a memory store: START -> retrieve_memory -> chatbot ... -> remember -> END
+        
+        Long threads are summarized after the turn, off the request path
+        (see `summarizer` and main.schedule_summary).
         """
-        # Define the tool and tool node
+        # Define the tools; auto-approved calls and calls needing approval
+        # are executed by separate nodes
         tools = get_tools()
-        tool_node = create_tool_node(tools)
+        tool_node = ParallelToolNode(tools, select=lambda call: not needs_approval(call))
+        approval_tool_node = ParallelToolNode(tools, select=needs_approval)
 
         # Define the LLM
         llm = self.llm
 
         # Define the chatbot node
-        obj_chatbot_with_node = ChatbotWithToolNode(llm)
+        obj_chatbot_with_node = ChatbotWithToolNode(llm, self.context_policy, self.response_cache)
         chatbot_node = obj_chatbot_with_node.create_chatbot(tools)
+        self.summarization_node = SummarizationNode(llm, self.context_policy)
         
         # Add nodes
         self.graph_builder.add_node("chatbot", chatbot_node)
-        self.graph_builder.add_node("tools", tool_node)
-        self.graph_builder.add_node("human_approval", tool_node)  # Same as tools, but will interrupt
+        # Target for update_state when a background summary is applied (never run)
+        self.graph_builder.add_node("summarize", lambda state: {})
+        self.graph_builder.add_node("tools", tool_node.as_runnable("tools"))
+        self.graph_builder.add_node("human_approval", approval_tool_node.as_runnable("human_approval"))  # Will interrupt
+        # Target for update_state when delivery statuses are written back (never run)
+        self.graph_builder.add_node("record_delivery", lambda state: {})
         
         # Define edges
-        # Start with chatbot
-        self.graph_builder.add_edge(START, "chatbot")
+        # Start with chatbot (after memory retrieval when a memory store is configured)
+        if self.memory_store is not None:
+            memory_node = MemoryNode(self.memory_store)
+            self.graph_builder.add_node("retrieve_memory", memory_node.retrieve_runnable())
+            self.graph_builder.add_node("remember", memory_node.remember_runnable())
+            self.graph_builder.add_edge(START, "retrieve_memory")
+            self.graph_builder.add_edge("retrieve_memory", "chatbot")
+        else:
+            self.graph_builder.add_edge(START, "chatbot")
         
         # Conditional routing based on tool calls
         def route_tools(state: State) -> str:
@@ -62,31 +89,41 @@ class GraphBuilder:
             
             # Check if chatbot wants to end conversation
             if not hasattr(last_message, "tool_calls") or not last_message.tool_calls:
+                if self.memory_store is not None:
+                    return "remember"
                 return END
             
-            # Check if approval needed
-            for tool_call in last_message.tool_calls:
-                tool_name = tool_call.get("name", "")
-                if tool_name == "send_whatsapp_message":
-                    return "human_approval"
-            
-            # Auto-approve other tools
-            return "tools"
+            # Run auto-approved tools first; only calls needing approval are held
+            if any(not needs_approval(tool_call) for tool_call in last_message.tool_calls):
+                return "tools"
+            return "human_approval"
+        
+        def route_after_tools(state: State) -> str:
+            """Hold remaining calls for approval, otherwise return to the chatbot"""
+            if any(needs_approval(tool_call) for tool_call in pending_tool_calls(state["messages"])):
+                return "human_approval"
+            return "chatbot"
         
         # Add conditional edge from chatbot
+        route_map = {
+            "human_approval": "human_approval",
+            "tools": "tools",
+            END: END
+        }
+        if self.memory_store is not None:
+            route_map["remember"] = "remember"
+            self.graph_builder.add_edge("remember", END)
+        self.graph_builder.add_conditional_edges("chatbot", route_tools, route_map)
+        
+        # After tools execute, wait for approval if needed, else go back to chatbot
         self.graph_builder.add_conditional_edges(
-            "chatbot",
-            route_tools,
-            {
-                "human_approval": "human_approval",
-                "tools": "tools",
-                END: END
-            }
+            "tools",
+            route_after_tools,
+            {"human_approval": "human_approval", "chatbot": "chatbot"}
         )
-        
-        # After tools execute, go back to chatbot
-        self.graph_builder.add_edge("tools", "chatbot")
         self.graph_builder.add_edge("human_approval", "chatbot")
+        self.graph_builder.add_edge("summarize", END)
+        self.graph_builder.add_edge("record_delivery", END)
 
     def setup_graph(self, usecase: str, checkpointer=None):
         """
@@ -116,9 +153,12 @@ class GraphBuilder:
             # 1. Persistent conversation memory across sessions (Redis)
             # 2. Selective human-in-the-loop for WhatsApp messages
             print(f"✅ Compiling graph with {type(checkpointer).__name__}")
-            return self.graph_builder.compile(
+            graph = self.graph_builder.compile(
                 checkpointer=checkpointer,
                 interrupt_before=["human_approval"]  # Only interrupt for WhatsApp
             )
+            # Used by main.schedule_summary to fold old turns in after a turn
+            graph.summarizer = self.summarization_node
+            return graph
 
         return self.graph_builder.compile()
\ No newline at end of file
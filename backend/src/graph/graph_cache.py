@@ -0,0 +1,150 @@
+# File: src/graph/graph_cache.py
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from src.LLMs.provider_registry import get_provider
+
+
+def create_llm(llm_provider: str, model_name: str, groq_api_key: str = None,
+               fallbacks: list = None, hedge: bool = False):
+    """
+    Creates the LLM wrapper for a provider ("Ollama" or "Groq").
+
+    With `fallbacks` ([{"llm_provider", "model_name"}, ...]) the primary and
+    fallbacks are wrapped in a RouterLLM that fails over (and, with `hedge`,
+    hedges slow requests) in that order. Provider SDKs are imported on
+    first use (see src/LLMs/provider_registry.py).
+    """
+    if fallbacks:
+        llms = [create_llm(llm_provider, model_name, groq_api_key)]
+        llms += [create_llm(f["llm_provider"], f["model_name"], groq_api_key) for f in fallbacks]
+        return get_provider("Router")(llms, hedge=hedge)
+    if llm_provider == "Ollama":
+        return get_provider("Ollama")(model_name)
+    return get_provider("Groq")(model_name, groq_api_key)
+
+
+class GraphCache:
+    """
+    LRU cache of compiled graphs shared across threads.
+
+    A compiled graph holds no per-conversation state (the thread_id is only
+    passed through `configurable`), so one graph per
+    (provider, model, usecase, api key) serves every thread using that setup.
+    """
+
+    def __init__(self, max_size: int = None, memory_store=None, response_cache=None):
+        self.memory_store = memory_store
+        self.response_cache = response_cache
+        self.max_size = max_size or int(os.getenv("GRAPH_CACHE_SIZE", "32"))
+        self._graphs = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}  # key -> lock held while that graph is built
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(llm_provider: str, model_name: str, usecase: str, groq_api_key: str = None,
+                 fallbacks: list = None, hedge: bool = False):
+        """Builds the cache key; the API key is hashed, never stored as-is"""
+        api_key_hash = hashlib.sha256(groq_api_key.encode()).hexdigest()[:16] if groq_api_key else None
+        pool = tuple((f["llm_provider"], f["model_name"]) for f in fallbacks or ())
+        return (llm_provider, model_name, usecase, api_key_hash, pool, bool(pool) and hedge)
+
+    def get_or_build(self, llm_provider: str, model_name: str, usecase: str,
+                     checkpointer=None, groq_api_key: str = None,
+                     fallbacks: list = None, hedge: bool = False):
+        """
+        Returns the compiled graph for this configuration, building and
+        caching it on first use and evicting the least recently used graph
+        when the cache is full.
+        """
+        key = self.make_key(llm_provider, model_name, usecase, groq_api_key, fallbacks, hedge)
+
+        graph = self._lookup(key)
+        if graph is not None:
+            return graph
+
+        # Only builds of the same configuration wait for each other
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        with build_lock:
+            with self._lock:
+                graph = self._graphs.get(key)
+                if graph is not None:
+                    self._graphs.move_to_end(key)
+                    self.hits += 1
+                    return graph
+                self.misses += 1
+
+            try:
+                # Imported here so the LangGraph stack loads with the first graph, not the API
+                from src.graph.graph_builder import GraphBuilder
+
+                llm = create_llm(llm_provider, model_name, groq_api_key, fallbacks, hedge)
+                graph = GraphBuilder(
+                    llm,
+                    memory_store=self.memory_store,
+                    response_cache=self.response_cache
+                ).setup_graph(usecase, checkpointer)
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+
+            # Published and unmarked in one step, so a concurrent miss finds one or the other
+            with self._lock:
+                self._graphs[key] = graph
+                self._building.pop(key, None)
+                while len(self._graphs) > self.max_size:
+                    self._graphs.popitem(last=False)
+                    self.evictions += 1
+
+            return graph
+
+    async def aget_or_build(self, llm_provider: str, model_name: str, usecase: str,
+                            checkpointer=None, groq_api_key: str = None,
+                            fallbacks: list = None, hedge: bool = False):
+        """
+        Async get_or_build: a cached graph is returned directly, a miss is
+        built in a worker thread so the event loop keeps serving requests.
+        """
+        key = self.make_key(llm_provider, model_name, usecase, groq_api_key, fallbacks, hedge)
+        graph = self._lookup(key)
+        if graph is not None:
+            return graph
+        return await asyncio.to_thread(
+            self.get_or_build, llm_provider, model_name, usecase,
+            checkpointer, groq_api_key, fallbacks, hedge
+        )
+
+    def _lookup(self, key):
+        """Returns the cached graph for `key` (counting a hit), or None"""
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+            return graph
+
+    def clear(self):
+        """Drops all cached graphs"""
+        with self._lock:
+            self._graphs.clear()
+
+    def stats(self) -> dict:
+        """Returns cache metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._graphs),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
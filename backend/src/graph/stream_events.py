@@ -0,0 +1,99 @@
+# File: src/graph/stream_events.py
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from src.nodes.parallel_tool_node import pending_tool_calls, needs_approval
+
+# Stream modes requested from the graph: "messages" carries LLM tokens,
+# "updates" carries the node outputs used for tool start/end events
+STREAM_MODES = ["messages", "updates"]
+
+
+def to_stream_events(mode, payload):
+    """
+    Converts one chunk from graph.stream/astream(stream_mode=STREAM_MODES)
+    into a list of UI events.
+
+    Args:
+        mode: The stream mode the chunk came from ("messages" or "updates")
+        payload: The chunk payload
+
+    Returns:
+        List of dicts with 'event' and 'data' keys. Event types are
+        'token', 'tool_start' and 'tool_end'.
+    """
+    events = []
+
+    if mode == "messages":
+        message, metadata = payload
+        # Only forward tokens generated by the chatbot node
+        if (isinstance(message, AIMessageChunk)
+                and metadata.get("langgraph_node") == "chatbot"
+                and isinstance(message.content, str)
+                and message.content):
+            events.append({"event": "token", "data": {"content": message.content}})
+
+    elif mode == "updates":
+        for node, update in payload.items():
+            if not isinstance(update, dict):
+                continue
+            for msg in update.get("messages", []):
+                if node == "chatbot" and getattr(msg, "tool_calls", None):
+                    for tool_call in msg.tool_calls:
+                        events.append({
+                            "event": "tool_start",
+                            "data": {
+                                "id": tool_call.get("id"),
+                                "name": tool_call["name"],
+                                "args": tool_call["args"]
+                            }
+                        })
+                elif isinstance(msg, ToolMessage):
+                    events.append({
+                        "event": "tool_end",
+                        "data": {
+                            "id": msg.tool_call_id,
+                            "name": msg.name,
+                            "content": msg.content
+                        }
+                    })
+
+    return events
+
+
+def get_pending_approval(snapshot):
+    """
+    Returns the pending approval payload if the graph is interrupted before
+    the human_approval node, otherwise None.
+    """
+    if snapshot.next and "human_approval" in snapshot.next:
+        return approval_request(snapshot.values["messages"])
+    return None
+
+
+def approval_request(messages):
+    """
+    Returns the approval payload for the pending tool call that needs
+    approval, if any. Auto-approved tools may already have run, so this
+    looks for the pending call rather than at the last message.
+    """
+    for tool_call in pending_tool_calls(messages):
+        if needs_approval(tool_call):
+            return {
+                "tool_call": {
+                    "name": tool_call["name"],
+                    "args": tool_call["args"]
+                }
+            }
+    return None
+
+
+def get_bot_response(messages):
+    """
+    Returns the content of the last assistant message that is not a bare tool call.
+    """
+    for msg in reversed(messages):
+        if hasattr(msg, "type") and msg.type == "ai":
+            content = msg.content
+            if content and not (hasattr(msg, "tool_calls") and msg.tool_calls and not content):
+                return content
+    return ""
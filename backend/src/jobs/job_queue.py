@@ -0,0 +1,217 @@
+# File: src/jobs/job_queue.py
+
+import json
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Job statuses; a job ends "succeeded" or "failed"
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+# The last event a job publishes
+TERMINAL_EVENTS = ("done", "error")
+
+
+class JobQueue:
+    """
+    Queue of long-running chat turns on a Redis Stream.
+
+    The API enqueues a job (XADD to JOBS_STREAM) and returns its id; worker
+    processes consume the stream through one consumer group, so each job
+    goes to a single worker. Job status and result live in a hash that
+    expires JOB_TTL_SECONDS after the last update, progress events in a
+    per-job stream clients can follow (see `events`).
+
+    A job stays pending in the group until its worker acks it. Workers
+    heartbeat their running jobs (`touch`), so an entry idle for more than
+    JOB_CLAIM_IDLE_SECONDS belongs to a crashed worker and is claimed by
+    another one (`claim_stale`); after JOB_MAX_ATTEMPTS starts it fails.
+
+    Requires Redis: without it `enabled` is False and the API runs turns inline.
+    """
+
+    STREAM = "chatbot:jobs"
+    GROUP = "chatbot-workers"
+    JOB_PREFIX = "chatbot:job:"
+
+    def __init__(self):
+        self._redis = None
+        self.ttl_seconds = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+        self.claim_idle = float(os.getenv("JOB_CLAIM_IDLE_SECONDS", "60"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.stream_maxlen = int(os.getenv("JOB_STREAM_MAXLEN", "100000"))
+        self.events_maxlen = int(os.getenv("JOB_EVENTS_MAXLEN", "5000"))
+        self.poll_ms = int(float(os.getenv("JOB_POLL_SECONDS", "5")) * 1000)
+
+    @property
+    def enabled(self) -> bool:
+        return self._redis is not None
+
+    async def connect(self, redis_conn=None):
+        """
+        Connects to Redis using REDIS_URL (or uses `redis_conn`, which must
+        decode responses) and creates the consumer group. On failure the
+        queue stays disabled.
+        """
+        try:
+            if redis_conn is None:
+                from redis.asyncio import Redis as AsyncRedis
+
+                redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+                if redis_url.startswith("rediss://"):
+                    redis_url = redis_url.replace("rediss://", "redis://", 1)
+                # Blocking reads wait up to poll_ms, so the socket timeout must be longer
+                redis_conn = AsyncRedis.from_url(
+                    redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=10,
+                    socket_timeout=10 + self.poll_ms / 1000
+                )
+            await redis_conn.ping()
+            try:
+                await redis_conn.xgroup_create(self.STREAM, self.GROUP, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._redis = redis_conn
+            print("✅ Job queue using Redis Streams")
+        except Exception as e:
+            print(f"⚠️ Job queue disabled: {e}")
+            self._redis = None
+
+    def job_key(self, job_id: str) -> str:
+        return self.JOB_PREFIX + job_id
+
+    def events_key(self, job_id: str) -> str:
+        return self.JOB_PREFIX + job_id + ":events"
+
+    async def enqueue(self, kind: str, payload: dict) -> dict:
+        """Adds a job of `kind` ("chat" or "approve") and returns its record"""
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "thread_id": payload.get("thread_id") or "",
+            "status": QUEUED,
+            "attempts": 0,
+            "created_at": time.time()
+        }
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key(job["id"]), mapping=job)
+            pipe.expire(self.job_key(job["id"]), self.ttl_seconds)
+            pipe.xadd(self.STREAM, {"job_id": job["id"], "kind": kind, "payload": json.dumps(payload)},
+                      maxlen=self.stream_maxlen, approximate=True)
+            await pipe.execute()
+        return job
+
+    async def get(self, job_id: str):
+        """Returns a job's record (with decoded result or error), or None if unknown or expired"""
+        raw = await self._redis.hgetall(self.job_key(job_id))
+        if not raw:
+            return None
+        job = dict(raw)
+        job["attempts"] = int(job.get("attempts", 0))
+        for field in ("created_at", "started_at", "finished_at"):
+            if field in job:
+                job[field] = float(job[field])
+        for field in ("result", "error"):
+            if field in job:
+                job[field] = json.loads(job[field])
+        return job
+
+    async def update(self, job_id: str, **fields):
+        """Updates a job's record and refreshes its expiry; dict values are stored as JSON"""
+        mapping = {key: json.dumps(value, default=str) if isinstance(value, dict) else value
+                   for key, value in fields.items()}
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key(job_id), mapping=mapping)
+            pipe.expire(self.job_key(job_id), self.ttl_seconds)
+            await pipe.execute()
+
+    async def start(self, job_id: str, consumer: str) -> int:
+        """Marks a job running on `consumer` and returns its attempt number"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(self.job_key(job_id), "attempts", 1)
+            pipe.hset(self.job_key(job_id), mapping={"status": RUNNING, "worker": consumer,
+                                                     "started_at": time.time()})
+            pipe.expire(self.job_key(job_id), self.ttl_seconds)
+            attempts, *_ = await pipe.execute()
+        return attempts
+
+    async def publish(self, job_id: str, event: str, data):
+        """Appends a progress event to the job's event stream"""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xadd(self.events_key(job_id), {"event": event, "data": json.dumps(data, default=str)},
+                      maxlen=self.events_maxlen, approximate=True)
+            pipe.expire(self.events_key(job_id), self.ttl_seconds)
+            await pipe.execute()
+
+    async def events(self, job_id: str, last_id: str = "0"):
+        """
+        Yields (event_id, event, data) for the job's events after `last_id`,
+        waiting for new ones, until the job's "done" or "error" event
+        """
+        key = self.events_key(job_id)
+        while True:
+            response = await self._redis.xread({key: last_id}, count=100, block=self.poll_ms)
+            if not response:
+                job = await self.get(job_id)
+                if job is not None and job["status"] not in FINISHED:
+                    continue
+                # Finished (or expired) while we waited: drain what is left
+                response = await self._redis.xread({key: last_id}, count=self.events_maxlen)
+                if not response:
+                    return
+            for _key, entries in response:
+                for event_id, fields in entries:
+                    last_id = event_id
+                    yield event_id, fields["event"], json.loads(fields["data"])
+                    if fields["event"] in TERMINAL_EVENTS:
+                        return
+
+    async def read(self, consumer: str, count: int, block_ms: int = None) -> list:
+        """Reads up to `count` new jobs for `consumer`; returns (entry_id, fields) pairs"""
+        response = await self._redis.xreadgroup(self.GROUP, consumer, {self.STREAM: ">"}, count=count,
+                                                block=self.poll_ms if block_ms is None else block_ms)
+        return [entry for _key, entries in response or [] for entry in entries]
+
+    async def claim_stale(self, consumer: str, count: int) -> list:
+        """Claims up to `count` jobs left pending by crashed workers; returns (entry_id, fields) pairs"""
+        _next, entries, *_deleted = await self._redis.xautoclaim(
+            self.STREAM, self.GROUP, consumer, int(self.claim_idle * 1000), start_id="0-0", count=count
+        )
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def touch(self, consumer: str, entry_ids):
+        """Resets the idle time of running jobs so they are not claimed while alive"""
+        if entry_ids:
+            await self._redis.xclaim(self.STREAM, self.GROUP, consumer, 0, list(entry_ids), justid=True)
+
+    async def ack(self, entry_id: str):
+        """Acknowledges a finished job and removes it from the stream"""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.xack(self.STREAM, self.GROUP, entry_id)
+            pipe.xdel(self.STREAM, entry_id)
+            await pipe.execute()
+
+    async def stats(self) -> dict:
+        """Queue depth: jobs not yet read, jobs running (pending in the group) and consumers"""
+        if self._redis is None:
+            return {"enabled": False}
+        groups = {group["name"]: group for group in await self._redis.xinfo_groups(self.STREAM)}
+        group = groups.get(self.GROUP, {})
+        return {
+            "enabled": True,
+            "stream_length": await self._redis.xlen(self.STREAM),
+            "queued": group.get("lag"),
+            "running": group.get("pending", 0),
+            "consumers": group.get("consumers", 0)
+        }
+
+    async def close(self):
+        """Close the Redis connection"""
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
@@ -0,0 +1,158 @@
+# File: src/jobs/job_worker.py
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from src.jobs.job_queue import SUCCEEDED, FAILED, FINISHED, TERMINAL_EVENTS
+from src.monitoring.metrics import registry
+
+JOBS = registry.counter(
+    "chatbot_jobs_total",
+    "Jobs finished by this worker",
+    labels=("kind", "status")
+)
+JOB_CLAIMS = registry.counter(
+    "chatbot_job_claims_total",
+    "Jobs of crashed workers claimed by this worker"
+)
+JOB_WAIT = registry.histogram(
+    "chatbot_job_queue_wait_seconds",
+    "Time from enqueue to the first start of a job",
+    labels=("kind",)
+)
+JOB_DURATION = registry.histogram(
+    "chatbot_job_duration_seconds",
+    "Duration of job runs",
+    labels=("kind", "status")
+)
+
+
+class JobWorker:
+    """
+    Consumes a JobQueue and runs up to `concurrency` jobs at a time
+    (JOB_WORKER_CONCURRENCY). Scale out by starting more worker processes;
+    they share the consumer group.
+
+    `handlers` maps a job kind to `async handler(payload, publish)`, which
+    runs the job, calls `await publish(event, data)` for progress events and
+    ends with a "done" event (the job's result) or an "error" event (its
+    failure). Jobs are acked once finished; a job whose worker dies stays
+    pending and is claimed by another worker after JOB_CLAIM_IDLE_SECONDS.
+    """
+
+    def __init__(self, queue, handlers: dict, concurrency: int = None, consumer: str = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency or int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._running = {}  # entry_id -> task
+        self._stopping = False
+
+    async def run(self):
+        """Runs until `stop()`; then waits for the running jobs to finish"""
+        heartbeat = asyncio.create_task(self._heartbeat())
+        last_claim = 0.0
+        print(f"✅ Job worker {self.consumer} running up to {self.concurrency} jobs")
+        try:
+            while not self._stopping:
+                free = self.concurrency - len(self._running)
+                if free <= 0:
+                    await asyncio.wait(list(self._running.values()), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                try:
+                    entries = []
+                    if time.monotonic() - last_claim >= self.queue.claim_idle / 2:
+                        last_claim = time.monotonic()
+                        entries = await self.queue.claim_stale(self.consumer, free)
+                        JOB_CLAIMS.inc(amount=len(entries))
+                    if not entries:
+                        entries = await self.queue.read(self.consumer, free, block_ms=1000)
+                except Exception as e:
+                    print(f"⚠️ Job worker {self.consumer} reading jobs: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                for entry_id, fields in entries:
+                    if entry_id not in self._running:
+                        self._running[entry_id] = asyncio.create_task(self._handle(entry_id, fields))
+        finally:
+            if self._running:
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            heartbeat.cancel()
+            print(f"✅ Job worker {self.consumer} stopped")
+
+    def stop(self):
+        """Stop taking new jobs; `run` returns once the running ones finish"""
+        self._stopping = True
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.queue.claim_idle / 3)
+            try:
+                await self.queue.touch(self.consumer, list(self._running))
+            except Exception as e:
+                print(f"⚠️ Job worker {self.consumer} heartbeat: {e}")
+
+    async def _handle(self, entry_id: str, fields: dict):
+        kind = fields["kind"]
+        start = time.perf_counter()
+        status = FAILED
+        try:
+            status = await self._run(fields["job_id"], kind, fields)
+            await self.queue.ack(entry_id)
+        except asyncio.CancelledError:
+            # Shutting down mid-job: leave it pending so another worker claims it
+            raise
+        except Exception as e:
+            print(f"⚠️ Job {fields['job_id']} failed: {e}")
+        finally:
+            self._running.pop(entry_id, None)
+            JOBS.inc(kind, status)
+            JOB_DURATION.observe(time.perf_counter() - start, kind, status)
+
+    async def _run(self, job_id: str, kind: str, fields: dict) -> str:
+        """Runs one job and stores its outcome; returns its final status"""
+        job = await self.queue.get(job_id)
+        if job is None:
+            # Expired before any worker got to it; nobody is waiting for it
+            return "expired"
+        if job["status"] in FINISHED:
+            # Finished by a worker that died before acking it
+            return job["status"]
+        attempts = await self.queue.start(job_id, self.consumer)
+        if attempts == 1:
+            JOB_WAIT.observe(max(0.0, time.time() - job["created_at"]), kind)
+        if attempts > self.queue.max_attempts:
+            await self._finish(job_id, FAILED, "error", {"detail": f"Job abandoned after {attempts - 1} attempts"})
+            return FAILED
+
+        outcome = {}
+
+        async def publish(event: str, data):
+            if event in TERMINAL_EVENTS:
+                outcome["event"], outcome["data"] = event, data
+            else:
+                await self.queue.publish(job_id, event, data)
+
+        handler = self.handlers.get(kind)
+        if handler is None:
+            await publish("error", {"detail": f"Unknown job kind: {kind}"})
+        else:
+            try:
+                await handler(json.loads(fields["payload"]), publish)
+            except Exception as e:
+                await publish("error", {"detail": f"Error running job: {str(e)}"})
+        if "event" not in outcome:
+            outcome = {"event": "error", "data": {"detail": "Job finished without a result"}}
+
+        status = SUCCEEDED if outcome["event"] == "done" else FAILED
+        await self._finish(job_id, status, outcome["event"], outcome["data"])
+        return status
+
+    async def _finish(self, job_id: str, status: str, event: str, data):
+        """Stores the job's outcome, then publishes it as the last event"""
+        await self.queue.update(job_id, status=status, finished_at=time.time(),
+                                **{"result" if status == SUCCEEDED else "error": data})
+        await self.queue.publish(job_id, event, data)
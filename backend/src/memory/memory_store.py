@@ -0,0 +1,207 @@
+# File: src/memory/memory_store.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import numpy as np
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder based on feature hashing of word unigrams
+    and bigrams. Needs no model download or network, so it is used for tests
+    and as the default when no other embedder is configured.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str):
+        words = re.findall(r"\w+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts) -> np.ndarray:
+        """Returns an (n, dim) float32 array of L2-normalized vectors"""
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.md5(feature.encode()).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class LangChainEmbedder:
+    """
+    Adapts any LangChain `Embeddings` implementation (e.g. OllamaEmbeddings)
+    to the embedder interface used by MemoryStore.
+    """
+
+    def __init__(self, embeddings, dim: int):
+        self.embeddings = embeddings
+        self.dim = dim
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype="float32")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class _Namespace:
+    """FAISS index plus metadata for a single tenant"""
+
+    def __init__(self, index, records):
+        self.index = index
+        self.records = records  # id -> {"text": ..., "metadata": ...}
+        self.unflushed = 0
+
+
+class MemoryStore:
+    """
+    Long-term semantic memory backed by FAISS.
+
+    Each namespace (user or thread) has its own inner-product index over
+    normalized vectors (cosine similarity) stored as `<namespace>.faiss`,
+    with the memory texts in an append-only `<namespace>.jsonl` sidecar.
+    Indexes are opened memory-mapped, so large namespaces are paged in by the
+    OS instead of being read into RAM. Metadata is written on every add and
+    the index every `flush_every` adds; vectors missing from the index after
+    a crash are re-embedded from the sidecar on load.
+    """
+
+    def __init__(self, base_dir: str, embedder=None, flush_every: int = None, mmap: bool = True):
+        self.base_dir = base_dir
+        self.embedder = embedder or HashingEmbedder()
+        self.flush_every = flush_every or int(os.getenv("MEMORY_FLUSH_EVERY", "20"))
+        self.mmap = mmap
+        self._namespaces = {}
+        self._lock = threading.RLock()
+        os.makedirs(base_dir, exist_ok=True)
+
+    def _path(self, namespace: str, suffix: str) -> str:
+        """Filesystem-safe path for a namespace, unique even after sanitizing"""
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)[:64]
+        digest = hashlib.sha256(namespace.encode()).hexdigest()[:8]
+        return os.path.join(self.base_dir, f"{safe}-{digest}{suffix}")
+
+    def _load(self, namespace: str) -> _Namespace:
+        import faiss
+
+        records = {}
+        meta_path = self._path(namespace, ".jsonl")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        records[record["id"]] = record
+
+        index_path = self._path(namespace, ".faiss")
+        if os.path.exists(index_path):
+            flags = faiss.IO_FLAG_MMAP if self.mmap else 0
+            index = faiss.read_index(index_path, flags)
+        else:
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.embedder.dim))
+
+        # Recover vectors that were recorded but not yet flushed to the index
+        missing = [rid for rid in sorted(records) if rid >= index.ntotal]
+        if missing:
+            vectors = self.embedder.embed([records[rid]["text"] for rid in missing])
+            index.add_with_ids(vectors, np.asarray(missing, dtype="int64"))
+
+        return _Namespace(index, records)
+
+    def _get(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = self._load(namespace)
+            self._namespaces[namespace] = ns
+        return ns
+
+    def add(self, namespace: str, texts, metadata=None) -> list:
+        """
+        Embeds and adds memories to a namespace.
+
+        Args:
+            namespace: Tenant key (user id or thread id)
+            texts: List of memory texts
+            metadata: Optional list of dicts, one per text
+
+        Returns:
+            List of ids assigned to the new memories
+        """
+        if not texts:
+            return []
+        metadata = metadata or [{} for _ in texts]
+        vectors = self.embedder.embed(texts)
+
+        with self._lock:
+            ns = self._get(namespace)
+            start = ns.index.ntotal
+            ids = list(range(start, start + len(texts)))
+            ns.index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+
+            with open(self._path(namespace, ".jsonl"), "a", encoding="utf-8") as f:
+                for rid, text, meta in zip(ids, texts, metadata):
+                    record = {"id": rid, "text": text, "metadata": meta}
+                    ns.records[rid] = record
+                    f.write(json.dumps(record) + "\n")
+
+            ns.unflushed += len(texts)
+            if ns.unflushed >= self.flush_every:
+                self._flush(namespace, ns)
+
+        return ids
+
+    def search(self, namespace: str, query: str, k: int = 3, min_score: float = 0.0) -> list:
+        """
+        Returns up to `k` memories most similar to `query`, best first, as
+        dicts with 'id', 'text', 'score' and 'metadata'.
+        """
+        vector = self.embedder.embed([query])
+        with self._lock:
+            ns = self._get(namespace)
+            if ns.index.ntotal == 0:
+                return []
+            scores, ids = ns.index.search(vector, min(k, ns.index.ntotal))
+
+            results = []
+            for score, rid in zip(scores[0], ids[0]):
+                if rid < 0 or score < min_score:
+                    continue
+                record = ns.records[int(rid)]
+                results.append({
+                    "id": int(rid),
+                    "text": record["text"],
+                    "score": float(score),
+                    "metadata": record["metadata"]
+                })
+            return results
+
+    def _flush(self, namespace: str, ns: _Namespace):
+        import faiss
+
+        index_path = self._path(namespace, ".faiss")
+        tmp_path = index_path + ".tmp"
+        faiss.write_index(ns.index, tmp_path)
+        os.replace(tmp_path, index_path)
+        ns.unflushed = 0
+
+    def flush(self):
+        """Writes all pending index changes to disk"""
+        with self._lock:
+            for namespace, ns in self._namespaces.items():
+                if ns.unflushed:
+                    self._flush(namespace, ns)
+
+    def close(self):
+        """Flushes and drops all open namespaces"""
+        self.flush()
+        with self._lock:
+            self._namespaces.clear()
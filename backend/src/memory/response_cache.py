@@ -0,0 +1,180 @@
+# File: src/memory/response_cache.py
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from src.memory.memory_store import HashingEmbedder
+
+# Questions that may lead to a WhatsApp send are never answered from the cache
+_SIDE_EFFECT_PATTERN = re.compile(r"whatsapp|\+?\d[\d\s-]{6,}\d", re.IGNORECASE)
+
+
+class _Namespace:
+    """Vector index and entries for one model"""
+
+    def __init__(self, dim: int):
+        import faiss
+
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.entries = OrderedDict()  # id -> {"fingerprint", "content", "expires_at"}
+        self.next_id = 0
+
+
+class SemanticResponseCache:
+    """
+    Opt-in cache of final assistant replies, looked up by embedding
+    similarity of the user's question.
+
+    A hit requires cosine similarity >= `threshold` and the same context
+    fingerprint (a hash of the last few messages before the question, and
+    of the retrieved memories and rolling summary in the prompt), so
+    follow-ups like "and tomorrow?" only match in the same context and a
+    reply built on one user's memories is never served to another.
+    Entries expire after `ttl` seconds and each namespace (one per model)
+    keeps at most `max_entries`, evicting the least recently used.
+    """
+
+    def __init__(self, embedder=None, threshold: float = None, ttl: int = None,
+                 max_entries: int = None, context_messages: int = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold or float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+        self.ttl = ttl or int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+        self.context_messages = context_messages if context_messages is not None else int(
+            os.getenv("RESPONSE_CACHE_CONTEXT_MESSAGES", "2"))
+        self._namespaces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def _last_human_index(self, messages):
+        for index in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[index], HumanMessage):
+                return index
+        return None
+
+    def _fingerprint(self, messages, question_index, memories=None, summary=None) -> str:
+        """Hash of the last few messages before the question, the memories and the summary"""
+        start = max(0, question_index - self.context_messages)
+        context = messages[start:question_index] if self.context_messages else []
+        raw = "\n".join(f"{msg.type}:{msg.content}" for msg in context if isinstance(msg.content, str))
+        raw += "\nmemories:" + "\n".join(memories or []) + "\nsummary:" + (summary or "")
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    def _get_namespace(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = _Namespace(self.embedder.dim)
+            self._namespaces[namespace] = ns
+        return ns
+
+    def _remove(self, ns: _Namespace, entry_id: int):
+        ns.entries.pop(entry_id, None)
+        ns.index.remove_ids(np.asarray([entry_id], dtype="int64"))
+
+    def lookup(self, namespace: str, messages, memories=None, summary=None):
+        """
+        Returns a new AIMessage with the cached reply when the latest message
+        is a user question with a close enough cached match, otherwise None.
+        `memories` and `summary` are the ones the prompt would include.
+        """
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        question = messages[-1].content
+        if not isinstance(question, str) or _SIDE_EFFECT_PATTERN.search(question):
+            with self._lock:
+                self.skipped += 1
+            return None
+
+        fingerprint = self._fingerprint(messages, len(messages) - 1, memories, summary)
+        vector = self.embedder.embed([question])
+
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None or ns.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = ns.index.search(vector, min(5, ns.index.ntotal))
+            now = time.time()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    continue
+                entry = ns.entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if entry["expires_at"] < now:
+                    self._remove(ns, int(entry_id))
+                    continue
+                if entry["fingerprint"] != fingerprint:
+                    continue
+                ns.entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return AIMessage(
+                    content=entry["content"],
+                    response_metadata={"semantic_cache": {"score": float(score)}}
+                )
+
+            self.misses += 1
+            return None
+
+    def store(self, namespace: str, messages, response, memories=None, summary=None):
+        """
+        Caches `response` as the answer to the latest user question when it
+        is a final reply and the turn did not send a WhatsApp message.
+        """
+        if getattr(response, "tool_calls", None) or not isinstance(response.content, str) or not response.content:
+            return
+        question_index = self._last_human_index(messages)
+        if question_index is None:
+            return
+        question = messages[question_index].content
+        if not isinstance(question, str) or _SIDE_EFFECT_PATTERN.search(question):
+            return
+        for msg in messages[question_index + 1:]:
+            for tool_call in getattr(msg, "tool_calls", None) or []:
+                if tool_call.get("name") == "send_whatsapp_message":
+                    return
+
+        fingerprint = self._fingerprint(messages, question_index, memories, summary)
+        vector = self.embedder.embed([question])
+
+        with self._lock:
+            ns = self._get_namespace(namespace)
+            entry_id = ns.next_id
+            ns.next_id += 1
+            ns.index.add_with_ids(vector, np.asarray([entry_id], dtype="int64"))
+            ns.entries[entry_id] = {
+                "fingerprint": fingerprint,
+                "content": response.content,
+                "expires_at": time.time() + self.ttl
+            }
+            self.stores += 1
+
+            while len(ns.entries) > self.max_entries:
+                oldest = next(iter(ns.entries))
+                self._remove(ns, oldest)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Returns cache metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespaces": len(self._namespaces),
+                "entries": sum(len(ns.entries) for ns in self._namespaces.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "skipped": self.skipped,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,313 @@
+# File: src/monitoring/instrumentation.py
+
+import contextvars
+import functools
+import os
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.errors import GraphBubbleUp
+from src.monitoring.metrics import registry
+
+GRAPH_DURATION = registry.histogram(
+    "chatbot_graph_run_duration_seconds", "Duration of a graph run (one chat turn or resume)"
+)
+NODE_DURATION = registry.histogram(
+    "chatbot_node_duration_seconds", "Duration of graph node executions", labels=("node",)
+)
+NODE_ERRORS = registry.counter(
+    "chatbot_node_errors_total", "Graph node executions that raised", labels=("node",)
+)
+LLM_DURATION = registry.histogram(
+    "chatbot_llm_request_duration_seconds", "Duration of chat model calls", labels=("model",)
+)
+LLM_TOKENS = registry.counter(
+    "chatbot_llm_tokens_total", "Tokens reported by the chat model", labels=("model", "type")
+)
+LLM_ERRORS = registry.counter(
+    "chatbot_llm_errors_total", "Chat model calls that raised", labels=("model",)
+)
+TOOL_DURATION = registry.histogram(
+    "chatbot_tool_duration_seconds", "Duration of tool calls", labels=("tool",)
+)
+TOOL_ERRORS = registry.counter(
+    "chatbot_tool_errors_total", "Tool calls that raised", labels=("tool",)
+)
+CHECKPOINT_DURATION = registry.histogram(
+    "chatbot_checkpoint_duration_seconds", "Duration of checkpointer operations", labels=("operation",)
+)
+CHECKPOINT_ERRORS = registry.counter(
+    "chatbot_checkpoint_errors_total", "Checkpointer operations that raised", labels=("operation",)
+)
+
+
+def _get_tracer():
+    """OpenTelemetry tracer when OTEL_ENABLED=true and the API is installed"""
+    if os.getenv("OTEL_ENABLED", "false").lower() != "true":
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("⚠️ OTEL_ENABLED is set but opentelemetry-api is not installed")
+        return None
+    return trace.get_tracer("langgraph-chatbot")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that times graph runs, nodes, LLM calls and
+    tool calls, and counts tokens and errors.
+
+    Runs inline (no executor hop) and keeps only a start time per open run,
+    so it is cheap enough to stay on in production. With OTEL_ENABLED=true
+    it also emits one span per graph run, node, LLM and tool call, tagged
+    with the thread_id.
+    """
+
+    run_inline = True
+
+    def __init__(self, tracer=None):
+        self.tracer = tracer
+        self._graphs = {}  # run_id -> (start, span)
+        self._nodes = {}  # run_id -> (node, start, span)
+        self._calls = {}  # run_id -> (label, start, span) for LLM and tool calls
+        self._parents = {}  # run_id -> parent run_id, only kept when tracing
+
+    # -- spans --------------------------------------------------------------
+
+    def _start_span(self, name: str, parent_run_id, metadata):
+        if self.tracer is None:
+            return None
+        from opentelemetry import trace
+
+        context = None
+        parent = parent_run_id
+        while parent is not None:
+            entry = self._graphs.get(parent) or self._nodes.get(parent)
+            if entry is not None:
+                context = trace.set_span_in_context(entry[-1])
+                break
+            parent = self._parents.get(parent)
+
+        attributes = {}
+        if metadata and metadata.get("thread_id"):
+            attributes["thread_id"] = str(metadata["thread_id"])
+        return self.tracer.start_span(name, context=context, attributes=attributes)
+
+    @staticmethod
+    def _end_span(span, error=None):
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+        span.end()
+
+    # -- graph and nodes ----------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            self._graphs[run_id] = (time.perf_counter(), self._start_span("graph.run", None, metadata))
+            return
+        if self.tracer is not None:
+            self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run, not the runnables nested inside it
+        if node and parent_run_id in self._graphs:
+            self._nodes[run_id] = (node, time.perf_counter(), self._start_span(f"node.{node}", parent_run_id, metadata))
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        self._finish_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        # Interrupts for human approval are control flow, not failures
+        self._finish_chain(run_id, None if isinstance(error, GraphBubbleUp) else error)
+
+    def _finish_chain(self, run_id, error=None):
+        self._parents.pop(run_id, None)
+        graph = self._graphs.pop(run_id, None)
+        if graph is not None:
+            GRAPH_DURATION.observe(time.perf_counter() - graph[0])
+            self._end_span(graph[1], error)
+            return
+        node = self._nodes.pop(run_id, None)
+        if node is not None:
+            name, start, span = node
+            NODE_DURATION.observe(time.perf_counter() - start, name)
+            if error is not None:
+                NODE_ERRORS.inc(name)
+            self._end_span(span, error)
+
+    # -- LLM calls ----------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or "unknown"
+        self._calls[run_id] = (model, time.perf_counter(), self._start_span("llm.call", parent_run_id, metadata))
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        model, start, span = call
+        LLM_DURATION.observe(time.perf_counter() - start, model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc(model, "prompt", amount=usage.get("input_tokens", 0))
+                    LLM_TOKENS.inc(model, "completion", amount=usage.get("output_tokens", 0))
+        self._end_span(span)
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        model, start, span = call
+        LLM_DURATION.observe(time.perf_counter() - start, model)
+        LLM_ERRORS.inc(model)
+        self._end_span(span, error)
+
+    # -- tool calls ---------------------------------------------------------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        # A wrapper tool (e.g. CachedSearchTool) invoking its inner tool is one call
+        if parent_run_id in self._calls:
+            return
+        tool = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._calls[run_id] = (tool, time.perf_counter(), self._start_span(f"tool.{tool}", parent_run_id, metadata))
+
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is not None:
+            TOOL_DURATION.observe(time.perf_counter() - call[1], call[0])
+            self._end_span(call[2])
+
+    def on_tool_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        call = self._calls.pop(run_id, None)
+        if call is not None:
+            TOOL_DURATION.observe(time.perf_counter() - call[1], call[0])
+            TOOL_ERRORS.inc(call[0])
+            self._end_span(call[2], error)
+
+
+# Set while a checkpointer call is being timed, so savers whose async
+# methods delegate to their sync ones are not counted twice
+_in_checkpoint_call = contextvars.ContextVar("in_checkpoint_call", default=False)
+
+_CHECKPOINT_METHODS = ("get_tuple", "put", "put_writes", "aget_tuple", "aput", "aput_writes")
+_CHECKPOINT_ITERATORS = ("list", "alist")
+
+
+def _timed_call(operation: str, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _in_checkpoint_call.get():
+            return method(*args, **kwargs)
+        token = _in_checkpoint_call.set(True)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            CHECKPOINT_ERRORS.inc(operation)
+            raise
+        finally:
+            CHECKPOINT_DURATION.observe(time.perf_counter() - start, operation)
+            _in_checkpoint_call.reset(token)
+
+    @functools.wraps(method)
+    async def async_wrapper(*args, **kwargs):
+        if _in_checkpoint_call.get():
+            return await method(*args, **kwargs)
+        token = _in_checkpoint_call.set(True)
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            CHECKPOINT_ERRORS.inc(operation)
+            raise
+        finally:
+            CHECKPOINT_DURATION.observe(time.perf_counter() - start, operation)
+            _in_checkpoint_call.reset(token)
+
+    return async_wrapper if operation.startswith("a") else wrapper
+
+
+def _timed_iterator(operation: str, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            yield from method(*args, **kwargs)
+        except Exception:
+            CHECKPOINT_ERRORS.inc(operation)
+            raise
+        finally:
+            CHECKPOINT_DURATION.observe(time.perf_counter() - start, operation)
+
+    @functools.wraps(method)
+    async def async_wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            async for item in method(*args, **kwargs):
+                yield item
+        except Exception:
+            CHECKPOINT_ERRORS.inc(operation)
+            raise
+        finally:
+            CHECKPOINT_DURATION.observe(time.perf_counter() - start, operation)
+
+    return async_wrapper if operation == "alist" else wrapper
+
+
+def instrument_checkpointer(checkpointer):
+    """
+    Times the checkpointer's read/write operations in place (per instance),
+    so every graph compiled with it is measured. Returns the same object.
+    """
+    if getattr(checkpointer, "_instrumented", False):
+        return checkpointer
+    for operation in _CHECKPOINT_METHODS:
+        setattr(checkpointer, operation, _timed_call(operation, getattr(checkpointer, operation)))
+    for operation in _CHECKPOINT_ITERATORS:
+        setattr(checkpointer, operation, _timed_iterator(operation, getattr(checkpointer, operation)))
+    checkpointer._instrumented = True
+    return checkpointer
+
+
+def cache_collector(caches: dict):
+    """
+    Returns a scrape-time collector exporting hit/miss/entry counts from the
+    caches' own stats() (name -> cache object, or a callable returning it).
+    """
+
+    def collect():
+        hits, misses, entries = {}, {}, {}
+        for name, cache in caches.items():
+            cache = cache() if callable(cache) and not hasattr(cache, "stats") else cache
+            if cache is None:
+                continue
+            stats = cache.stats()
+            hits[(name,)] = stats.get("hits", 0) + stats.get("redis_hits", 0)
+            misses[(name,)] = stats.get("misses", 0)
+            entries[(name,)] = stats.get("entries", stats.get("size", 0))
+        return [
+            ("chatbot_cache_hits_total", "counter", "Cache hits", ("cache",), hits),
+            ("chatbot_cache_misses_total", "counter", "Cache misses", ("cache",), misses),
+            ("chatbot_cache_entries", "gauge", "Entries currently cached", ("cache",), entries),
+        ]
+
+    return collect
+
+
+_handler = None
+
+
+def get_callback_handler():
+    """
+    Returns the process-wide metrics callback handler, or None when
+    METRICS_ENABLED=false.
+    """
+    global _handler
+    if os.getenv("METRICS_ENABLED", "true").lower() != "true":
+        return None
+    if _handler is None:
+        _handler = MetricsCallbackHandler(tracer=_get_tracer())
+    return _handler
@@ -1,3 +1,5 @@
+from langchain_core.runnables import RunnableLambda
+from src.nodes.context_policy import ContextPolicy
 from src.state.state import State
 
 class BasicChatbotNode:
@@ -5,8 +7,9 @@ class BasicChatbotNode:
     """
     Basic chatbot logic implementation
     """
-    def __init__(self, model):
+    def __init__(self, model, context_policy: ContextPolicy = None):
         self.llm = model
+        self.context_policy = context_policy or ContextPolicy()
 
     def process(self,state:State)->dict:
         """
@@ -15,5 +18,18 @@ class BasicChatbotNode:
         # return {
         #     "messages": self.llm.invoke(state["messages"])
         # }
-        llm_response = self.llm.invoke(state["messages"])
-        return {"messages": [llm_response]}  
\ No newline at end of file
+        llm_response = self.llm.invoke(self.context_policy.build_prompt(state))
+        return {"messages": [llm_response]}
+
+    async def aprocess(self, state: State) -> dict:
+        """
+        Async version of process, used when the graph is run with astream/ainvoke.
+        """
+        llm_response = await self.llm.ainvoke(self.context_policy.build_prompt(state))
+        return {"messages": [llm_response]}
+
+    def as_runnable(self):
+        """
+        Returns the node as a runnable exposing both the sync and async paths.
+        """
+        return RunnableLambda(self.process, afunc=self.aprocess, name="chatbot")  
\ No newline at end of file
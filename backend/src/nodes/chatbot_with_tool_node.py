@@ -1,26 +1,12 @@
 # File: src/nodes/chatbot_with_tool_node.py
 
-from langchain_core.messages import SystemMessage
+import asyncio
+from langchain_core.runnables import RunnableLambda
+from src.LLMs.client_registry import get_bound_model
+from src.nodes.context_policy import ContextPolicy
+from src.nodes.prompt_prefix import PromptPrefix
 
-class ChatbotWithToolNode:
-    def __init__(self, llm):
-        self.llm = llm
-
-    def create_chatbot(self, tools):
-        """
-        Creates a chatbot node with tool-calling capabilities.
-        """
-        # Bind tools to the LLM
-        llm_with_tools = self.llm.get_llm_model().bind_tools(tools)
-        
-        def chatbot(state):
-            """
-            Chatbot logic with system message for better tool usage
-            """
-            messages = state["messages"]
-            
-            # Create system message to guide the chatbot
-            system_message = SystemMessage(content="""You are a helpful assistant with access to tools:
+SYSTEM_PROMPT = """You are a helpful assistant with access to tools:
 
 1. **web_search (Tavily)**: Search the web for current information
 2. **send_whatsapp_message**: Send WhatsApp messages via Twilio
@@ -36,18 +22,79 @@ IMPORTANT INSTRUCTIONS:
 Example flows:
 - User: "Send Hi to +91999..." → Use tool → Respond: "I've sent the WhatsApp message successfully!"
 - User: "Search weather and send to +91..." → Use web_search → Use send_whatsapp_message → Respond: "I found the weather info and sent it via WhatsApp!"
-""")
-            
-            # Add system message only at the start of conversation
-            if len(messages) == 0 or (len(messages) > 0 and not any(
-                isinstance(m, SystemMessage) or (isinstance(m, dict) and m.get("role") == "system")
-                for m in messages
-            )):
-                messages = [system_message] + list(messages)
+"""
+
+class ChatbotWithToolNode:
+    def __init__(self, llm, context_policy: ContextPolicy = None, response_cache=None):
+        self.llm = llm
+        self.context_policy = context_policy or ContextPolicy()
+        self.response_cache = response_cache
+        # Cached replies are only reused for the same provider and model
+        self.cache_namespace = f"{type(llm).__name__}:{getattr(llm, 'model_name', '')}"
+
+    def create_chatbot(self, tools):
+        """
+        Creates a chatbot node with tool-calling capabilities.
+        """
+        # Bind tools to the LLM (cached per model and tool set)
+        llm_with_tools = get_bound_model(self.llm.get_llm_model(), tools)
+        
+        # System prompt and tool schemas: built once, sent first on every turn
+        self.prefix = PromptPrefix(SYSTEM_PROMPT, tools)
+        # A changed prompt or tool set must not reuse replies cached under the old one
+        self.cache_namespace = f"{type(self.llm).__name__}:{getattr(self.llm, 'model_name', '')}:{self.prefix.version}"
+        
+        def prepare_messages(state):
+            """
+            Builds the bounded prompt for this turn behind the stable prefix
+            """
+            return self.context_policy.build_prompt(state, prefix=self.prefix.messages)
+
+        def lookup_cache(state):
+            """
+            Returns a cached reply for the user's question, if the semantic cache is enabled
+            """
+            if self.response_cache is None:
+                return None
+            return self.response_cache.lookup(self.cache_namespace, state["messages"],
+                                              state.get("memories"), state.get("summary"))
+
+        def store_cache(state, response):
+            """
+            Offers the final reply of this turn to the semantic cache
+            """
+            if self.response_cache is not None:
+                self.response_cache.store(self.cache_namespace, state["messages"], response,
+                                          state.get("memories"), state.get("summary"))
+
+        def chatbot(state):
+            """
+            Chatbot logic with system message for better tool usage
+            """
+            cached = lookup_cache(state)
+            if cached is not None:
+                return {"messages": [cached]}
             
             # Invoke LLM with tools
-            response = llm_with_tools.invoke(messages)
+            response = llm_with_tools.invoke(prepare_messages(state))
+            store_cache(state, response)
+            
+            return {"messages": [response]}
+
+        async def achatbot(state):
+            """
+            Async chatbot logic, used when the graph is run with astream/ainvoke
+            """
+            # Embedding and the FAISS search are CPU work; keep them off the event loop
+            if self.response_cache is not None:
+                cached = await asyncio.to_thread(lookup_cache, state)
+                if cached is not None:
+                    return {"messages": [cached]}
+            
+            response = await llm_with_tools.ainvoke(prepare_messages(state))
+            if self.response_cache is not None:
+                await asyncio.to_thread(store_cache, state, response)
             
             return {"messages": [response]}
         
-        return chatbot
\ No newline at end of file
+        return RunnableLambda(chatbot, afunc=achatbot, name="chatbot")
\ No newline at end of file
@@ -0,0 +1,117 @@
+# File: src/nodes/context_policy.py
+
+import os
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+
+class ContextPolicy:
+    """
+    Decides which part of a thread is sent to the LLM on each turn.
+
+    - Messages already folded into the rolling summary are replaced by the summary
+    - ToolMessages from earlier turns are truncated (bulky Tavily JSON)
+    - The rest is trimmed to a token budget, always starting on a user message
+    - Retrieved long-term memories, if any, are added as a SystemMessage
+
+    Settings can be passed explicitly or via environment:
+    CONTEXT_MAX_TOKENS, CONTEXT_TOOL_OUTPUT_MAX_CHARS,
+    SUMMARY_TRIGGER_TOKENS, SUMMARY_KEEP_MESSAGES
+    """
+
+    def __init__(self, max_tokens: int = None, tool_output_max_chars: int = None,
+                 summary_trigger_tokens: int = None, summary_keep_messages: int = None):
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", "4000"))
+        self.tool_output_max_chars = tool_output_max_chars or int(os.getenv("CONTEXT_TOOL_OUTPUT_MAX_CHARS", "800"))
+        self.summary_trigger_tokens = summary_trigger_tokens or int(os.getenv("SUMMARY_TRIGGER_TOKENS", "3000"))
+        self.summary_keep_messages = summary_keep_messages or int(os.getenv("SUMMARY_KEEP_MESSAGES", "6"))
+
+    def count_tokens(self, messages) -> int:
+        """Approximate token count for a list of messages"""
+        return count_tokens_approximately(messages)
+
+    def unsummarized_messages(self, state) -> list:
+        """
+        Returns the messages that come after the last one folded into the summary.
+        Scans back from the end, so the cost follows the unsummarized tail,
+        not the whole history.
+        """
+        messages = state["messages"]
+        summarized_until = state.get("summarized_until")
+        if summarized_until:
+            for index in range(len(messages) - 1, -1, -1):
+                if getattr(messages[index], "id", None) == summarized_until:
+                    return list(messages[index + 1:])
+        return list(messages)
+
+    def evict_stale_tool_outputs(self, messages) -> list:
+        """Truncates ToolMessages that belong to turns before the latest user message"""
+        last_human = max(
+            (index for index, msg in enumerate(messages) if isinstance(msg, HumanMessage)),
+            default=-1
+        )
+        limit = self.tool_output_max_chars
+        result = []
+        for index, msg in enumerate(messages):
+            if (index < last_human and isinstance(msg, ToolMessage)
+                    and isinstance(msg.content, str) and len(msg.content) > limit):
+                msg = msg.model_copy(update={"content": msg.content[:limit] + " …[truncated]"})
+            result.append(msg)
+        return result
+
+    def build_prompt(self, state, prefix=()) -> list:
+        """
+        Returns the bounded message window for this turn. The order goes from
+        most to least stable, so provider prefix caches stay valid as long as
+        possible: `prefix` (the node's system prompt), the rolling summary,
+        retrieved memories, then the window itself.
+        """
+        messages = self.evict_stale_tool_outputs(self.unsummarized_messages(state))
+
+        window = trim_messages(
+            messages,
+            max_tokens=self.max_tokens,
+            token_counter=count_tokens_approximately,
+            strategy="last",
+            start_on="human",
+            allow_partial=False
+        )
+        if not window:
+            # The latest turn alone exceeds the budget; still send that turn
+            last_human = max(
+                (index for index, msg in enumerate(messages) if isinstance(msg, HumanMessage)),
+                default=0
+            )
+            window = messages[last_human:]
+
+        context = list(prefix)
+        summary = state.get("summary")
+        if summary:
+            context.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+
+        memories = state.get("memories")
+        if memories:
+            recalled = "\n".join(f"- {memory}" for memory in memories)
+            context.append(SystemMessage(content=f"Relevant memories from past conversations:\n{recalled}"))
+
+        context.extend(window)
+        return context
+
+    def messages_to_summarize(self, state) -> list:
+        """
+        Returns the oldest unsummarized messages to fold into the summary once
+        they exceed the trigger budget, keeping the most recent turns verbatim.
+        """
+        pending = self.unsummarized_messages(state)
+        if self.count_tokens(pending) <= self.summary_trigger_tokens:
+            return []
+
+        # Cut at a user message so tool calls stay with their results
+        cut = len(pending) - self.summary_keep_messages
+        while cut > 0 and not isinstance(pending[cut], HumanMessage):
+            cut -= 1
+        return pending[:cut] if cut > 0 else []
+
+    def should_summarize(self, state) -> bool:
+        """True when the thread has grown enough to fold old turns into the summary"""
+        return bool(self.messages_to_summarize(state))
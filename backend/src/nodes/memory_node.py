@@ -0,0 +1,96 @@
+# File: src/nodes/memory_node.py
+
+import asyncio
+import os
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+from src.memory.memory_store import MemoryStore
+from src.state.state import State
+
+
+class MemoryNode:
+    """
+    Retrieval and write-back nodes for long-term semantic memory.
+
+    The namespace is the `user_id` from the run config when given, so memories
+    follow a user across threads, otherwise the `thread_id`.
+    """
+
+    def __init__(self, memory_store: MemoryStore, top_k: int = None, min_score: float = None):
+        self.memory_store = memory_store
+        self.top_k = top_k or int(os.getenv("MEMORY_TOP_K", "3"))
+        self.min_score = min_score if min_score is not None else float(os.getenv("MEMORY_MIN_SCORE", "0.2"))
+
+    @staticmethod
+    def get_namespace(config) -> str:
+        configurable = (config or {}).get("configurable", {})
+        return configurable.get("user_id") or configurable.get("thread_id") or "default"
+
+    @staticmethod
+    def _last_human(messages):
+        for index in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[index], HumanMessage):
+                return index
+        return None
+
+    def retrieve(self, state: State, config) -> dict:
+        """
+        Looks up memories relevant to the latest user message and stores
+        them in `state["memories"]` for the chatbot prompt.
+        """
+        messages = state["messages"]
+        index = self._last_human(messages)
+        if index is None:
+            return {"memories": []}
+
+        results = self.memory_store.search(
+            self.get_namespace(config),
+            messages[index].content,
+            k=self.top_k,
+            min_score=self.min_score
+        )
+        return {"memories": [result["text"] for result in results]}
+
+    async def aretrieve(self, state: State, config) -> dict:
+        """
+        Async version of retrieve; the FAISS search runs in a worker thread.
+        """
+        return await asyncio.to_thread(self.retrieve, state, config)
+
+    def remember(self, state: State, config) -> dict:
+        """
+        Stores the completed turn (user message and final reply) as a memory.
+        """
+        messages = state["messages"]
+        index = self._last_human(messages)
+        reply = messages[-1] if messages else None
+        if index is None or reply is None or reply.type != "ai" or not reply.content:
+            return {}
+
+        question = messages[index].content
+        text = f"User: {question}\nAssistant: {reply.content}"
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        self.memory_store.add(
+            self.get_namespace(config),
+            [text],
+            [{"thread_id": thread_id, "message_id": reply.id}]
+        )
+        return {}
+
+    async def aremember(self, state: State, config) -> dict:
+        """
+        Async version of remember.
+        """
+        return await asyncio.to_thread(self.remember, state, config)
+
+    def retrieve_runnable(self):
+        """
+        Returns the retrieval node as a runnable exposing both sync and async paths.
+        """
+        return RunnableLambda(self.retrieve, afunc=self.aretrieve, name="retrieve_memory")
+
+    def remember_runnable(self):
+        """
+        Returns the write-back node as a runnable exposing both sync and async paths.
+        """
+        return RunnableLambda(self.remember, afunc=self.aremember, name="remember")
@@ -0,0 +1,131 @@
+# File: src/nodes/parallel_tool_node.py
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, ToolMessage
+from typing import TYPE_CHECKING
+from langchain_core.runnables import RunnableLambda
+
+if TYPE_CHECKING:
+    # The state schema pulls in langgraph; main.py imports this module for
+    # pending_tool_calls before any graph is built
+    from src.state.state import State
+
+# Tools that must be approved by a human before they run
+APPROVAL_REQUIRED_TOOLS = {"send_whatsapp_message"}
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_MAX_WORKERS", "8")),
+    thread_name_prefix="tool"
+)
+
+
+def pending_tool_calls(messages) -> list:
+    """
+    Returns the tool calls of the latest AIMessage that have no ToolMessage yet.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        msg = messages[index]
+        if isinstance(msg, AIMessage):
+            done = {
+                m.tool_call_id for m in messages[index + 1:]
+                if isinstance(m, ToolMessage)
+            }
+            return [call for call in msg.tool_calls if call["id"] not in done]
+    return []
+
+
+def needs_approval(tool_call) -> bool:
+    """True for tool calls that must wait for human approval"""
+    return tool_call["name"] in APPROVAL_REQUIRED_TOOLS
+
+
+class ParallelToolNode:
+    """
+    Runs the pending tool calls of the latest AIMessage concurrently, each
+    with its own timeout, and returns one ToolMessage per call.
+
+    `select` picks which pending calls this node runs, so auto-approved tools
+    and tools that need approval can be executed by separate graph nodes.
+    Timeouts come from `timeouts` (per tool name) or TOOL_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, tools, select=None, timeouts: dict = None):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.select = select or (lambda tool_call: True)
+        self.timeouts = timeouts or {}
+        self.default_timeout = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+
+    def _timeout(self, tool_call) -> float:
+        return self.timeouts.get(tool_call["name"], self.default_timeout)
+
+    def _selected_calls(self, state: "State") -> list:
+        return [call for call in pending_tool_calls(state["messages"]) if self.select(call)]
+
+    @staticmethod
+    def _error_message(tool_call, error: str) -> ToolMessage:
+        return ToolMessage(
+            content=f"Error: {error}",
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            status="error"
+        )
+
+    def _run_one(self, tool_call, config) -> ToolMessage:
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return self._error_message(tool_call, f"unknown tool '{tool_call['name']}'")
+        try:
+            # Invoking a tool with a ToolCall returns a ToolMessage
+            return tool.invoke({**tool_call, "type": "tool_call"}, config)
+        except Exception as e:
+            return self._error_message(tool_call, str(e))
+
+    async def _arun_one(self, tool_call, config) -> ToolMessage:
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return self._error_message(tool_call, f"unknown tool '{tool_call['name']}'")
+        try:
+            return await asyncio.wait_for(
+                tool.ainvoke({**tool_call, "type": "tool_call"}, config),
+                timeout=self._timeout(tool_call)
+            )
+        except asyncio.TimeoutError:
+            return self._error_message(tool_call, f"{tool_call['name']} timed out after {self._timeout(tool_call):g}s")
+        except Exception as e:
+            return self._error_message(tool_call, str(e))
+
+    def process(self, state: "State", config) -> dict:
+        """
+        Runs the selected tool calls on a shared thread pool.
+        A call that exceeds its timeout is reported as an error; its worker
+        thread is left to finish in the background.
+        """
+        calls = self._selected_calls(state)
+        started = time.monotonic()
+        futures = [_executor.submit(self._run_one, call, config) for call in calls]
+
+        results = []
+        for call, future in zip(calls, futures):
+            remaining = max(0.0, started + self._timeout(call) - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except TimeoutError:
+                results.append(self._error_message(call, f"{call['name']} timed out after {self._timeout(call):g}s"))
+        return {"messages": results}
+
+    async def aprocess(self, state: "State", config) -> dict:
+        """
+        Async version of process; the selected calls run concurrently with asyncio.
+        """
+        calls = self._selected_calls(state)
+        results = await asyncio.gather(*(self._arun_one(call, config) for call in calls))
+        return {"messages": list(results)}
+
+    def as_runnable(self, name: str):
+        """
+        Returns the node as a runnable exposing both the sync and async paths.
+        """
+        return RunnableLambda(self.process, afunc=self.aprocess, name=name)
@@ -0,0 +1,24 @@
+# File: src/nodes/prompt_prefix.py
+
+import hashlib
+import json
+from langchain_core.messages import SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+class PromptPrefix:
+    """
+    The stable start of every prompt a node sends: its system prompt, plus
+    the schemas of the tools bound to the model.
+
+    Built once per compiled graph and identical across turns and threads,
+    so providers that cache prompt prefixes (Ollama's KV cache while the
+    model stays loaded, Groq prompt caching) can reuse it. `version` changes
+    whenever the prompt or a tool schema changes.
+    """
+
+    def __init__(self, system_prompt: str, tools=()):
+        schemas = [convert_to_openai_tool(tool) for tool in tools]
+        payload = json.dumps([system_prompt, schemas], sort_keys=True, default=str)
+        self.version = hashlib.sha256(payload.encode()).hexdigest()[:12]
+        self.messages = (SystemMessage(content=system_prompt, id=f"system-{self.version}"),)
@@ -0,0 +1,63 @@
+# File: src/nodes/summarization_node.py
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from src.nodes.context_policy import ContextPolicy
+from src.state.state import State
+
+
+class SummarizationNode:
+    """
+    Folds old turns into the persisted `summary` field of the state.
+    Runs in the background after a turn's reply has been returned (see
+    main.schedule_summary), and only when the context policy says the
+    unsummarized history is too large.
+    """
+
+    def __init__(self, model, context_policy: ContextPolicy = None):
+        self.llm = model
+        self.context_policy = context_policy or ContextPolicy()
+
+    def _build_request(self, state: State, to_summarize):
+        """Builds the summarization prompt from the current summary and old turns"""
+        transcript = "\n".join(
+            f"{msg.type}: {msg.content}"
+            for msg in self.context_policy.evict_stale_tool_outputs(to_summarize)
+            if isinstance(msg.content, str) and msg.content
+        )
+        previous = state.get("summary") or "(none)"
+        return [
+            SystemMessage(content="You maintain a concise running summary of a conversation. "
+                                  "Keep facts, names, numbers, decisions and open requests. "
+                                  "Reply with the updated summary only."),
+            HumanMessage(content=f"Current summary:\n{previous}\n\nNew messages to fold in:\n{transcript}")
+        ]
+
+    def process(self, state: State) -> dict:
+        """
+        Updates the rolling summary with the oldest unsummarized messages.
+        """
+        to_summarize = self.context_policy.messages_to_summarize(state)
+        if not to_summarize:
+            return {}
+        response = self.llm.invoke(self._build_request(state, to_summarize))
+        return {"summary": response.content, "summarized_until": to_summarize[-1].id}
+
+    async def aprocess(self, state: State) -> dict:
+        """
+        Async version of process.
+        """
+        to_summarize = self.context_policy.messages_to_summarize(state)
+        if not to_summarize:
+            return {}
+        response = await self.llm.ainvoke(self._build_request(state, to_summarize))
+        return {"summary": response.content, "summarized_until": to_summarize[-1].id}
+
+    def as_runnable(self):
+        """
+        Returns the node as a runnable exposing both the sync and async paths.
+        Its LLM calls are background work for rate limiting.
+        """
+        return RunnableLambda(self.process, afunc=self.aprocess, name="summarize").with_config(
+            metadata={"llm_priority": "background"}
+        )
@@ -3,8 +3,21 @@ from langgraph.graph.message import add_messages
 from typing import Annotated
 
 
+def merge_dicts(left: dict, right: dict) -> dict:
+    """Reducer that merges dict updates key by key"""
+    return {**(left or {}), **(right or {})}
+
+
 class State(TypedDict):
     """
     Represent the structure of the state used in graph
     """
-    messages: Annotated[List,add_messages]
\ No newline at end of file
+    messages: Annotated[List,add_messages]
+    # Rolling summary of turns folded out of the prompt, and the id of the
+    # last message it covers (see src/nodes/context_policy.py)
+    summary: str
+    summarized_until: str
+    # Long-term memories retrieved for the current turn (see src/nodes/memory_node.py)
+    memories: List[str]
+    # WhatsApp delivery status by delivery id, written back by the delivery queue
+    deliveries: Annotated[dict, merge_dicts]
\ No newline at end of file
@@ -0,0 +1,250 @@
+# File: src/tools/search_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Type
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a search query so trivially different phrasings share a
+    cache entry: case, surrounding punctuation and repeated whitespace are ignored.
+    """
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" ?!.,;:")
+
+
+class SearchCache:
+    """
+    Two-tier TTL cache for search results: an in-process LRU in front of an
+    optional shared Redis tier. Concurrent lookups of the same missing key are
+    coalesced so only one request reaches the search backend.
+    """
+
+    REDIS_PREFIX = "search_cache:"
+
+    def __init__(self, ttl: int = None, max_entries: int = None, redis_client=None):
+        self.ttl = ttl or int(os.getenv("SEARCH_CACHE_TTL", "600"))
+        self.max_entries = max_entries or int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+        self.redis = redis_client
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> (event, result holder)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_redis(self, key):
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.get(self.REDIS_PREFIX + key)
+            if raw is None:
+                return None
+            ttl = self.redis.ttl(self.REDIS_PREFIX + key)
+            return json.loads(raw), (ttl if ttl and ttl > 0 else self.ttl)
+        except Exception:
+            # The shared tier is best-effort; fall back to the backend
+            self.errors += 1
+            return None
+
+    def _set_redis(self, key, value):
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(self.REDIS_PREFIX + key, json.dumps(value), ex=self.ttl)
+        except Exception:
+            self.errors += 1
+
+    def get_or_compute(self, key: str, compute, cacheable=None):
+        """
+        Returns the cached value for `key`, or calls `compute()` once (even
+        under concurrent callers) and caches its result. Exceptions from
+        `compute` are propagated to every waiting caller and not cached;
+        neither are results for which `cacheable(value)` is false.
+        """
+        with self._lock:
+            value = self._get_local(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = (threading.Event(), {})
+                self._inflight[key] = inflight
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        event, holder = inflight
+        if not leader:
+            event.wait()
+            if "error" in holder:
+                raise holder["error"]
+            return holder["value"]
+
+        try:
+            cached = self._get_redis(key)
+            if cached is not None:
+                value, ttl = cached
+                with self._lock:
+                    self.redis_hits += 1
+                    self._set_local(key, value, ttl)
+            else:
+                with self._lock:
+                    self.misses += 1
+                value = compute()
+                if cacheable is None or cacheable(value):
+                    self._set_redis(key, value)
+                    with self._lock:
+                        self._set_local(key, value, self.ttl)
+            holder["value"] = value
+            return value
+        except Exception as e:
+            holder["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def clear(self):
+        """Drops all local entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "hit_rate": round((self.hits + self.redis_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+class CachedSearchTool(BaseTool):
+    """
+    Wraps a search tool (e.g. TavilySearch) with a SearchCache. Exposes the
+    same name, description and arguments as the wrapped tool, so the LLM
+    sees no difference.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseTool
+    cache: Any
+    args_schema: Optional[Type[BaseModel]] = None
+
+    def __init__(self, inner: BaseTool, cache: SearchCache, **kwargs):
+        super().__init__(
+            inner=inner,
+            cache=cache,
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            **kwargs
+        )
+
+    def _cache_key(self, kwargs) -> str:
+        args = {k: v for k, v in kwargs.items() if v is not None and k != "query"}
+        raw = json.dumps({"q": normalize_query(kwargs.get("query", "")), "args": args}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.name}:{raw}".encode()).hexdigest()
+
+    def _run(self, run_manager=None, **kwargs):
+        """Run the search, serving repeated queries from the cache"""
+        return self.cache.get_or_compute(
+            self._cache_key(kwargs),
+            lambda: self.inner.invoke(kwargs),
+            # Tavily reports network errors, 429s and 5xx as {"error": ...}; retry those next time
+            cacheable=lambda result: not (isinstance(result, dict) and "error" in result)
+        )
+
+    async def _arun(self, run_manager=None, **kwargs):
+        """Async version; the cache and backend call run in a worker thread"""
+        return await asyncio.to_thread(self._run, **kwargs)
+
+
+_search_cache = None
+_connect_thread = None
+_search_cache_lock = threading.Lock()
+
+
+def _connect_redis_tier(cache: SearchCache):
+    """Connects the shared Redis tier; until then (or on failure) the cache is local-only"""
+    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    if redis_url.startswith("rediss://"):
+        redis_url = redis_url.replace("rediss://", "redis://", 1)
+    try:
+        from redis import Redis
+
+        redis_client = Redis.from_url(
+            redis_url,
+            socket_connect_timeout=2,
+            socket_timeout=2
+        )
+        redis_client.ping()
+        cache.redis = redis_client
+        print("✅ Search cache using Redis tier")
+    except Exception as e:
+        print(f"⚠️ Search cache running without Redis tier: {e}")
+
+
+def get_search_cache() -> SearchCache:
+    """
+    Returns the process-wide search cache without blocking. The Redis tier
+    (REDIS_URL, disabled with SEARCH_CACHE_REDIS=false) connects in a
+    background thread; lookups use only the local tier until it is up.
+    """
+    global _search_cache, _connect_thread
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+            if os.getenv("SEARCH_CACHE_REDIS", "true").lower() == "true":
+                _connect_thread = threading.Thread(
+                    target=_connect_redis_tier, args=(_search_cache,), name="search-cache-connect", daemon=True
+                )
+                _connect_thread.start()
+        return _search_cache
+
+
+def connect_search_cache(timeout: float = None) -> SearchCache:
+    """Blocking: returns the search cache once its Redis tier connected (or failed to)"""
+    cache = get_search_cache()
+    if _connect_thread is not None:
+        _connect_thread.join(timeout)
+    return cache
@@ -1,17 +1,36 @@
 # File: src/tools/search_tool.py
 
-from langchain_tavily import TavilySearch
-from langgraph.prebuilt import ToolNode
-from langchain_core.tools import tool
-import os
+from langchain_core.tools import tool, InjectedToolCallId
+from langchain_core.runnables import RunnableConfig
+from typing import Annotated
 from dotenv import load_dotenv
-from twilio.rest import Client
+from src.tools.whatsapp_delivery import deliver_whatsapp_message, make_idempotency_key
+from src.tools.search_cache import CachedSearchTool, get_search_cache
 
 # Load variables from .env file
 load_dotenv()
 
+# Web search backend, imported on first use by get_tools (langchain_tavily
+# pulls in aiohttp); benchmarks replace it with a fake
+TavilySearch = None
+
+
+def get_search_backend():
+    """Returns the web search tool class, importing langchain_tavily on first use"""
+    global TavilySearch
+    if TavilySearch is None:
+        from langchain_tavily import TavilySearch as tavily_search
+        TavilySearch = tavily_search
+    return TavilySearch
+
+
 @tool
-def send_whatsapp_message(message: str, phone_number: str) -> str:
+def send_whatsapp_message(
+    message: str,
+    phone_number: str,
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: RunnableConfig
+) -> str:
     """
     Send a WhatsApp message using Twilio.
     Use this tool when user asks to send, share, or forward information via WhatsApp.
@@ -23,39 +42,24 @@ def send_whatsapp_message(message: str, phone_number: str) -> str:
     Returns:
         Success or error message
     """
-    try:
-        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-        auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-        whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM")  # Format: whatsapp:+14155238886
-        
-        if not all([account_sid, auth_token, whatsapp_from]):
-            return "❌ Error: Missing Twilio credentials. Please set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_WHATSAPP_FROM in .env file"
-        
-        client = Client(account_sid, auth_token)
-        
-        # Format phone number for WhatsApp
-        if not phone_number.startswith("whatsapp:"):
-            phone_number = f"whatsapp:{phone_number}"
-        
-        # Send message
-        twilio_message = client.messages.create(
-            body=message,
-            from_=whatsapp_from,
-            to=phone_number
-        )
-        
-        return f"✅ WhatsApp message sent successfully to {phone_number}! Message SID: {twilio_message.sid}"
-    
-    except Exception as e:
-        return f"❌ Error sending WhatsApp message: {str(e)}"
+    # The (thread, tool call) pair identifies this send, so a re-executed
+    # graph step never delivers the same message twice
+    thread_id = config.get("configurable", {}).get("thread_id")
+    return deliver_whatsapp_message(
+        message,
+        phone_number,
+        idempotency_key=make_idempotency_key(thread_id, tool_call_id),
+        thread_id=thread_id
+    )
 
 
 def get_tools():
     """
-    Return the list of tools to be used in the chatbot
+    Return the list of tools to be used in the chatbot.
+    Web search results are cached (see src/tools/search_cache.py).
     """
     tools = [
-        TavilySearch(max_results=2),
+        CachedSearchTool(get_search_backend()(max_results=2), get_search_cache()),
         send_whatsapp_message
     ]
     return tools
@@ -65,4 +69,6 @@ def create_tool_node(tools):
     """
     Creates and returns a tool node for the graph
     """
+    from langgraph.prebuilt import ToolNode
+
     return ToolNode(tools=tools)
\ No newline at end of file
@@ -3,9 +3,16 @@
 from langchain.tools import BaseTool
 from typing import Optional, Type
 from pydantic import BaseModel, Field
-from twilio.rest import Client
 import os
+import uuid
 from dotenv import load_dotenv
+from src.tools.whatsapp_delivery import (
+    TwilioSendError,
+    deliver_whatsapp_message,
+    format_whatsapp_number,
+    get_twilio_client,
+    make_idempotency_key,
+)
 
 load_dotenv()
 
@@ -28,38 +35,37 @@ class TwilioWhatsAppTool(BaseTool):
     
     def __init__(self):
         super().__init__()
-        # Initialize Twilio client
-        self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-        self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-        self.whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM")  # Format: whatsapp:+14155238886
-        
-        if not all([self.account_sid, self.auth_token, self.whatsapp_from]):
+        # Uses the shared, pooled Twilio client
+        if not all([os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"), os.getenv("TWILIO_WHATSAPP_FROM")]):
             raise ValueError("Missing Twilio credentials in environment variables")
-        
-        self.client = Client(self.account_sid, self.auth_token)
     
     def _run(self, message: str, phone_number: str) -> str:
         """Send WhatsApp message"""
         try:
-            # Format phone number for WhatsApp
-            if not phone_number.startswith("whatsapp:"):
-                phone_number = f"whatsapp:{phone_number}"
-            
-            # Send message
-            twilio_message = self.client.messages.create(
-                body=message,
-                from_=self.whatsapp_from,
-                to=phone_number
+            twilio_message = get_twilio_client().send(
+                os.getenv("TWILIO_WHATSAPP_FROM"),  # Format: whatsapp:+14155238886
+                format_whatsapp_number(phone_number),
+                message
             )
             
-            return f"✅ WhatsApp message sent successfully! Message SID: {twilio_message.sid}"
+            return f"✅ WhatsApp message sent successfully! Message SID: {twilio_message.get('sid')}"
         
-        except Exception as e:
+        except TwilioSendError as e:
             return f"❌ Error sending WhatsApp message: {str(e)}"
     
     async def _arun(self, message: str, phone_number: str) -> str:
-        """Async version - not implemented"""
-        raise NotImplementedError("Async not supported for this tool")
+        """Send WhatsApp message without blocking the event loop"""
+        try:
+            twilio_message = await get_twilio_client().asend(
+                os.getenv("TWILIO_WHATSAPP_FROM"),
+                format_whatsapp_number(phone_number),
+                message
+            )
+            
+            return f"✅ WhatsApp message sent successfully! Message SID: {twilio_message.get('sid')}"
+        
+        except TwilioSendError as e:
+            return f"❌ Error sending WhatsApp message: {str(e)}"
 
 
 # Alternative: Simple function-based tool
@@ -74,28 +80,8 @@ def send_whatsapp_message(message: str, phone_number: str) -> str:
     Returns:
         Success or error message
     """
-    try:
-        account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-        auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-        whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM")
-        
-        if not all([account_sid, auth_token, whatsapp_from]):
-            return "❌ Error: Missing Twilio credentials in environment variables"
-        
-        client = Client(account_sid, auth_token)
-        
-        # Format phone number
-        if not phone_number.startswith("whatsapp:"):
-            phone_number = f"whatsapp:{phone_number}"
-        
-        # Send message
-        twilio_message = client.messages.create(
-            body=message,
-            from_=whatsapp_from,
-            to=phone_number
-        )
-        
-        return f"✅ WhatsApp message sent successfully! Message SID: {twilio_message.sid}"
-    
-    except Exception as e:
-        return f"❌ Error sending WhatsApp message: {str(e)}"
\ No newline at end of file
+    return deliver_whatsapp_message(
+        message,
+        phone_number,
+        idempotency_key=make_idempotency_key(uuid.uuid4())
+    )
@@ -0,0 +1,372 @@
+# File: src/tools/whatsapp_delivery.py
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class TwilioSendError(Exception):
+    """Raised when Twilio rejects or fails a message send"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        # Network errors, rate limiting and server errors are worth retrying
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def format_whatsapp_number(phone_number: str) -> str:
+    """Prefix a phone number with 'whatsapp:' if needed"""
+    if not phone_number.startswith("whatsapp:"):
+        phone_number = f"whatsapp:{phone_number}"
+    return phone_number
+
+
+def make_idempotency_key(*parts) -> str:
+    """Stable key for a send, e.g. from (thread_id, tool_call_id)"""
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class TwilioRestClient:
+    """
+    Minimal Twilio Messages API client on pooled, keep-alive httpx clients.
+    The base URL can be pointed at a local fake server via TWILIO_API_BASE.
+
+    The Messages API has no idempotency support, so sends are only
+    deduplicated by the callers' idempotency keys, within one process.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, base_url: str = None):
+        self.account_sid = account_sid
+        self.base_url = (base_url or os.getenv("TWILIO_API_BASE", "https://api.twilio.com")).rstrip("/")
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("TWILIO_POOL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("TWILIO_POOL_MAX_KEEPALIVE", "10"))
+        )
+        timeout = httpx.Timeout(float(os.getenv("TWILIO_HTTP_TIMEOUT", "15")))
+        auth = (account_sid, auth_token)
+        self._client = httpx.Client(auth=auth, limits=limits, timeout=timeout)
+        self._async_client = httpx.AsyncClient(auth=auth, limits=limits, timeout=timeout)
+
+    @property
+    def messages_url(self) -> str:
+        return f"{self.base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+
+    @staticmethod
+    def _request_args(from_: str, to: str, body: str):
+        return {"data": {"From": from_, "To": to, "Body": body}}
+
+    @staticmethod
+    def _handle_response(response: httpx.Response) -> dict:
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("message", response.text)
+            except ValueError:
+                detail = response.text
+            raise TwilioSendError(f"Twilio error {response.status_code}: {detail}", response.status_code)
+        try:
+            return response.json()
+        except ValueError:
+            raise TwilioSendError(f"Twilio returned a non-JSON response ({response.status_code})",
+                                  response.status_code)
+
+    def send(self, from_: str, to: str, body: str) -> dict:
+        """Send a message; returns the Twilio message resource (with 'sid')"""
+        try:
+            response = self._client.post(self.messages_url, **self._request_args(from_, to, body))
+        except httpx.HTTPError as e:
+            raise TwilioSendError(f"Twilio request failed: {e}") from e
+        return self._handle_response(response)
+
+    async def asend(self, from_: str, to: str, body: str) -> dict:
+        """Async version of send"""
+        try:
+            response = await self._async_client.post(self.messages_url, **self._request_args(from_, to, body))
+        except httpx.HTTPError as e:
+            raise TwilioSendError(f"Twilio request failed: {e}") from e
+        return self._handle_response(response)
+
+    def close(self):
+        self._client.close()
+
+    async def aclose(self):
+        self._client.close()
+        await self._async_client.aclose()
+
+
+class TokenBucket:
+    """Async token bucket: `rate` sends per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryQueue:
+    """
+    Outbound WhatsApp queue drained by background asyncio workers.
+
+    - Sends are rate limited with a token bucket (TWILIO_RATE_PER_SEC, TWILIO_RATE_BURST)
+    - Retryable failures back off exponentially up to TWILIO_MAX_ATTEMPTS
+    - Each delivery has an idempotency key; enqueueing a known key returns
+      the existing delivery instead of sending twice. Keys are only known to
+      this process, and only for the newest TWILIO_MAX_RECORDS deliveries
+      (finished ones are evicted first; their bodies are dropped once sent)
+    - An unexpected error fails the delivery; the worker keeps running
+    - `on_status(record)` runs as a separate task after every status change,
+      so a slow callback never holds up a worker
+    """
+
+    def __init__(self, client: TwilioRestClient, from_number: str, on_status=None,
+                 rate_per_sec: float = None, burst: int = None, max_attempts: int = None,
+                 backoff_base: float = None, workers: int = None):
+        self.client = client
+        self.from_number = from_number
+        self.on_status = on_status
+        self.bucket = TokenBucket(
+            rate_per_sec or float(os.getenv("TWILIO_RATE_PER_SEC", "1")),
+            burst or int(os.getenv("TWILIO_RATE_BURST", "1"))
+        )
+        self.max_attempts = max_attempts or int(os.getenv("TWILIO_MAX_ATTEMPTS", "5"))
+        self.backoff_base = backoff_base or float(os.getenv("TWILIO_BACKOFF_BASE", "1.0"))
+        self.workers = workers or int(os.getenv("TWILIO_WORKERS", "2"))
+        self.max_records = int(os.getenv("TWILIO_MAX_RECORDS", "10000"))
+        self.records = OrderedDict()  # idempotency key -> delivery record, oldest first
+        self._records_lock = threading.Lock()
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._callbacks = set()
+
+    def start(self):
+        """Start the background workers on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; queued messages that were not sent stay 'queued'"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._callbacks:
+            await asyncio.wait(self._callbacks, timeout=5)
+
+    async def join(self, timeout: float = None) -> bool:
+        """Wait until every queued message is sent or failed; False on timeout"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def enqueue(self, to: str, body: str, idempotency_key: str, thread_id: str = None) -> dict:
+        """
+        Queue a message for delivery. Safe to call from any thread.
+
+        Returns:
+            The delivery record (new, or existing for a known idempotency key)
+        """
+        with self._records_lock:
+            existing = self.records.get(idempotency_key)
+            if existing is not None:
+                return dict(existing)
+            record = {
+                "id": idempotency_key,
+                "thread_id": thread_id,
+                "to": format_whatsapp_number(to),
+                "body": body,
+                "status": "queued",
+                "attempts": 0,
+                "sid": None,
+                "error": None
+            }
+            self.records[idempotency_key] = record
+            self._evict()
+            snapshot = dict(record)
+
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, idempotency_key)
+        return snapshot
+
+    def get_status(self, delivery_id: str):
+        """Returns a copy of a delivery record, or None"""
+        with self._records_lock:
+            record = self.records.get(delivery_id)
+            return dict(record) if record is not None else None
+
+    def list_for_thread(self, thread_id: str) -> list:
+        """Returns copies of all delivery records of a thread"""
+        with self._records_lock:
+            return [dict(r) for r in self.records.values() if r["thread_id"] == thread_id]
+
+    def _evict(self):
+        """Drops the oldest finished records beyond max_records (call with _records_lock held)"""
+        excess = len(self.records) - self.max_records
+        if excess <= 0:
+            return
+        finished = [key for key, record in self.records.items() if record["status"] in ("sent", "failed")]
+        for key in finished[:excess]:
+            del self.records[key]
+
+    async def _update(self, record: dict, **changes):
+        with self._records_lock:
+            record.update(changes)
+            snapshot = dict(record)
+            if record["status"] in ("sent", "failed"):
+                self._evict()
+        if self.on_status is not None:
+            task = asyncio.create_task(self._notify(snapshot))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _notify(self, snapshot: dict):
+        try:
+            await self.on_status(snapshot)
+        except Exception as e:
+            print(f"⚠️ Delivery status callback failed: {e}")
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            record = self.records[key]
+            try:
+                await self._deliver(record)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ WhatsApp delivery {key[:12]} failed unexpectedly: {e}")
+                await self._update(record, status="failed", error=f"Unexpected error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, record: dict):
+        for attempt in range(1, self.max_attempts + 1):
+            await self.bucket.acquire()
+            await self._update(record, status="sending", attempts=attempt)
+            try:
+                result = await self.client.asend(self.from_number, record["to"], record["body"])
+                # The body is not needed once sent
+                await self._update(record, status="sent", sid=result.get("sid"), error=None, body=None)
+                return
+            except TwilioSendError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    await self._update(record, status="failed", error=str(e))
+                    return
+                await self._update(record, status="retrying", error=str(e))
+                delay = self.backoff_base * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+
+_client = None
+_delivery_queue = None
+_sent_sync = OrderedDict()  # idempotency key -> sid, for the queue-less path (newest TWILIO_MAX_RECORDS)
+_lock = threading.Lock()
+
+
+def get_twilio_client():
+    """
+    Returns the process-wide Twilio client, or None if TWILIO_ACCOUNT_SID /
+    TWILIO_AUTH_TOKEN are not set.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+            auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+            if not (account_sid and auth_token):
+                return None
+            _client = TwilioRestClient(account_sid, auth_token)
+        return _client
+
+
+def get_delivery_queue():
+    """Returns the running delivery queue, or None when sends are synchronous"""
+    return _delivery_queue
+
+
+def start_delivery_queue(on_status=None):
+    """
+    Start the background delivery queue on the running event loop.
+    Returns None (sends stay synchronous) if Twilio is not configured.
+    """
+    global _delivery_queue
+    client = get_twilio_client()
+    whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM")
+    if client is None or not whatsapp_from:
+        print("⚠️ Twilio not configured, WhatsApp delivery queue not started")
+        return None
+    _delivery_queue = DeliveryQueue(client, whatsapp_from, on_status=on_status)
+    _delivery_queue.start()
+    print("✅ WhatsApp delivery queue started")
+    return _delivery_queue
+
+
+async def stop_delivery_queue():
+    """Stop the delivery queue and close the pooled Twilio client"""
+    global _delivery_queue, _client
+    if _delivery_queue is not None:
+        await _delivery_queue.stop()
+        _delivery_queue = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def deliver_whatsapp_message(message: str, phone_number: str, idempotency_key: str,
+                             thread_id: str = None) -> str:
+    """
+    Deliver a WhatsApp message: enqueue it when the delivery queue is running
+    (returns immediately), otherwise send synchronously on the pooled client.
+
+    Returns:
+        Success or error message for the LLM
+    """
+    client = get_twilio_client()
+    whatsapp_from = os.getenv("TWILIO_WHATSAPP_FROM")
+    if client is None or not whatsapp_from:
+        return "❌ Error: Missing Twilio credentials. Please set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_WHATSAPP_FROM in .env file"
+
+    to = format_whatsapp_number(phone_number)
+    queue = get_delivery_queue()
+    if queue is not None:
+        record = queue.enqueue(to, message, idempotency_key, thread_id=thread_id)
+        return f"✅ WhatsApp message to {to} queued for delivery (delivery id: {record['id'][:12]}, status: {record['status']})"
+
+    with _lock:
+        sid = _sent_sync.get(idempotency_key)
+    if sid is None:
+        try:
+            sid = client.send(whatsapp_from, to, message).get("sid")
+        except TwilioSendError as e:
+            return f"❌ Error sending WhatsApp message: {str(e)}"
+        with _lock:
+            _sent_sync[idempotency_key] = sid
+            while len(_sent_sync) > int(os.getenv("TWILIO_MAX_RECORDS", "10000")):
+                _sent_sync.popitem(last=False)
+    return f"✅ WhatsApp message sent successfully to {to}! Message SID: {sid}"
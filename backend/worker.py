@@ -0,0 +1,119 @@
+"""
+Job worker process: runs the chat turns queued by the API (POST /chat or
+/approve with "queue": true, or CHAT_JOB_QUEUE=true) and publishes their
+progress and results to Redis for GET /jobs/{id} and /jobs/{id}/events.
+
+Workers share the API's setup (checkpointer, thread registry, compiled
+graph cache) and its Redis, so they scale independently of the API:
+start as many as CPU and LLM capacity allow.
+
+Usage (from backend/):
+    python worker.py [--concurrency 4] [--processes 1]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+from fastapi import HTTPException
+from langchain_core.messages import HumanMessage
+from src.checkpoint.thread_registry import ThreadBusyError
+from src.jobs.job_worker import JobWorker
+import main
+
+
+async def run_chat_job(payload: dict, publish):
+    """One /chat turn; the user message keeps its enqueue-time id, so a retried job replaces it"""
+    graph, config = await main.get_thread_graph(payload["thread_id"])
+    if graph is None:
+        await publish("error", {"detail": "Chatbot not initialized. Please initialize first."})
+        return
+
+    human_message = HumanMessage(content=payload["message"], id=payload["message_id"])
+    async with main.thread_registry.lock(payload["thread_id"]):
+        async for event, data in main.graph_events(
+            graph, {"messages": [human_message]}, config,
+            since_id=human_message.id if payload.get("delta") else None,
+            include_since=True
+        ):
+            await publish(event, data)
+
+
+async def run_approve_job(payload: dict, publish):
+    """One /approve decision and the run it resumes"""
+    graph, config = await main.get_thread_graph(payload["thread_id"])
+    if graph is None:
+        await publish("error", {"detail": "Chatbot not initialized"})
+        return
+
+    async with main.thread_registry.lock(payload["thread_id"]):
+        last_seen_id = await main.prepare_approval(graph, config, payload["approved"], payload.get("delta"))
+        async for event, data in main.graph_events(graph, None, config, resume=payload["approved"],
+                                                   since_id=last_seen_id):
+            await publish(event, data)
+
+
+def thread_busy_as_error(run):
+    """
+    Reports a thread busy past THREAD_LOCK_WAIT_SECONDS as the job's error,
+    like the API's 409, and other API errors with their status
+    """
+    async def handler(payload: dict, publish):
+        try:
+            await run(payload, publish)
+        except ThreadBusyError as e:
+            await publish("error", {"detail": str(e), "status": 409})
+        except HTTPException as e:
+            # e.g. a thread whose API key this worker cannot recover (400)
+            await publish("error", {"detail": e.detail, "status": e.status_code})
+    return handler
+
+
+async def run_jobs(concurrency: int = None):
+    await main.startup_event()
+    await main.startup_task
+    if not main.job_queue.enabled:
+        await main.shutdown_event()
+        raise SystemExit("❌ The job worker requires Redis (REDIS_URL)")
+
+    worker = JobWorker(main.job_queue, {
+        "chat": thread_busy_as_error(run_chat_job),
+        "approve": thread_busy_as_error(run_approve_job)
+    }, concurrency=concurrency)
+
+    # Stop taking jobs on SIGTERM/SIGINT and finish the running ones
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await main.shutdown_event()
+
+
+def run_process(concurrency: int):
+    asyncio.run(run_jobs(concurrency=concurrency))
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Run queued chat turns")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs run at a time per process (default JOB_WORKER_CONCURRENCY or 4)")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_WORKER_PROCESSES", "1")),
+                        help="Worker processes to start (default JOB_WORKER_PROCESSES or 1)")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_process(args.concurrency)
+        return
+    processes = [multiprocessing.Process(target=run_process, args=(args.concurrency,))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    cli()